@@ -0,0 +1,55 @@
+"""cari_hesaplar artimli bakiye
+
+Revision ID: 3b9d2f6c1a7e
+Revises: ef775ce5a157
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f6c1a7e'
+down_revision: Union[str, Sequence[str], None] = 'ef775ce5a157'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tablo, modeller.Base.metadata.create_all ile daha önce oluşturulmuş olabilir.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS cari_hesaplar (
+            id SERIAL PRIMARY KEY,
+            cari_id INTEGER NOT NULL,
+            cari_tip VARCHAR(20) NOT NULL,
+            bakiye DOUBLE PRECISION DEFAULT 0.0
+        )
+    """)
+    op.execute("ALTER TABLE cari_hesaplar ADD COLUMN IF NOT EXISTS kullanici_id INTEGER REFERENCES kullanicilar(id)")
+
+    # Mevcut (kullanılmayan) satırlar atılır ve bakiyeler cari_hareketler üzerinden tek geçişte kurulur.
+    op.execute("DELETE FROM cari_hesaplar")
+    op.execute("""
+        INSERT INTO cari_hesaplar (cari_id, cari_tip, kullanici_id, bakiye)
+        SELECT cari_id, cari_tip, kullanici_id,
+               COALESCE(SUM(CASE WHEN islem_yone = 'ALACAK' THEN tutar
+                                 WHEN islem_yone = 'BORC' THEN -tutar
+                                 ELSE 0 END), 0)
+        FROM cari_hareketler
+        GROUP BY cari_id, cari_tip, kullanici_id
+    """)
+
+    op.alter_column('cari_hesaplar', 'kullanici_id', nullable=False)
+    op.create_unique_constraint(
+        'uq_cari_hesaplar_kullanici_cari', 'cari_hesaplar', ['kullanici_id', 'cari_tip', 'cari_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_cari_hesaplar_kullanici_cari', 'cari_hesaplar', type_='unique')
+    op.drop_column('cari_hesaplar', 'kullanici_id')
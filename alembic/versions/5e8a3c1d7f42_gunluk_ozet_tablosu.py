@@ -0,0 +1,81 @@
+"""gunluk_ozet tablosu
+
+Revision ID: 5e8a3c1d7f42
+Revises: 7c4e1a9b2d30
+Create Date: 2026-10-18 15:02:19.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a3c1d7f42'
+down_revision: Union[str, Sequence[str], None] = '7c4e1a9b2d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'gunluk_ozet',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kullanici_id', sa.Integer(), sa.ForeignKey('kullanicilar.id'), nullable=False),
+        sa.Column('tarih', sa.Date(), nullable=False),
+        sa.Column('satis_toplami', sa.Float(), server_default='0'),
+        sa.Column('satis_maliyeti', sa.Float(), server_default='0'),
+        sa.Column('alis_toplami', sa.Float(), server_default='0'),
+        sa.Column('gelir_toplami', sa.Float(), server_default='0'),
+        sa.Column('gider_toplami', sa.Float(), server_default='0'),
+        sa.Column('nakit_giris', sa.Float(), server_default='0'),
+        sa.Column('nakit_cikis', sa.Float(), server_default='0'),
+        sa.UniqueConstraint('kullanici_id', 'tarih', name='uq_gunluk_ozet_kullanici_tarih'),
+    )
+    op.create_index('ix_gunluk_ozet_id', 'gunluk_ozet', ['id'])
+
+    # Mevcut veriden ilk doldurma. Sonrasında tablo yazma yollarında artımlı güncellenir;
+    # gerektiğinde POST /admin/gunluk_ozet_yeniden_olustur ile yeniden kurulabilir.
+    op.execute("""
+        INSERT INTO gunluk_ozet (kullanici_id, tarih, satis_toplami, satis_maliyeti, alis_toplami,
+                                 gelir_toplami, gider_toplami, nakit_giris, nakit_cikis)
+        SELECT kullanici_id, tarih,
+               SUM(satis_toplami), SUM(satis_maliyeti), SUM(alis_toplami),
+               SUM(gelir_toplami), SUM(gider_toplami), SUM(nakit_giris), SUM(nakit_cikis)
+        FROM (
+            SELECT f.kullanici_id, f.tarih,
+                   CASE WHEN f.fatura_turu = 'SATIS' THEN f.genel_toplam ELSE 0 END AS satis_toplami,
+                   0 AS satis_maliyeti,
+                   CASE WHEN f.fatura_turu = 'ALIS' THEN f.genel_toplam ELSE 0 END AS alis_toplami,
+                   0 AS gelir_toplami, 0 AS gider_toplami, 0 AS nakit_giris, 0 AS nakit_cikis
+            FROM faturalar f
+            WHERE f.fatura_turu IN ('SATIS', 'ALIS')
+            UNION ALL
+            SELECT f.kullanici_id, f.tarih, 0, fk.miktar * fk.alis_fiyati_fatura_aninda, 0, 0, 0, 0, 0
+            FROM fatura_kalemleri fk
+            JOIN faturalar f ON f.id = fk.fatura_id
+            WHERE f.fatura_turu = 'SATIS'
+            UNION ALL
+            SELECT g.kullanici_id, g.tarih, 0, 0, 0,
+                   CASE WHEN g.tip = 'GELİR' THEN g.tutar ELSE 0 END,
+                   CASE WHEN g.tip = 'GİDER' THEN g.tutar ELSE 0 END,
+                   0, 0
+            FROM gelir_giderler g
+            UNION ALL
+            SELECT k.kullanici_id, k.tarih, 0, 0, 0, 0, 0,
+                   CASE WHEN k.islem_yone = 'GIRIS' THEN k.tutar ELSE 0 END,
+                   CASE WHEN k.islem_yone = 'CIKIS' THEN k.tutar ELSE 0 END
+            FROM kasa_banka_hareketleri k
+            WHERE k.kullanici_id IS NOT NULL AND k.tarih IS NOT NULL
+              AND k.islem_turu IS DISTINCT FROM 'Açılış Bakiyesi'
+        ) kaynaklar
+        GROUP BY kullanici_id, tarih
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gunluk_ozet_id', table_name='gunluk_ozet')
+    op.drop_table('gunluk_ozet')
@@ -0,0 +1,127 @@
+"""senkron row_version ve silinen_kayitlar
+
+Revision ID: 7c4e1a9b2d30
+Revises: 3b9d2f6c1a7e
+Create Date: 2026-10-18 13:41:07.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e1a9b2d30'
+down_revision: Union[str, Sequence[str], None] = '3b9d2f6c1a7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Değişiklik takibi yapılan tablolar. Kalem tablolarında kullanici_id olmadığından
+# silme kaydının (tombstone) sahibi üst belgeden bulunur: (üst tablo, yabancı anahtar kolonu).
+TAKIP_EDILEN_TABLOLAR = {
+    'stoklar': None,
+    'musteriler': None,
+    'tedarikciler': None,
+    'kasalar_bankalar': None,
+    'faturalar': None,
+    'fatura_kalemleri': ('faturalar', 'fatura_id'),
+    'siparisler': None,
+    'siparis_kalemleri': ('siparisler', 'siparis_id'),
+    'cari_hareketler': None,
+    'stok_hareketleri': None,
+    'kasa_banka_hareketleri': None,
+    'gelir_giderler': None,
+    'urun_kategorileri': None,
+    'urun_markalari': None,
+    'urun_gruplari': None,
+    'urun_birimleri': None,
+    'ulkeler': None,
+    'gelir_siniflandirmalari': None,
+    'gider_siniflandirmalari': None,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'silinen_kayitlar',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tablo', sa.String(length=50), nullable=False),
+        sa.Column('kayit_id', sa.Integer(), nullable=False),
+        sa.Column('kullanici_id', sa.Integer(), nullable=True),
+        sa.Column('row_version', sa.BigInteger(), nullable=False),
+        sa.Column('silinme_tarihi', sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index('ix_silinen_kayitlar_tablo_kullanici_surum', 'silinen_kayitlar', ['tablo', 'kullanici_id', 'row_version'])
+
+    # INSERT/UPDATE'te satırın sürümü olarak yazan işlemin kimliğini (xid8) verir. Toplu UPDATE'ler de yakalanır.
+    # Sıralı bir sayaç commit'ten önce dağıtıldığından geç commit edilen satırlar istemcilerin işaretinin
+    # gerisinde kalabilirdi; işlem kimliği ise anlık görüntünün xmin'i ile karşılaştırılarak kesinleşir.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION senkron_surum_ata() RETURNS trigger AS $$
+        BEGIN
+            NEW.row_version := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # DELETE'te silinen kaydın izini (tombstone) bırakır. Toplu DELETE'ler de yakalanır.
+    # TG_ARGV verilirse kullanici_id, üst belge tablosundan (TG_ARGV[0]) yabancı anahtar (TG_ARGV[1]) ile bulunur.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION senkron_silineni_kaydet() RETURNS trigger AS $$
+        DECLARE
+            sahip_id INTEGER;
+        BEGIN
+            IF TG_NARGS = 2 THEN
+                EXECUTE 'SELECT kullanici_id FROM ' || quote_ident(TG_ARGV[0]) || ' WHERE id = $1'
+                    INTO sahip_id
+                    USING (to_jsonb(OLD) ->> TG_ARGV[1])::INTEGER;
+            ELSE
+                sahip_id := (to_jsonb(OLD) ->> 'kullanici_id')::INTEGER;
+            END IF;
+            INSERT INTO silinen_kayitlar (tablo, kayit_id, kullanici_id, row_version)
+            VALUES (TG_TABLE_NAME, OLD.id, sahip_id, pg_current_xact_id()::text::bigint);
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for tablo, ust in TAKIP_EDILEN_TABLOLAR.items():
+        op.add_column(tablo, sa.Column('row_version', sa.BigInteger(), nullable=True))
+        op.execute(f"UPDATE {tablo} SET row_version = pg_current_xact_id()::text::bigint")
+        if ust is None:
+            op.create_index(f'ix_{tablo}_kullanici_row_version', tablo, ['kullanici_id', 'row_version'])
+        else:
+            op.create_index(f'ix_{tablo}_row_version', tablo, ['row_version'])
+
+        op.execute(f"""
+            CREATE TRIGGER trg_{tablo}_surum
+            BEFORE INSERT OR UPDATE ON {tablo}
+            FOR EACH ROW EXECUTE FUNCTION senkron_surum_ata()
+        """)
+        arguman = f"'{ust[0]}', '{ust[1]}'" if ust else ""
+        op.execute(f"""
+            CREATE TRIGGER trg_{tablo}_silinen
+            AFTER DELETE ON {tablo}
+            FOR EACH ROW EXECUTE FUNCTION senkron_silineni_kaydet({arguman})
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tablo, ust in TAKIP_EDILEN_TABLOLAR.items():
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tablo}_silinen ON {tablo}")
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tablo}_surum ON {tablo}")
+        if ust is None:
+            op.drop_index(f'ix_{tablo}_kullanici_row_version', table_name=tablo)
+        else:
+            op.drop_index(f'ix_{tablo}_row_version', table_name=tablo)
+        op.drop_column(tablo, 'row_version')
+
+    op.execute("DROP FUNCTION IF EXISTS senkron_silineni_kaydet()")
+    op.execute("DROP FUNCTION IF EXISTS senkron_surum_ata()")
+    op.drop_index('ix_silinen_kayitlar_tablo_kullanici_surum', table_name='silinen_kayitlar')
+    op.drop_table('silinen_kayitlar')
@@ -0,0 +1,44 @@
+"""rapor_isleri tablosu
+
+Revision ID: 9d2b6f4e8a15
+Revises: 5e8a3c1d7f42
+Create Date: 2026-10-18 16:24:53.407129
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2b6f4e8a15'
+down_revision: Union[str, Sequence[str], None] = '5e8a3c1d7f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'rapor_isleri',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kullanici_id', sa.Integer(), sa.ForeignKey('kullanicilar.id'), nullable=False),
+        sa.Column('tur', sa.String(length=50), nullable=False),
+        sa.Column('parametreler', sa.Text(), nullable=True),
+        sa.Column('durum', sa.String(length=20), nullable=False, server_default='BEKLEMEDE'),
+        sa.Column('ilerleme', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('dosya_adi', sa.String(length=255), nullable=True),
+        sa.Column('hata_mesaji', sa.Text(), nullable=True),
+        sa.Column('olusturma_tarihi', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('bitis_tarihi', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_rapor_isleri_id', 'rapor_isleri', ['id'])
+    op.create_index('ix_rapor_isleri_kullanici_id', 'rapor_isleri', ['kullanici_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rapor_isleri_kullanici_id', table_name='rapor_isleri')
+    op.drop_index('ix_rapor_isleri_id', table_name='rapor_isleri')
+    op.drop_table('rapor_isleri')
@@ -0,0 +1,55 @@
+"""trigram arama indeksleri
+
+Revision ID: a4c7e2f9b316
+Revises: 9d2b6f4e8a15
+Create Date: 2026-10-18 17:08:36.915402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e2f9b316'
+down_revision: Union[str, Sequence[str], None] = '9d2b6f4e8a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Liste sayfalarındaki arama kutularının taradığı kolonlar: tablo -> kolonlar
+ARAMA_KOLONLARI = {
+    'stoklar': ['ad', 'kod'],
+    'musteriler': ['ad', 'kod', 'telefon', 'vergi_no'],
+    'tedarikciler': ['ad', 'telefon', 'vergi_no'],
+    'faturalar': ['fatura_no', 'misafir_adi'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Türkçe karakterleri ASCII karşılıklarına çevirip küçük harfe indirir. api_yardimcilar.normalize_turkish_chars
+    # ile aynı eşlemeyi kullanır; indeks ifadesinde kullanılabilmesi için IMMUTABLE tanımlanır.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION tr_normallestir(metin text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT lower(translate(metin, 'ıİşŞğĞçÇöÖüÜ', 'iIsSgGcCoOuU')) $$
+    """)
+
+    for tablo, kolonlar in ARAMA_KOLONLARI.items():
+        for kolon in kolonlar:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{tablo}_{kolon}_trgm ON {tablo} "
+                f"USING gin (tr_normallestir({kolon}) gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tablo, kolonlar in ARAMA_KOLONLARI.items():
+        for kolon in kolonlar:
+            op.execute(f"DROP INDEX IF EXISTS ix_{tablo}_{kolon}_trgm")
+    op.execute("DROP FUNCTION IF EXISTS tr_normallestir(text)")
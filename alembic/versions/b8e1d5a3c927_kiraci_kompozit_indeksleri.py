@@ -0,0 +1,59 @@
+"""kiraci kompozit indeksleri
+
+Revision ID: b8e1d5a3c927
+Revises: a4c7e2f9b316
+Create Date: 2026-10-18 17:46:12.630871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e1d5a3c927'
+down_revision: Union[str, Sequence[str], None] = 'a4c7e2f9b316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# indeks adı -> (tablo, kolonlar). Kolon sırası: önce eşitlik filtreleri (kullanici_id, FK, tür), sonra aralık/sıralama (tarih, id).
+# api/modeller.py içindeki __table_args__ tanımlarıyla aynı tutulmalıdır.
+INDEKSLER = {
+    'ix_faturalar_kullanici_tur_tarih': ('faturalar', ['kullanici_id', 'fatura_turu', 'tarih']),
+    'ix_faturalar_kullanici_tarih_id': ('faturalar', ['kullanici_id', 'tarih', 'id']),
+    'ix_faturalar_kullanici_cari': ('faturalar', ['kullanici_id', 'cari_id', 'cari_tip']),
+    'ix_fatura_kalemleri_fatura_id': ('fatura_kalemleri', ['fatura_id']),
+    'ix_fatura_kalemleri_urun_id': ('fatura_kalemleri', ['urun_id']),
+    'ix_siparisler_kullanici_tarih_id': ('siparisler', ['kullanici_id', 'tarih', 'id']),
+    'ix_siparis_kalemleri_siparis_id': ('siparis_kalemleri', ['siparis_id']),
+    'ix_siparis_kalemleri_urun_id': ('siparis_kalemleri', ['urun_id']),
+    'ix_cari_hareketler_kullanici_cari_tarih': ('cari_hareketler', ['kullanici_id', 'cari_id', 'cari_tip', 'tarih']),
+    'ix_cari_hareketler_kaynak': ('cari_hareketler', ['kaynak_id', 'kaynak']),
+    'ix_stok_hareketleri_kullanici_urun_tarih': ('stok_hareketleri', ['kullanici_id', 'urun_id', 'tarih']),
+    'ix_stok_hareketleri_kaynak': ('stok_hareketleri', ['kaynak_id', 'kaynak']),
+    'ix_kasa_banka_hareketleri_kullanici_hesap_tarih': ('kasa_banka_hareketleri', ['kullanici_id', 'kasa_banka_id', 'tarih']),
+    'ix_kasa_banka_hareketleri_kaynak': ('kasa_banka_hareketleri', ['kaynak_id', 'kaynak']),
+    'ix_gelir_giderler_kullanici_tip_tarih': ('gelir_giderler', ['kullanici_id', 'tip', 'tarih']),
+    'ix_stoklar_kullanici_id': ('stoklar', ['kullanici_id', 'id']),
+    'ix_musteriler_kullanici_id': ('musteriler', ['kullanici_id', 'id']),
+    'ix_tedarikciler_kullanici_id': ('tedarikciler', ['kullanici_id', 'id']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY, tablolara yazmayı kilitlemeden indeks kurar; işlem (transaction) dışında çalışması gerekir.
+    with op.get_context().autocommit_block():
+        for ad, (tablo, kolonlar) in INDEKSLER.items():
+            op.create_index(ad, tablo, kolonlar, postgresql_concurrently=True, if_not_exists=True)
+        for tablo in {tablo for tablo, _ in INDEKSLER.values()}:
+            op.execute(f"ANALYZE {tablo}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for ad, (tablo, _) in INDEKSLER.items():
+            op.drop_index(ad, table_name=tablo, postgresql_concurrently=True, if_exists=True)
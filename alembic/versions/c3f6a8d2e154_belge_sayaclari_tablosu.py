@@ -0,0 +1,63 @@
+"""belge_sayaclari tablosu
+
+Revision ID: c3f6a8d2e154
+Revises: b8e1d5a3c927
+Create Date: 2026-10-18 18:31:05.772964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f6a8d2e154'
+down_revision: Union[str, Sequence[str], None] = 'b8e1d5a3c927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Sayaçların mevcut veriden başlatılacağı kaynaklar: (önek, tablo, kolon)
+SAYAC_KAYNAKLARI = [
+    ('SF', 'faturalar', 'fatura_no'),
+    ('AF', 'faturalar', 'fatura_no'),
+    ('SI', 'faturalar', 'fatura_no'),
+    ('AI', 'faturalar', 'fatura_no'),
+    ('DG', 'faturalar', 'fatura_no'),
+    ('M', 'musteriler', 'kod'),
+    ('T', 'tedarikciler', 'kod'),
+    ('STK', 'stoklar', 'kod'),
+    ('S-', 'siparisler', 'siparis_no'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'belge_sayaclari',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kullanici_id', sa.Integer(), sa.ForeignKey('kullanicilar.id'), nullable=False),
+        sa.Column('onek', sa.String(length=20), nullable=False),
+        sa.Column('son_deger', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('kullanici_id', 'onek', name='uq_belge_sayaclari_kullanici_onek'),
+    )
+    op.create_index('ix_belge_sayaclari_id', 'belge_sayaclari', ['id'])
+
+    # Her kullanıcı ve önek için mevcut en büyük sıra numarası sayacın başlangıç değeri olur.
+    # Yalnızca "önek + rakamlar" biçimindeki numaralar dikkate alınır (örn. PERAKENDE_MUSTERI atlanır).
+    for onek, tablo, kolon in SAYAC_KAYNAKLARI:
+        op.execute(f"""
+            INSERT INTO belge_sayaclari (kullanici_id, onek, son_deger)
+            SELECT kullanici_id, '{onek}', MAX(substring({kolon} from {len(onek) + 1})::bigint)
+            FROM {tablo}
+            WHERE {kolon} ~ '^{onek}[0-9]+$' AND kullanici_id IS NOT NULL
+            GROUP BY kullanici_id
+            ON CONFLICT (kullanici_id, onek) DO UPDATE SET son_deger = GREATEST(belge_sayaclari.son_deger, EXCLUDED.son_deger)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_belge_sayaclari_id', table_name='belge_sayaclari')
+    op.drop_table('belge_sayaclari')
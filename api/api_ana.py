@@ -20,9 +20,10 @@ from .rotalar import (
     dogrulama, musteriler, tedarikciler, stoklar,
     kasalar_bankalar, cari_hareketler,
     gelir_gider, nitelikler, sistem, raporlar, yedekleme, kullanicilar,
-    yonetici
+    yonetici, senkronizasyon
 )
 from .rotalar.siparis_faturalar import siparisler_router, faturalar_router 
+from .rapor_isleri import rapor_isleri_temizle
 
 # Loglama ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -75,6 +76,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error(f"Başlangıç verileri kontrol edilirken hata oluştu: {e}")
     finally:
         db.close()
+
+    # Yarım kalan ve saklama süresi dolan rapor işlerini temizle
+    db = next(get_db())
+    try:
+        rapor_isleri_temizle(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rapor işleri temizlenirken hata oluştu: {e}")
+    finally:
+        db.close()
     
     yield
     logger.info("API kapanıyor...")
@@ -112,6 +123,7 @@ app.include_router(yedekleme.router, tags=["Yedekleme"])
 app.include_router(yonetici.router, tags=["Yönetici"])
 app.include_router(siparisler_router, tags=["Siparişler"])
 app.include_router(faturalar_router, tags=["Faturalar"])
+app.include_router(senkronizasyon.router, tags=["Senkronizasyon"])
 
 @app.get("/")
 def read_root():
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from typing import Dict, List, Optional
+from sqlalchemy import func, case, select, and_, or_, literal, Date
 import logging
 from datetime import datetime
 from . import semalar
@@ -14,25 +15,134 @@ class CariHesaplamaService:
     def __init__(self, db: Session):
         self.db = db
 
-    def calculate_cari_net_bakiye(self, cari_id: int, cari_turu: str) -> float:
+    def calculate_cari_net_bakiye(self, cari_id: int, cari_turu: str, kullanici_id: Optional[int] = None) -> float:
         """
-        Belirli bir cari (Müşteri veya Tedarikçi) için net bakiyeyi tek bir sorguda hesaplar.
-        KRİTİK DÜZELTME: Sorgularda semalar.CariHareket yerine modeller.CariHareket kullanıldı.
+        Belirli bir cari (Müşteri veya Tedarikçi) için net bakiyeyi döndürür.
+        Bakiye, cari_hesaplar tablosunda artımlı tutulduğundan tek satırlık bir okuma yeterlidir.
         """
-        from .modeller import CariHareket # Scope'u daraltmak için burada import edildi
-
-        # Sorgu sonucunda None gelmesi durumunda 0 değerini kullanmak için func.coalesce eklendi.
-        result = self.db.query(
-            func.coalesce(func.sum(case((CariHareket.islem_yone == "ALACAK", CariHareket.tutar), else_=0)), 0).label('alacak_toplami'),
-            func.coalesce(func.sum(case((CariHareket.islem_yone == "BORC", CariHareket.tutar), else_=0)), 0).label('borc_toplami')
-        ).filter(
-            CariHareket.cari_id == cari_id,
-            CariHareket.cari_tip == cari_turu
-        ).one()
-
-        net_bakiye = result.alacak_toplami - result.borc_toplami
-        return net_bakiye
-    
+        from .modeller import CariHesap # Scope'u daraltmak için burada import edildi
+
+        query = self.db.query(CariHesap.bakiye).filter(
+            CariHesap.cari_id == cari_id,
+            CariHesap.cari_tip == cari_turu
+        )
+        if kullanici_id is not None:
+            query = query.filter(CariHesap.kullanici_id == kullanici_id)
+
+        net_bakiye = query.scalar()
+        return net_bakiye or 0.0
+
+    def calculate_cari_net_bakiyeler(self, cari_ids: List[int], cari_turu: str, kullanici_id: Optional[int] = None) -> Dict[int, float]:
+        """
+        Birden fazla cari için net bakiyeleri cari_hesaplar tablosundan tek sorguda okur.
+        Listede olup hiç hareketi bulunmayan cariler için 0.0 döner.
+        """
+        from .modeller import CariHesap
+
+        if not cari_ids:
+            return {}
+
+        query = self.db.query(CariHesap.cari_id, CariHesap.bakiye).filter(
+            CariHesap.cari_id.in_(cari_ids),
+            CariHesap.cari_tip == cari_turu
+        )
+        if kullanici_id is not None:
+            query = query.filter(CariHesap.kullanici_id == kullanici_id)
+
+        bakiyeler = {cari_id: 0.0 for cari_id in cari_ids}
+        for satir in query.all():
+            bakiyeler[satir.cari_id] = satir.bakiye or 0.0
+        return bakiyeler
+
+    def calculate_cari_yaslandirma(self, kullanici_id: int, bugun: Optional[date] = None) -> List[dict]:
+        """
+        Kullanıcının tüm carileri için açık bakiyeleri vade yaşına göre gruplar (0-30 / 31-60 / 61-90 / 90+ gün).
+        Tahsilat/ödemeler FIFO mantığıyla en eski borçlanmalardan düşülür; kalan açık tutarlar
+        vade_tarihi (yoksa tarih) üzerinden yaşlandırılır. Cari sayısından bağımsız olarak tek bir SQL sorgusu çalışır.
+        Vadesi henüz gelmemiş tutarlar 0-30 grubunda yer alır.
+        """
+        from .modeller import CariHareket, Musteri, Tedarikci
+
+        bugun = bugun or date.today()
+        musteri_tip = semalar.CariTipiEnum.MUSTERI.value
+        tedarikci_tip = semalar.CariTipiEnum.TEDARIKCI.value
+        alacak = semalar.IslemYoneEnum.ALACAK
+        borc = semalar.IslemYoneEnum.BORC
+
+        temel_kosul = and_(
+            CariHareket.kullanici_id == kullanici_id,
+            CariHareket.cari_tip.in_([musteri_tip, tedarikci_tip])
+        )
+        # Müşteride ALACAK, tedarikçide BORC kaydı açık bakiyeyi artırır; ters yöndeki kayıtlar kapatır.
+        artiran = or_(
+            and_(CariHareket.cari_tip == musteri_tip, CariHareket.islem_yone == alacak),
+            and_(CariHareket.cari_tip == tedarikci_tip, CariHareket.islem_yone == borc)
+        )
+        azaltan = or_(
+            and_(CariHareket.cari_tip == musteri_tip, CariHareket.islem_yone == borc),
+            and_(CariHareket.cari_tip == tedarikci_tip, CariHareket.islem_yone == alacak)
+        )
+        vade = func.coalesce(CariHareket.vade_tarihi, CariHareket.tarih)
+
+        odemeler = select(
+            CariHareket.cari_id, CariHareket.cari_tip, func.sum(CariHareket.tutar).label("odenen")
+        ).where(temel_kosul, azaltan).group_by(CariHareket.cari_id, CariHareket.cari_tip).cte("odemeler")
+
+        borclanmalar = select(
+            CariHareket.cari_id,
+            CariHareket.cari_tip,
+            CariHareket.tutar,
+            vade.label("vade"),
+            func.sum(CariHareket.tutar).over(
+                partition_by=(CariHareket.cari_id, CariHareket.cari_tip),
+                order_by=(vade, CariHareket.id)
+            ).label("kumulatif")
+        ).where(temel_kosul, artiran).cte("borclanmalar")
+
+        acik_tutar = func.least(
+            borclanmalar.c.tutar,
+            func.greatest(borclanmalar.c.kumulatif - func.coalesce(odemeler.c.odenen, 0), 0)
+        )
+        acik = select(
+            borclanmalar.c.cari_id,
+            borclanmalar.c.cari_tip,
+            borclanmalar.c.vade,
+            acik_tutar.label("acik_tutar"),
+            (literal(bugun, Date) - borclanmalar.c.vade).label("gun")
+        ).select_from(
+            borclanmalar.outerjoin(odemeler, and_(
+                borclanmalar.c.cari_id == odemeler.c.cari_id,
+                borclanmalar.c.cari_tip == odemeler.c.cari_tip
+            ))
+        ).cte("acik")
+
+        def _grup(kosul):
+            return func.coalesce(func.sum(case((kosul, acik.c.acik_tutar), else_=0)), 0)
+
+        yaslandirma = select(
+            acik.c.cari_id,
+            acik.c.cari_tip,
+            func.sum(acik.c.acik_tutar).label("bakiye"),
+            func.min(case((acik.c.acik_tutar > 0, acik.c.vade))).label("vade_tarihi"),
+            _grup(acik.c.gun <= 30).label("gun_0_30"),
+            _grup(and_(acik.c.gun > 30, acik.c.gun <= 60)).label("gun_31_60"),
+            _grup(and_(acik.c.gun > 60, acik.c.gun <= 90)).label("gun_61_90"),
+            _grup(acik.c.gun > 90).label("gun_90_ustu")
+        ).group_by(acik.c.cari_id, acik.c.cari_tip).having(func.sum(acik.c.acik_tutar) > 0).cte("yaslandirma")
+
+        sorgu = select(
+            yaslandirma,
+            func.coalesce(Musteri.ad, Tedarikci.ad).label("cari_ad")
+        ).select_from(
+            yaslandirma
+            .outerjoin(Musteri, and_(yaslandirma.c.cari_tip == musteri_tip, Musteri.id == yaslandirma.c.cari_id))
+            .outerjoin(Tedarikci, and_(yaslandirma.c.cari_tip == tedarikci_tip, Tedarikci.id == yaslandirma.c.cari_id))
+        ).where(
+            or_(Musteri.aktif == True, Tedarikci.aktif == True)
+        ).order_by(yaslandirma.c.bakiye.desc())
+
+        return [dict(satir._mapping) for satir in self.db.execute(sorgu)]
+
 # Varsayılan verileri ekleyen fonksiyon
 def create_initial_data(db: Session, kullanici_id: int):
     try:
@@ -0,0 +1,39 @@
+# api/excel_yazici.py
+# Sunucu raporları için ortak, akış (streaming) tabanlı Excel yazıcı.
+import os
+from typing import Any, Iterable, Sequence
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+def excel_dosyasi_yaz(dosya_yolu: str, sayfa_adi: str, basliklar: Sequence[str], satirlar: Iterable[Sequence[Any]]) -> int:
+    """
+    Satırları openpyxl write_only kipinde tek sayfalık bir .xlsx dosyasına yazar ve yazılan satır sayısını döndürür.
+    write_only kipinde hücreler bellekte tutulmaz, satırlar geldikçe diske aktarılır; bellek kullanımı satır
+    sayısından bağımsızdır. satirlar bir üreteç (generator) olabilir, böylece sorgu sonucu hiç listeye alınmaz.
+    Dosya önce geçici adla yazılıp tamamlanınca yeniden adlandırılır; indirme ucu yarım dosya görmez.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sayfa_adi)
+
+    kalin = Font(bold=True)
+    baslik_hucreleri = []
+    for baslik in basliklar:
+        hucre = WriteOnlyCell(ws, value=baslik)
+        hucre.font = kalin
+        baslik_hucreleri.append(hucre)
+    ws.append(baslik_hucreleri)
+
+    satir_sayisi = 0
+    for satir in satirlar:
+        ws.append(list(satir))
+        satir_sayisi += 1
+
+    gecici_yol = f"{dosya_yolu}.tmp"
+    try:
+        wb.save(gecici_yol)
+        os.replace(gecici_yol, dosya_yolu)
+    finally:
+        if os.path.exists(gecici_yol):
+            os.remove(gecici_yol)
+    return satir_sayisi
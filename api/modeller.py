@@ -7,7 +7,7 @@ import enum
 from sqlalchemy.sql import func
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, Text, DateTime,
-    ForeignKey, Date, Enum, or_
+    ForeignKey, Date, Enum, or_, UniqueConstraint, BigInteger, Index, DDL, event
 )
 from sqlalchemy.orm import relationship, backref, declarative_base # DEĞİŞTİ: relationship ve backref eklendi
 
@@ -17,6 +17,7 @@ from .semalar import (
     KasaBankaTipiEnum, StokIslemTipiEnum, SiparisTuruEnum, SiparisDurumEnum,
     KaynakTipEnum, GelirGiderTipEnum
 ) 
+from .veritabani import veritabani_nesnelerini_bagla
 
 Base = declarative_base()
 
@@ -286,7 +287,8 @@ class StokRead(StokBase):
 
 class StokListResponse(BaseModel): # Liste yanıtı
     items: List[StokRead]
-    total: int
+    total: Optional[int] = None # İmleç modunda yalnızca include_total=true ise dolar
+    next_cursor: Optional[str] = None
 
 class AnlikStokMiktariResponse(BaseModel): # Liste yanıtı
     anlik_miktar: float
@@ -325,7 +327,8 @@ class StokHareketRead(StokHareketBase):
 
 class StokHareketListResponse(BaseModel): # Liste yanıtı
     items: List[StokHareketRead]
-    total: int
+    total: Optional[int] = None # İmleç modunda yalnızca include_total=true ise dolar
+    next_cursor: Optional[str] = None
 
 # Fatura Kalem Modelleri
 class FaturaKalemiBase(BaseOrmModel):
@@ -419,7 +422,8 @@ class FaturaRead(FaturaBase):
 
 class FaturaListResponse(BaseModel): # Liste yanıtı
     items: List[FaturaRead]
-    total: int
+    total: Optional[int] = None # İmleç modunda yalnızca include_total=true ise dolar
+    next_cursor: Optional[str] = None
 
 class NextFaturaNoResponse(BaseModel): # Liste yanıtı
     fatura_no: str
@@ -563,7 +567,8 @@ class GelirGiderRead(GelirGiderBase):
 
 class GelirGiderListResponse(BaseModel): # Liste yanıtı
     items: List[GelirGiderRead]
-    total: int
+    total: Optional[int] = None # İmleç modunda yalnızca include_total=true ise dolar
+    next_cursor: Optional[str] = None
 
 # Cari Hareket Modelleri
 class CariHareketBase(BaseOrmModel):
@@ -609,7 +614,18 @@ class CariHareketRead(CariHareketBase):
 
 class CariHareketListResponse(BaseModel): # Liste yanıtı
     items: List[CariHareketRead]
+    total: Optional[int] = None # İmleç modunda yalnızca include_total=true ise dolar
+    next_cursor: Optional[str] = None
+
+class CariHesapEkstresiSatiri(CariHareketRead):
+    kasa_banka_adi: Optional[str] = None
+    bakiye: float = 0.0 # Bu satır dahil yürüyen bakiye
+
+class CariHesapEkstresiResponse(BaseModel):
+    items: List[CariHesapEkstresiSatiri]
     total: int
+    devreden_bakiye: float = 0.0
+    next_cursor: Optional[str] = None
 
 # Kasa/Banka Hareket Modelleri
 class KasaBankaHareketBase(BaseOrmModel):
@@ -648,6 +664,10 @@ class KasaBankaHareketListResponse(BaseModel): # Liste yanıtı
 # Kasa/Banka Hareket Modelleri (ORM)
 class KasaBankaHareket(Base):
     __tablename__ = 'kasa_banka_hareketleri'
+    __table_args__ = (
+        Index('ix_kasa_banka_hareketleri_kullanici_hesap_tarih', 'kullanici_id', 'kasa_banka_id', 'tarih'),
+        Index('ix_kasa_banka_hareketleri_kaynak', 'kaynak_id', 'kaynak'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     kasa_banka_id = Column(Integer, ForeignKey('kasalar_bankalar.id'), index=True)
     tarih = Column(Date)
@@ -659,6 +679,7 @@ class KasaBankaHareket(Base):
     kaynak_id = Column(Integer, nullable=True)
     olusturma_tarihi_saat = Column(DateTime, default=datetime.now)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
     # Note: KasaBankaHesap (kasalar_bankalar) sınıfının var olduğu varsayılır
     kasa_banka_hesabi = relationship("KasaBankaHesap", back_populates="hareketler")
@@ -796,16 +817,49 @@ class KarZararResponse(BaseModel):
     brut_kar: float
     net_kar: float
 
+class NakitAkisiDonemi(BaseModel):
+    donem: date # Dönemin ilk günü (gün, haftanın pazartesisi veya ayın 1'i)
+    nakit_giris: float
+    nakit_cikis: float
+    net_nakit_akisi: float
+
 class NakitAkisiResponse(BaseModel):
     nakit_girisleri: float
     nakit_cikislar: float
     net_nakit_akisi: float
+    items: List[NakitAkisiDonemi] = [] # Yalnızca granularity verildiğinde doldurulur
+
+class ZamanSerisiNoktasi(BaseModel):
+    donem: date # Dönemin ilk günü
+    deger: float
+
+class ZamanSerisiResponse(BaseModel):
+    defter: str
+    olcu: str
+    donem: str
+    items: List[ZamanSerisiNoktasi] # Aralıktaki her dönem için bir nokta; verisi olmayan dönemler 0
+
+class RaporIsiRead(BaseModel):
+    id: int
+    tur: str
+    durum: str
+    ilerleme: int
+    dosya_adi: Optional[str] = None
+    indirme_adresi: Optional[str] = None # Yalnızca TAMAMLANDI durumunda dolu; /raporlar/download_report/{dosya_adi}
+    hata_mesaji: Optional[str] = None
+    olusturma_tarihi: Optional[datetime] = None
+    bitis_tarihi: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
 
 class CariYaslandirmaEntry(BaseModel):
     cari_id: int
     cari_ad: str
     bakiye: float
-    vade_tarihi: Optional[date] = None
+    vade_tarihi: Optional[date] = None # En eski açık kaydın vadesi
+    gun_0_30: float = 0.0
+    gun_31_60: float = 0.0
+    gun_61_90: float = 0.0
+    gun_90_ustu: float = 0.0
 
 class CariYaslandirmaResponse(BaseModel):
     musteri_alacaklar: List[CariYaslandirmaEntry]
@@ -845,6 +899,31 @@ class StokOzetResponse(BaseModel):
 class NextSiparisKoduResponse(BaseModel):
     next_code: str    
 
+class BelgeNumaralariResponse(BaseModel):
+    onek: str
+    ilk: int
+    son: int
+    numaralar: List[str] # ilk..son aralığındaki biçimlendirilmiş numaralar (örn. SF000000012)
+
+class FaturaTopluSonucu(BaseModel):
+    sira: int # İstekteki belgenin sırası (0'dan başlar)
+    fatura_no: str
+    basarili: bool
+    id: Optional[int] = None
+    hata: Optional[str] = None
+
+class FaturaTopluResponse(BaseModel):
+    olusturulan: int
+    hatali: int
+    sonuclar: List[FaturaTopluSonucu]
+
+class FaturaTopluSilmeRequest(BaseModel):
+    fatura_idler: List[int]
+
+class FaturaTopluSilmeResponse(BaseModel):
+    silinen_sayisi: int
+    bulunamayan_idler: List[int]
+
 class SiparisKalemiRead(BaseModel):
     id: int
     siparis_id: int
@@ -925,6 +1004,9 @@ class Kullanici(Base):
 
 class Musteri(Base):
     __tablename__ = 'musteriler'
+    __table_args__ = (
+        Index('ix_musteriler_kullanici_id', 'kullanici_id', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     ad = Column(String(100), index=True)
     kod = Column(String(50), unique=True, index=True, nullable=False)
@@ -936,6 +1018,7 @@ class Musteri(Base):
     aktif = Column(Boolean, default=True)
     olusturma_tarihi = Column(DateTime, server_default=func.now()) 
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
     
     kullanici = relationship("Kullanici", back_populates="musteriler")
     
@@ -962,6 +1045,9 @@ class Musteri(Base):
 
 class Tedarikci(Base):
     __tablename__ = 'tedarikciler'
+    __table_args__ = (
+        Index('ix_tedarikciler_kullanici_id', 'kullanici_id', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     ad = Column(String(100), index=True)
     kod = Column(String(50), unique=True, index=True, nullable=False) 
@@ -973,6 +1059,7 @@ class Tedarikci(Base):
     aktif = Column(Boolean, default=True)
     olusturma_tarihi = Column(DateTime, server_default=func.now()) 
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
 
     kullanici = relationship("Kullanici", back_populates="tedarikciler")
     
@@ -999,6 +1086,9 @@ class Tedarikci(Base):
 
 class Stok(Base):
     __tablename__ = 'stoklar'
+    __table_args__ = (
+        Index('ix_stoklar_kullanici_id', 'kullanici_id', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     kod = Column(String(50), unique=True, index=True, nullable=False)
     ad = Column(String(200), index=True, nullable=False)
@@ -1017,14 +1107,27 @@ class Stok(Base):
     birim_id = Column(Integer, ForeignKey('urun_nitelikleri.id'), nullable=True)
     mense_id = Column(Integer, ForeignKey('urun_nitelikleri.id'), nullable=True)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
 
     kullanici = relationship("Kullanici", back_populates="stoklar")
     fatura_kalemleri = relationship("FaturaKalemi", back_populates="urun")
     stok_hareketleri = relationship("StokHareket", back_populates="urun", cascade="all, delete-orphan")
     siparis_kalemleri = relationship("SiparisKalemi", back_populates="urun")
+
+    # Nitelik ilişkileri (salt okunur). Kayıtlar nitelikler rotasının yönettiği ayrı tablolarda tutulur.
+    kategori = relationship("UrunKategori", primaryjoin="foreign(Stok.kategori_id) == UrunKategori.id", viewonly=True)
+    marka = relationship("UrunMarka", primaryjoin="foreign(Stok.marka_id) == UrunMarka.id", viewonly=True)
+    urun_grubu = relationship("UrunGrubu", primaryjoin="foreign(Stok.urun_grubu_id) == UrunGrubu.id", viewonly=True)
+    birim = relationship("UrunBirimi", primaryjoin="foreign(Stok.birim_id) == UrunBirimi.id", viewonly=True)
+    mense_ulke = relationship("Ulke", primaryjoin="foreign(Stok.mense_id) == Ulke.id", viewonly=True)
     
 class Fatura(Base):
     __tablename__ = 'faturalar'
+    __table_args__ = (
+        Index('ix_faturalar_kullanici_tur_tarih', 'kullanici_id', 'fatura_turu', 'tarih'),
+        Index('ix_faturalar_kullanici_tarih_id', 'kullanici_id', 'tarih', 'id'),
+        Index('ix_faturalar_kullanici_cari', 'kullanici_id', 'cari_id', 'cari_tip'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     fatura_no = Column(String(50), unique=True, index=True, nullable=False)
     tarih = Column(Date, nullable=False)
@@ -1051,6 +1154,7 @@ class Fatura(Base):
     olusturma_tarihi_saat = Column(DateTime, server_default=func.now())
     
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
     
     # Relationships
     kullanici = relationship("Kullanici", back_populates="faturalar")
@@ -1060,15 +1164,21 @@ class Fatura(Base):
     musteri = relationship("Musteri",
                           primaryjoin="and_(Fatura.cari_id == foreign(Musteri.id), Fatura.cari_tip == 'MUSTERI')",
                           overlaps="faturalar",
-                          viewonly=True)
+                          viewonly=True,
+                          uselist=False)
                           
     tedarikci = relationship("Tedarikci",
                              primaryjoin="and_(Fatura.cari_id == foreign(Tedarikci.id), Fatura.cari_tip == 'TEDARIKCI')",
                              overlaps="faturalar",
-                             viewonly=True)
+                             viewonly=True,
+                             uselist=False)
 
 class FaturaKalemi(Base):
     __tablename__ = 'fatura_kalemleri'
+    __table_args__ = (
+        Index('ix_fatura_kalemleri_fatura_id', 'fatura_id'),
+        Index('ix_fatura_kalemleri_urun_id', 'urun_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     fatura_id = Column(Integer, ForeignKey('faturalar.id'))
     urun_id = Column(Integer, ForeignKey('stoklar.id'))
@@ -1084,12 +1194,17 @@ class FaturaKalemi(Base):
     iskonto_degeri = Column(Float, default=0.0)
 
     olusturma_tarihi = Column(DateTime, server_default=func.now())
+    row_version = Column(BigInteger, nullable=True)
 
     fatura = relationship("Fatura", back_populates="kalemler")
     urun = relationship("Stok", back_populates="fatura_kalemleri")
 
 class StokHareket(Base):
     __tablename__ = 'stok_hareketleri'
+    __table_args__ = (
+        Index('ix_stok_hareketleri_kullanici_urun_tarih', 'kullanici_id', 'urun_id', 'tarih'),
+        Index('ix_stok_hareketleri_kaynak', 'kaynak_id', 'kaynak'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     tarih = Column(Date, nullable=False)
     urun_id = Column(Integer, ForeignKey('stoklar.id'), nullable=False)
@@ -1103,12 +1218,16 @@ class StokHareket(Base):
     kaynak_id = Column(Integer, nullable=True)
     olusturma_tarihi = Column(DateTime, server_default=func.now())
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
 
     kullanici = relationship("Kullanici", back_populates="stok_hareketleri")
     urun = relationship("Stok", back_populates="stok_hareketleri")
 
 class Siparis(Base):
     __tablename__ = 'siparisler'
+    __table_args__ = (
+        Index('ix_siparisler_kullanici_tarih_id', 'kullanici_id', 'tarih', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     siparis_no = Column(String(50), unique=True, index=True, nullable=False)
     siparis_turu = Column(Enum(SiparisTuruEnum), nullable=False) # 'SATIŞ' veya 'ALIŞ'
@@ -1121,6 +1240,7 @@ class Siparis(Base):
     genel_toplam = Column(Float, default=0.0)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
     olusturma_tarihi = Column(DateTime, server_default=func.now())
+    row_version = Column(BigInteger, nullable=True)
 
     kullanici = relationship("Kullanici", back_populates="siparisler")
     kalemler = relationship("SiparisKalemi", back_populates="siparis", cascade="all, delete-orphan")
@@ -1138,6 +1258,10 @@ class Siparis(Base):
 # api/modeller.py dosyasındaki CariHareket sınıfının KESİN SON HALİ
 class CariHareket(Base):
     __tablename__ = 'cari_hareketler'
+    __table_args__ = (
+        Index('ix_cari_hareketler_kullanici_cari_tarih', 'kullanici_id', 'cari_id', 'cari_tip', 'tarih'),
+        Index('ix_cari_hareketler_kaynak', 'kaynak_id', 'kaynak'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     tarih = Column(Date, nullable=False)
     islem_turu = Column(String(50), nullable=False)
@@ -1157,6 +1281,7 @@ class CariHareket(Base):
     olusturan_kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True) # <-- Yabancı Anahtar Olarak Tanımlandı
 
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False) # Temel multi-user takibi
+    row_version = Column(BigInteger, nullable=True)
     
     # Relationships (AmbiguousForeignKeysError'ı çözmek için foreign_keys netleştirildi)
     kullanici = relationship(
@@ -1186,42 +1311,49 @@ class UrunKategori(Base):
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class UrunMarka(Base):
     __tablename__ = 'urun_markalari'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class UrunGrubu(Base):
     __tablename__ = 'urun_gruplari'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class UrunBirimi(Base):
     __tablename__ = 'urun_birimleri'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class Ulke(Base):
     __tablename__ = 'ulkeler'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class GelirSiniflandirma(Base):
     __tablename__ = 'gelir_siniflandirmalari'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class GiderSiniflandirma(Base):
     __tablename__ = 'gider_siniflandirmalari'
     id = Column(Integer, primary_key=True)
     ad = Column(String)
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=True)
+    row_version = Column(BigInteger, nullable=True)
 
 class Nitelik(Base):
     __tablename__ = 'nitelikler'
@@ -1241,15 +1373,81 @@ class SenkronizasyonKuyrugu(Base):
     islem_tarihi = Column(DateTime, default=func.now())
     senkronize_edildi = Column(Boolean, default=False)    
 
+class SilinenKayit(Base):
+    # Sunucuda silinen kayıtların izi (tombstone). Veritabanı tetikleyicisi tarafından doldurulur;
+    # istemciler /sync/changes ile bu kayıtları alıp yerel kopyalarını siler.
+    __tablename__ = 'silinen_kayitlar'
+    id = Column(Integer, primary_key=True, index=True)
+    tablo = Column(String(50), nullable=False)
+    kayit_id = Column(Integer, nullable=False)
+    kullanici_id = Column(Integer, nullable=True)
+    row_version = Column(BigInteger, nullable=False)
+    silinme_tarihi = Column(DateTime, server_default=func.now())
+
+class BelgeSayaci(Base):
+    # Kullanıcı ve önek (SF, AF, M, STK, S- ...) başına son verilen belge numarası.
+    # Numaralar INSERT ... ON CONFLICT DO UPDATE ... RETURNING ile atomik olarak ilerletilir.
+    __tablename__ = 'belge_sayaclari'
+    __table_args__ = (
+        UniqueConstraint('kullanici_id', 'onek', name='uq_belge_sayaclari_kullanici_onek'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    onek = Column(String(20), nullable=False)
+    son_deger = Column(BigInteger, nullable=False, default=0)
+
 class CariHesap(Base):
+    # Cari bakiyelerinin artımlı tutulduğu özet tablo (bakiye = ALACAK - BORC).
+    # Her CariHareket ekleme/silme işleminde atomik olarak güncellenir.
     __tablename__ = 'cari_hesaplar'
+    __table_args__ = (
+        UniqueConstraint('kullanici_id', 'cari_tip', 'cari_id', name='uq_cari_hesaplar_kullanici_cari'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     cari_id = Column(Integer, nullable=False)
     cari_tip = Column(String(20), nullable=False)
     bakiye = Column(Float, default=0.0)
+    kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+
+class GunlukOzet(Base):
+    # Kullanıcı ve gün bazında ön-toplam (rollup) tablosu. Fatura, gelir/gider ve kasa/banka hareketi
+    # yazımlarında artımlı güncellenir; dönem raporları ham tablolar yerine bu satırları toplar.
+    __tablename__ = 'gunluk_ozet'
+    __table_args__ = (
+        UniqueConstraint('kullanici_id', 'tarih', name='uq_gunluk_ozet_kullanici_tarih'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    tarih = Column(Date, nullable=False)
+    satis_toplami = Column(Float, default=0.0) # SATIS faturalarının genel toplamı
+    satis_maliyeti = Column(Float, default=0.0) # SATIS kalemlerinde miktar * alis_fiyati_fatura_aninda
+    alis_toplami = Column(Float, default=0.0) # ALIS faturalarının genel toplamı
+    gelir_toplami = Column(Float, default=0.0) # GelirGider GELİR kayıtları
+    gider_toplami = Column(Float, default=0.0) # GelirGider GİDER kayıtları
+    nakit_giris = Column(Float, default=0.0) # KasaBankaHareket GIRIS
+    nakit_cikis = Column(Float, default=0.0) # KasaBankaHareket CIKIS
+
+class RaporIsi(Base):
+    # Arka planda üretilen rapor dosyaları için iş kaydı. İşçi havuzu durum ve ilerlemeyi bu satıra yazar;
+    # tamamlanan dosyalar server_reports altında tutulur ve saklama süresi dolunca satırla birlikte silinir.
+    __tablename__ = 'rapor_isleri'
+    id = Column(Integer, primary_key=True, index=True)
+    kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False, index=True)
+    tur = Column(String(50), nullable=False) # Örn. satis_raporu_excel
+    parametreler = Column(Text, nullable=True) # Rapor parametreleri (JSON)
+    durum = Column(String(20), nullable=False, default="BEKLEMEDE") # BEKLEMEDE / CALISIYOR / TAMAMLANDI / HATA
+    ilerleme = Column(Integer, nullable=False, default=0) # 0-100
+    dosya_adi = Column(String(255), nullable=True)
+    hata_mesaji = Column(Text, nullable=True)
+    olusturma_tarihi = Column(DateTime, server_default=func.now())
+    bitis_tarihi = Column(DateTime, nullable=True)
 
 class SiparisKalemi(Base):
     __tablename__ = 'siparis_kalemleri'
+    __table_args__ = (
+        Index('ix_siparis_kalemleri_siparis_id', 'siparis_id'),
+        Index('ix_siparis_kalemleri_urun_id', 'urun_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     siparis_id = Column(Integer, ForeignKey('siparisler.id'))
     urun_id = Column(Integer, ForeignKey('stoklar.id'))
@@ -1261,6 +1459,7 @@ class SiparisKalemi(Base):
     birim_fiyat_kdv_haric = Column(Float, default=0.0) # Yeni eklendi
     toplam_tutar = Column(Float, default=0.0)
     olusturma_tarihi = Column(DateTime, server_default=func.now())
+    row_version = Column(BigInteger, nullable=True)
 
     siparis = relationship("Siparis", back_populates="kalemler")
     urun = relationship("Stok", back_populates="siparis_kalemleri")
@@ -1284,6 +1483,7 @@ class KasaBankaHesap(Base):
 
     olusturma_tarihi = Column(DateTime, server_default=func.now())
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
 
     kullanici = relationship("Kullanici", back_populates="kasalar_bankalar") 
     hareketler = relationship("KasaBankaHareket", back_populates="kasa_banka_hesabi", cascade="all, delete-orphan")
@@ -1292,6 +1492,9 @@ class KasaBankaHesap(Base):
 
 class GelirGider(Base):
     __tablename__ = 'gelir_giderler'
+    __table_args__ = (
+        Index('ix_gelir_giderler_kullanici_tip_tarih', 'kullanici_id', 'tip', 'tarih'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     tarih = Column(Date, nullable=False)
     tip = Column(Enum(GelirGiderTipEnum), nullable=False)
@@ -1303,6 +1506,7 @@ class GelirGider(Base):
     kaynak_id = Column(Integer, nullable=True) # Opsiyonel
     olusturma_tarihi = Column(DateTime, server_default=func.now())
     kullanici_id = Column(Integer, ForeignKey('kullanicilar.id'), nullable=False)
+    row_version = Column(BigInteger, nullable=True)
     
     kullanici = relationship("Kullanici", back_populates="gelir_giderler")
     kasa_banka = relationship("KasaBankaHesap", foreign_keys=[kasa_banka_id])
@@ -1318,4 +1522,45 @@ class UrunNitelik(Base):
 
 class NextCodeResponse(BaseModel):
     next_code: str
-    model_config = ConfigDict(from_attributes=True)    
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)    
+
+# /sync/changes ile değişiklikleri izlenen tablolar (Alembic'te 7c4e1a9b2d30 göçü). row_version'ı tetikleyiciler yazar;
+# kalem tablolarında silme kaydının sahibi üst belgeden bulunur: (üst tablo, yabancı anahtar kolonu).
+# create_all ile kurulan veritabanlarında sürüm indeksleri ve tetikleyiciler de tabloyla birlikte oluşturulur.
+SENKRON_TAKIPLI_MODELLER = {
+    Stok: None,
+    Musteri: None,
+    Tedarikci: None,
+    KasaBankaHesap: None,
+    Fatura: None,
+    FaturaKalemi: ('faturalar', 'fatura_id'),
+    Siparis: None,
+    SiparisKalemi: ('siparisler', 'siparis_id'),
+    CariHareket: None,
+    StokHareket: None,
+    KasaBankaHareket: None,
+    GelirGider: None,
+    UrunKategori: None,
+    UrunMarka: None,
+    UrunGrubu: None,
+    UrunBirimi: None,
+    Ulke: None,
+    GelirSiniflandirma: None,
+    GiderSiniflandirma: None,
+}
+
+veritabani_nesnelerini_bagla(Base.metadata)
+for _model, _ust in SENKRON_TAKIPLI_MODELLER.items():
+    _tablo = _model.__table__
+    if _ust is None:
+        Index(f'ix_{_tablo.name}_kullanici_row_version', _tablo.c.kullanici_id, _tablo.c.row_version)
+    else:
+        Index(f'ix_{_tablo.name}_row_version', _tablo.c.row_version)
+    _arguman = f"'{_ust[0]}', '{_ust[1]}'" if _ust else ""
+    for _ddl in (
+        f"CREATE TRIGGER trg_{_tablo.name}_surum BEFORE INSERT OR UPDATE ON {_tablo.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION senkron_surum_ata()",
+        f"CREATE TRIGGER trg_{_tablo.name}_silinen AFTER DELETE ON {_tablo.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION senkron_silineni_kaydet({_arguman})",
+    ):
+        event.listen(_tablo, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
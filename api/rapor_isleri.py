@@ -0,0 +1,279 @@
+# api/rapor_isleri.py
+# Uzun süren rapor dosyalarını HTTP isteğinden ayırıp arka plandaki işçi havuzunda üreten iş (job) katmanı.
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import func, and_, select
+from sqlalchemy.orm import Session
+from . import modeller, semalar
+from .veritabani import oturum_ac
+from .excel_yazici import excel_dosyasi_yaz
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = "server_reports"
+os.makedirs(REPORTS_DIR, exist_ok=True)
+
+# Rapor üretimi CPU ve bağlantı kullandığından havuz küçük tutulur; fazlası kuyrukta bekler.
+RAPOR_IS_ISCI_SAYISI = 2
+_is_havuzu = ThreadPoolExecutor(max_workers=RAPOR_IS_ISCI_SAYISI, thread_name_prefix="rapor_isi")
+
+RAPOR_SAKLAMA_SURESI = timedelta(hours=24) # Biten işler ve dosyaları bu süreden sonra silinir
+RAPOR_IS_ZAMAN_ASIMI = timedelta(minutes=30) # Bu süreyi aşan bitmemiş işler (örn. sunucu yeniden başladı) HATA sayılır
+TEMIZLIK_ARALIGI = timedelta(minutes=10)
+
+_son_temizlik: Optional[datetime] = None
+_temizlik_kilidi = threading.Lock()
+
+IlerlemeBildir = Callable[[int], None]
+
+SATIS_RAPORU_BASLIKLARI = [
+    "Fatura No", "Tarih", "Cari Adı", "Ürün Kodu", "Ürün Adı", "Miktar",
+    "Birim Fiyat", "KDV (%)", "İskonto 1 (%)", "İskonto 2 (%)", "Uygulanan İskonto Tutarı",
+    "Kalem Toplam (KDV Dahil)", "Fatura Genel Toplam (KDV Dahil)", "Ödeme Türü"
+]
+RAPOR_OKUMA_PARCASI = 2000 # Sunucu tarafı imleçten her seferde çekilecek satır sayısı
+
+def satis_raporu_excel_olustur(db: Session, kullanici_id: int, parametreler: Dict[str, Any], ilerleme_bildir: Optional[IlerlemeBildir] = None) -> str:
+    """
+    Tarih aralığındaki satış faturalarını kalem bazında Excel dosyasına yazar ve dosya adını döndürür.
+    parametreler: baslangic_tarihi, bitis_tarihi (ISO metin), cari_id (opsiyonel).
+    Fatura, kalem, ürün ve cari adı tek bir birleştirilmiş sorguyla sunucu tarafı imleçten parça parça okunur
+    ve doğrudan write_only Excel yazıcısına aktarılır; bellek kullanımı rapor boyutundan bağımsızdır.
+    """
+    Fatura = modeller.Fatura
+    FaturaKalemi = modeller.FaturaKalemi
+    Stok = modeller.Stok
+    Musteri = modeller.Musteri
+    Tedarikci = modeller.Tedarikci
+
+    baslangic_tarihi = date.fromisoformat(parametreler["baslangic_tarihi"])
+    bitis_tarihi = date.fromisoformat(parametreler["bitis_tarihi"])
+    cari_id = parametreler.get("cari_id")
+
+    kosullar = [
+        Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
+        Fatura.tarih >= baslangic_tarihi,
+        Fatura.tarih <= bitis_tarihi,
+        Fatura.kullanici_id == kullanici_id
+    ]
+    if cari_id:
+        kosullar.append(Fatura.cari_id == cari_id)
+
+    toplam_fatura = db.query(func.count(Fatura.id)).filter(*kosullar).scalar() or 0
+    if toplam_fatura == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Belirtilen tarih aralığında satış faturası bulunamadı.")
+
+    sorgu = select(
+        Fatura.id.label("fatura_id"),
+        Fatura.fatura_no,
+        Fatura.tarih,
+        Fatura.genel_toplam,
+        Fatura.odeme_turu,
+        func.coalesce(Musteri.ad, Tedarikci.ad).label("cari_adi"),
+        Stok.kod.label("urun_kodu"),
+        Stok.ad.label("urun_adi"),
+        FaturaKalemi.miktar,
+        FaturaKalemi.birim_fiyat,
+        FaturaKalemi.kdv_orani,
+        FaturaKalemi.iskonto_yuzde_1,
+        FaturaKalemi.iskonto_yuzde_2
+    ).select_from(Fatura).join(
+        FaturaKalemi, FaturaKalemi.fatura_id == Fatura.id
+    ).outerjoin(
+        Stok, and_(Stok.id == FaturaKalemi.urun_id, Stok.kullanici_id == kullanici_id)
+    ).outerjoin(
+        Musteri, and_(Fatura.cari_tip == semalar.CariTipiEnum.MUSTERI.value, Musteri.id == Fatura.cari_id)
+    ).outerjoin(
+        Tedarikci, and_(Fatura.cari_tip == semalar.CariTipiEnum.TEDARIKCI.value, Tedarikci.id == Fatura.cari_id)
+    ).where(*kosullar).order_by(Fatura.tarih.desc(), Fatura.id, FaturaKalemi.id)
+
+    def _satirlar():
+        son_fatura_id = None
+        islenen_fatura = 0
+        for kalem in db.execute(sorgu.execution_options(yield_per=RAPOR_OKUMA_PARCASI)):
+            if kalem.fatura_id != son_fatura_id:
+                son_fatura_id = kalem.fatura_id
+                islenen_fatura += 1
+                if ilerleme_bildir:
+                    # Son yüzde, dosya diske yazıldıktan sonra iş tamamlanırken verilir.
+                    ilerleme_bildir(islenen_fatura * 99 // toplam_fatura)
+
+            tarih = kalem.tarih.strftime("%Y-%m-%d") if isinstance(kalem.tarih, date) else str(kalem.tarih)
+            odeme_turu = kalem.odeme_turu.value if hasattr(kalem.odeme_turu, 'value') else str(kalem.odeme_turu)
+            iskonto_1 = kalem.iskonto_yuzde_1 or 0.0
+            iskonto_2 = kalem.iskonto_yuzde_2 or 0.0
+            kdv_orani = kalem.kdv_orani or 0.0
+
+            birim_fiyat_kdv_dahil_kalem_orig = kalem.birim_fiyat * (1 + kdv_orani / 100)
+            iskontolu_birim_fiyat_kdv_dahil = birim_fiyat_kdv_dahil_kalem_orig * (1 - iskonto_1 / 100) * (1 - iskonto_2 / 100)
+            uygulanan_iskonto_tutari = (birim_fiyat_kdv_dahil_kalem_orig - iskontolu_birim_fiyat_kdv_dahil) * kalem.miktar
+            kalem_toplam_kdv_dahil = iskontolu_birim_fiyat_kdv_dahil * kalem.miktar
+
+            yield [
+                kalem.fatura_no, tarih, kalem.cari_adi or "N/A", kalem.urun_kodu or "N/A", kalem.urun_adi or "N/A",
+                kalem.miktar, iskontolu_birim_fiyat_kdv_dahil, kdv_orani, iskonto_1, iskonto_2,
+                uygulanan_iskonto_tutari, kalem_toplam_kdv_dahil, kalem.genel_toplam, odeme_turu
+            ]
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    filename = f"satis_raporu_{kullanici_id}_{timestamp}.xlsx"
+    excel_dosyasi_yaz(os.path.join(REPORTS_DIR, filename), "Satış Raporu", SATIS_RAPORU_BASLIKLARI, _satirlar())
+    return filename
+
+# İş türü -> üretici fonksiyon (oturum, kullanıcı id, parametreler, ilerleme_bildir) -> dosya adı
+RAPOR_URETICILERI: Dict[str, Callable[..., str]] = {
+    "satis_raporu_excel": satis_raporu_excel_olustur,
+}
+
+def _ilerleme_bildiricisi(is_id: int) -> IlerlemeBildir:
+    """
+    İşin ilerleme yüzdesini ayrı bir oturumla hemen kaydeden fonksiyon döndürür. Üretici kendi oturumunda
+    uzun bir okuma yaptığından ilerleme yazımları o oturumu commit/expire etmez. Yalnızca yüzde değiştiğinde yazar.
+    """
+    son_yuzde = [-1]
+
+    def bildir(yuzde: int):
+        yuzde = max(0, min(100, int(yuzde)))
+        if yuzde == son_yuzde[0]:
+            return
+        son_yuzde[0] = yuzde
+        db = oturum_ac()
+        try:
+            db.query(modeller.RaporIsi).filter(modeller.RaporIsi.id == is_id).update(
+                {modeller.RaporIsi.ilerleme: yuzde}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    return bildir
+
+def _isi_durumla_bitir(is_id: int, durum: str, dosya_adi: Optional[str] = None, hata_mesaji: Optional[str] = None):
+    db = oturum_ac()
+    try:
+        degerler = {
+            modeller.RaporIsi.durum: durum,
+            modeller.RaporIsi.dosya_adi: dosya_adi,
+            modeller.RaporIsi.hata_mesaji: hata_mesaji,
+            modeller.RaporIsi.bitis_tarihi: datetime.now()
+        }
+        if durum == "TAMAMLANDI":
+            degerler[modeller.RaporIsi.ilerleme] = 100
+        db.query(modeller.RaporIsi).filter(modeller.RaporIsi.id == is_id).update(degerler, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _isi_calistir(is_id: int):
+    """İşçi iş parçacığında çalışır: işi CALISIYOR yapar, dosyayı üretir ve sonucu iş satırına yazar."""
+    db = oturum_ac()
+    try:
+        rapor_isi = db.query(modeller.RaporIsi).filter(modeller.RaporIsi.id == is_id).first()
+        if rapor_isi is None or rapor_isi.durum != "BEKLEMEDE":
+            return
+        rapor_isi.durum = "CALISIYOR"
+        db.commit()
+
+        uretici = RAPOR_URETICILERI[rapor_isi.tur]
+        kullanici_id = rapor_isi.kullanici_id
+        parametreler = json.loads(rapor_isi.parametreler or "{}")
+
+        db.connection(execution_options={"postgresql_readonly": True})
+        dosya_adi = uretici(db, kullanici_id, parametreler, _ilerleme_bildiricisi(is_id))
+        db.rollback()
+        _isi_durumla_bitir(is_id, "TAMAMLANDI", dosya_adi=dosya_adi)
+        logger.info(f"Rapor işi {is_id} tamamlandı: {dosya_adi}")
+    except Exception as e:
+        db.rollback()
+        hata = e.detail if isinstance(e, HTTPException) else f"Rapor oluşturulurken beklenmedik bir hata oluştu: {e}"
+        if not isinstance(e, HTTPException):
+            logger.error(f"Rapor işi {is_id} başarısız: {e}", exc_info=True)
+        try:
+            _isi_durumla_bitir(is_id, "HATA", hata_mesaji=str(hata))
+        except Exception as kayit_hatasi:
+            logger.error(f"Rapor işi {is_id} hata durumu kaydedilemedi: {kayit_hatasi}", exc_info=True)
+    finally:
+        db.close()
+
+def rapor_isi_baslat(db: Session, kullanici_id: int, tur: str, parametreler: Dict[str, Any]) -> modeller.RaporIsi:
+    """İş satırını oluşturup commit eder ve üretimi işçi havuzuna bırakır. İstek, dosya üretilmesini beklemez."""
+    if tur not in RAPOR_URETICILERI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Bilinmeyen rapor türü: {tur}")
+
+    rapor_isleri_temizle_gerekirse()
+
+    rapor_isi = modeller.RaporIsi(
+        kullanici_id=kullanici_id,
+        tur=tur,
+        parametreler=json.dumps(parametreler, default=str),
+        durum="BEKLEMEDE",
+        ilerleme=0
+    )
+    db.add(rapor_isi)
+    db.commit()
+    db.refresh(rapor_isi)
+
+    _is_havuzu.submit(_isi_calistir, rapor_isi.id)
+    return rapor_isi
+
+def rapor_isleri_temizle(db: Session) -> int:
+    """
+    Saklama süresi dolan işleri ve dosyalarını siler, zaman aşımına uğramış bitmemiş işleri HATA olarak kapatır.
+    Hiçbir işe bağlı olmayan (örn. senkron uç noktanın ürettiği) eski dosyalar da değiştirilme zamanına göre silinir.
+    Silinen iş sayısını döndürür.
+    """
+    simdi = datetime.now()
+
+    db.query(modeller.RaporIsi).filter(
+        modeller.RaporIsi.durum.in_(["BEKLEMEDE", "CALISIYOR"]),
+        modeller.RaporIsi.olusturma_tarihi < simdi - RAPOR_IS_ZAMAN_ASIMI
+    ).update({
+        modeller.RaporIsi.durum: "HATA",
+        modeller.RaporIsi.hata_mesaji: "Rapor işi zaman aşımına uğradı veya sunucu yeniden başlatıldı.",
+        modeller.RaporIsi.bitis_tarihi: simdi
+    }, synchronize_session=False)
+
+    suresi_dolanlar = db.query(modeller.RaporIsi.id, modeller.RaporIsi.dosya_adi).filter(
+        modeller.RaporIsi.bitis_tarihi < simdi - RAPOR_SAKLAMA_SURESI
+    ).all()
+    silinecek_idler = [satir.id for satir in suresi_dolanlar]
+    if silinecek_idler:
+        db.query(modeller.RaporIsi).filter(modeller.RaporIsi.id.in_(silinecek_idler)).delete(synchronize_session=False)
+    db.commit()
+
+    sinir_zamani = (simdi - RAPOR_SAKLAMA_SURESI).timestamp()
+    for dosya_adi in os.listdir(REPORTS_DIR):
+        dosya_yolu = os.path.join(REPORTS_DIR, dosya_adi)
+        try:
+            if os.path.isfile(dosya_yolu) and os.path.getmtime(dosya_yolu) < sinir_zamani:
+                os.remove(dosya_yolu)
+        except OSError as e:
+            logger.warning(f"Eski rapor dosyası silinemedi ({dosya_yolu}): {e}")
+
+    if silinecek_idler:
+        logger.info(f"{len(silinecek_idler)} eski rapor işi temizlendi.")
+    return len(silinecek_idler)
+
+def rapor_isleri_temizle_gerekirse():
+    """Temizliği en fazla TEMIZLIK_ARALIGI'nda bir, kendi oturumuyla çalıştırır. Hatalar iş oluşturmayı engellemez."""
+    global _son_temizlik
+    simdi = datetime.now()
+    with _temizlik_kilidi:
+        if _son_temizlik is not None and simdi - _son_temizlik < TEMIZLIK_ARALIGI:
+            return
+        _son_temizlik = simdi
+
+    db = oturum_ac()
+    try:
+        rapor_isleri_temizle(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rapor işleri temizlenirken hata: {e}", exc_info=True)
+    finally:
+        db.close()
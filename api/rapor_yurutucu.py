@@ -0,0 +1,42 @@
+# api/rapor_yurutucu.py
+# Birbirinden bağımsız, salt okunur rapor sorgularını eşzamanlı çalıştıran küçük yürütme katmanı.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from sqlalchemy.orm import Session
+from .veritabani import oturum_ac
+
+logger = logging.getLogger(__name__)
+
+# Tüm istekler için ortak ve sınırlı havuz: rapor sorguları bağlantı havuzundan en fazla bu kadar ek bağlantı kullanır.
+RAPOR_ISCI_SAYISI = 4
+_rapor_havuzu = ThreadPoolExecutor(max_workers=RAPOR_ISCI_SAYISI, thread_name_prefix="rapor")
+
+def _ayri_oturumda_calistir(sorgu: Callable[[Session], Any]) -> Any:
+    db = oturum_ac()
+    try:
+        db.connection(execution_options={"postgresql_readonly": True})
+        return sorgu(db)
+    finally:
+        db.close()
+
+def paralel_sorgula(sorgular: Dict[str, Callable[[Session], Any]]) -> Dict[str, Any]:
+    """
+    Verilen sorgu fonksiyonlarını (oturum -> sonuç) her biri kendi oturumu ve havuz bağlantısıyla eşzamanlı çalıştırır,
+    sonuçları aynı anahtarlarla döndürür. Toplam süre yaklaşık olarak en yavaş sorgunun süresidir.
+    Sorgular ayrı işlemlerde çalıştığından aynı anlık görüntüyü (snapshot) paylaşmazlar; yalnızca birbirinden
+    bağımsız, salt okunur toplamlar için kullanılmalıdır. Herhangi bir sorgudaki hata çağırana iletilir.
+    """
+    if len(sorgular) == 1:
+        anahtar, sorgu = next(iter(sorgular.items()))
+        return {anahtar: _ayri_oturumda_calistir(sorgu)}
+
+    gelecekler = {anahtar: _rapor_havuzu.submit(_ayri_oturumda_calistir, sorgu) for anahtar, sorgu in sorgular.items()}
+    sonuclar = {}
+    for anahtar, gelecek in gelecekler.items():
+        try:
+            sonuclar[anahtar] = gelecek.result()
+        except Exception as e:
+            logger.error(f"Paralel rapor sorgusu '{anahtar}' başarısız: {e}", exc_info=True)
+            raise
+    return sonuclar
@@ -1,6 +1,15 @@
 # api.zip/rotalar/api_yardimcilar.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, or_, tuple_, select, literal, union_all, Float, Integer, insert, update, values, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+from collections import defaultdict
+from fastapi import HTTPException, status
+import base64
+import json
+import threading
+import time
 from .. import modeller, semalar # KRİTİK DÜZELTME: Doğru modeller ve semalar import edildi
 import logging
 from sqlalchemy.exc import SQLAlchemyError
@@ -8,43 +17,337 @@ from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
 
-def _cari_bakiyesini_guncelle(db: Session, cari_id: int, cari_tipi: str, kullanici_id: int):
+# Ana sayfa (dashboard) özeti için süreç içi önbellek: (kullanici_id, başlangıç, bitiş, bugün) -> (zaman, sonuç).
+# Fatura, gelir/gider ve stok yazımlarında ilgili kullanıcının kayıtları temizlenir. Birden fazla worker
+# süreci çalışıyorsa diğer süreçlerdeki kopyalar PANO_ONBELLEK_SURESI dolunca kendiliğinden yenilenir.
+PANO_ONBELLEK_SURESI = 300 # saniye
+_pano_onbellegi: Dict[Tuple, Tuple[float, Any]] = {}
+_pano_onbellek_kilidi = threading.Lock()
+
+def pano_onbellekten_al(anahtar: Tuple) -> Optional[Any]:
+    """Süresi dolmamış önbellek kaydını döndürür; yoksa None."""
+    with _pano_onbellek_kilidi:
+        kayit = _pano_onbellegi.get(anahtar)
+        if kayit is None:
+            return None
+        if time.monotonic() - kayit[0] > PANO_ONBELLEK_SURESI:
+            del _pano_onbellegi[anahtar]
+            return None
+        return kayit[1]
+
+def pano_onbellege_yaz(anahtar: Tuple, sonuc: Any):
+    with _pano_onbellek_kilidi:
+        _pano_onbellegi[anahtar] = (time.monotonic(), sonuc)
+
+def pano_onbellegini_temizle(kullanici_id: Optional[int] = None):
+    """Kullanıcının tüm özet kayıtlarını siler. kullanici_id verilmezse önbellek tamamen boşaltılır."""
+    with _pano_onbellek_kilidi:
+        if kullanici_id is None:
+            _pano_onbellegi.clear()
+            return
+        for anahtar in [a for a in _pano_onbellegi if a[0] == kullanici_id]:
+            del _pano_onbellegi[anahtar]
+
+def imlec_olustur(*degerler) -> str:
+    """Keyset sayfalama için son satırın sıralama değerlerini opak bir imlece (cursor) çevirir."""
+    parcalar = [d.isoformat() if isinstance(d, (date, datetime)) else d for d in degerler]
+    return base64.urlsafe_b64encode(json.dumps(parcalar).encode("utf-8")).decode("ascii")
+
+def imlec_coz(imlec: str, tipler: Sequence[type]) -> Tuple:
+    """imlec_olustur ile üretilen imleci, verilen tiplere göre (örn. (date, int)) geri çözer."""
+    try:
+        parcalar = json.loads(base64.urlsafe_b64decode(imlec.encode("ascii")).decode("utf-8"))
+        if len(parcalar) != len(tipler):
+            raise ValueError("İmleç alan sayısı uyuşmuyor")
+        degerler = []
+        for deger, tip in zip(parcalar, tipler):
+            if tip is date:
+                degerler.append(date.fromisoformat(deger))
+            elif tip is datetime:
+                degerler.append(datetime.fromisoformat(deger))
+            else:
+                degerler.append(tip(deger))
+        return tuple(degerler)
+    except (ValueError, TypeError, UnicodeError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Geçersiz sayfalama imleci: {e}")
+
+def sayfala(
+    query,
+    kolonlar: Sequence,
+    limit: int,
+    skip: int = 0,
+    after: Optional[str] = None,
+    imlec_modu: bool = False,
+    toplam_iste: bool = True,
+    azalan: bool = True
+) -> Tuple[List, Optional[int], Optional[str]]:
     """
-    Belirli bir carinin (Müşteri/Tedarikçi) bakiyesini, ilişkili tüm cari hareketlerini toplayarak yeniden hesaplar ve günceller.
-    Bu fonksiyon, bir işlem (fatura, ödeme vb.) eklendiğinde veya silindiğinde çağrılmalıdır.
+    Liste endpoint'leri için ortak sayfalama. (satirlar, toplam, next_cursor) döndürür.
+    kolonlar benzersiz bir sıralama anahtarı olmalıdır; örn. (Model.tarih, Model.id).
+
+    - Ofset modu (varsayılan): ORDER BY kolonlar, OFFSET skip, LIMIT limit. Toplam her zaman hesaplanır.
+    - İmleç modu (after verilirse veya imlec_modu=True): WHERE (kolonlar) < imleç, LIMIT limit + 1.
+      OFFSET kullanılmaz; derin sayfalar da ilk sayfa kadar hızlıdır. Toplam yalnızca toplam_iste ile hesaplanır.
     """
-    try:
-        # KRİTİK DÜZELTME 1: Sorgularda modeller.CariHareket kullanıldı.
-        hareketler = db.query(modeller.CariHareket).filter(
-            modeller.CariHareket.cari_id == cari_id,
-            modeller.CariHareket.kullanici_id == kullanici_id
-        ).all()
-
-        # KRİTİK DÜZELTME 2: Enum değerleri kullanıldı.
-        toplam_borc = sum(h.tutar for h in hareketler if h.islem_yone == semalar.IslemYoneEnum.BORC)
-        toplam_alacak = sum(h.tutar for h in hareketler if h.islem_yone == semalar.IslemYoneEnum.ALACAK)
-
-        guncel_bakiye = toplam_alacak - toplam_borc
-
-        if cari_tipi == "MUSTERI":
-            # KRİTİK DÜZELTME 3: modeller.Musteri kullanıldı.
-            cari = db.query(modeller.Musteri).filter(modeller.Musteri.id == cari_id, modeller.Musteri.kullanici_id == kullanici_id).first()
-        elif cari_tipi == "TEDARIKCI":
-            # KRİTİK DÜZELTME 3: modeller.Tedarikci kullanıldı.
-            cari = db.query(modeller.Tedarikci).filter(modeller.Tedarikci.id == cari_id, modeller.Tedarikci.kullanici_id == kullanici_id).first()
-        else:
-            logger.warning(f"Bilinmeyen cari tipi: {cari_tipi} için bakiye güncellenemedi.")
-            return
+    siralama = [k.desc() if azalan else k.asc() for k in kolonlar]
+    imlec_modu = imlec_modu or after is not None
+
+    if not imlec_modu:
+        toplam = query.order_by(None).count()
+        satirlar = query.order_by(*siralama).offset(skip).limit(limit).all()
+        return satirlar, toplam, None
+
+    toplam = query.order_by(None).count() if toplam_iste else None
+
+    if after:
+        tipler = [k.expression.type.python_type for k in kolonlar]
+        son_degerler = imlec_coz(after, tipler)
+        anahtar = tuple_(*kolonlar)
+        query = query.filter(anahtar < tuple_(*son_degerler) if azalan else anahtar > tuple_(*son_degerler))
+
+    satirlar = query.order_by(*siralama).limit(limit + 1).all()
+    next_cursor = None
+    if len(satirlar) > limit:
+        satirlar = satirlar[:limit]
+        son = satirlar[-1]
+        next_cursor = imlec_olustur(*[getattr(son, k.key) for k in kolonlar])
+    return satirlar, toplam, next_cursor
+
+# Arama ifadelerinde kullanılan Türkçe karakter dönüşümü. İstemcideki yardimcilar.normalize_turkish_chars ile
+# aynı eşlemedir; veritabanındaki tr_normallestir() fonksiyonu da (trigram indeksleri bunun üzerine kuruludur)
+# aynı tabloyu kullanır (bkz. veritabani.TR_NORMALLESTIR_DDL ve a4c7e2f9b316 göçü). Hepsi birlikte değiştirilmelidir.
+_TURKCE_KAYNAK = "ıİşŞğĞçÇöÖüÜ"
+_TURKCE_HEDEF = "iIsSgGcCoOuU"
+_turkce_tablo = str.maketrans(_TURKCE_KAYNAK, _TURKCE_HEDEF)
+
+def normalize_turkish_chars(text):
+    """Türkçe karakterleri İngilizce eşdeğerlerine dönüştürür."""
+    if not isinstance(text, str):
+        return text
+    return text.translate(_turkce_tablo)
+
+def arama_ifadesi(kolon):
+    """Kolonun, trigram (pg_trgm GIN) indekslerindeki ifadeyle birebir aynı normalleştirilmiş hali."""
+    return func.tr_normallestir(kolon)
+
+def arama_terimi(arama: str) -> str:
+    """Kullanıcının girdiği terimi, arama_ifadesi ile karşılaştırılabilecek biçime getirir."""
+    return normalize_turkish_chars(arama.strip()).lower()
+
+def bulanik_arama(kolonlar: Sequence, arama: str, sirali: bool = False):
+    """
+    Verilen kolonlarda Türkçe karakter ve büyük/küçük harf duyarsız arama için (koşul, skor) döndürür.
+    Koşul normalleştirilmiş ifadede içerme (LIKE '%terim%') arar; trigram GIN indeksi kullanılır.
+    sirali=True ise yazım hatalı eşleşmeler de (pg_trgm % benzerlik operatörü) dahil edilir ve skor,
+    kolonlardaki en yüksek similarity() değeridir. Sırasız modda skor None'dır.
+    """
+    terim = arama_terimi(arama)
+    ifadeler = [arama_ifadesi(kolon) for kolon in kolonlar]
+    kosullar = [ifade.like(f"%{terim}%") for ifade in ifadeler]
+    if not sirali:
+        return or_(*kosullar), None
+
+    kosullar += [ifade.op("%")(terim) for ifade in ifadeler]
+    benzerlikler = [func.coalesce(func.similarity(ifade, terim), 0) for ifade in ifadeler]
+    skor = func.greatest(*benzerlikler) if len(benzerlikler) > 1 else benzerlikler[0]
+    return or_(*kosullar), skor
+
+def benzerlige_gore_sayfala(query, skor, id_kolonu, limit: int, skip: int = 0) -> Tuple[List, int, None]:
+    """Sıralı arama modunda en iyi eşleşmeler önce gelecek şekilde ofset sayfalaması yapar (imleç desteklenmez)."""
+    toplam = query.order_by(None).count()
+    satirlar = query.order_by(skor.desc(), id_kolonu.asc()).offset(skip).limit(limit).all()
+    return satirlar, toplam, None
+
+# Belge numarası önekleri ve sıra numarasının hane sayısı. Önek başına kullanıcıya özel bir sayaç tutulur.
+FATURA_NUMARA_ONEKLERI = {
+    semalar.FaturaTuruEnum.SATIS: "SF",
+    semalar.FaturaTuruEnum.ALIS: "AF",
+    semalar.FaturaTuruEnum.SATIS_IADE: "SI",
+    semalar.FaturaTuruEnum.ALIS_IADE: "AI",
+    semalar.FaturaTuruEnum.DEVIR_GIRIS: "DG",
+}
+BELGE_NUMARA_HANELERI = {
+    **{onek: 9 for onek in FATURA_NUMARA_ONEKLERI.values()},
+    "M": 9, # Müşteri kodu
+    "T": 9, # Tedarikçi kodu
+    "STK": 9, # Stok kodu
+    "S-": 6, # Sipariş numarası
+}
+
+def belge_numarasi_bicimle(onek: str, deger: int) -> str:
+    return f"{onek}{deger:0{BELGE_NUMARA_HANELERI[onek]}d}"
+
+def belge_numarasi_ayir(db: Session, kullanici_id: int, onek: str, adet: int = 1) -> Tuple[int, int]:
+    """
+    Kullanıcının önek sayacını adet kadar ilerletir ve ayrılan aralığı (ilk, son) döndürür.
+    Tek bir INSERT ... ON CONFLICT DO UPDATE ... RETURNING ile çalışır: mevcut en büyük numarayı bulmak için
+    tablo taranmaz ve eşzamanlı istekler aynı numarayı alamaz (satır kilidi commit'e kadar tutulur).
+    Commit çağıran tarafa bırakılır; işlem geri alınırsa numaralar da geri alınır.
+    """
+    if onek not in BELGE_NUMARA_HANELERI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Bilinmeyen belge öneki: {onek}")
+    BelgeSayaci = modeller.BelgeSayaci
+    stmt = pg_insert(BelgeSayaci).values(kullanici_id=kullanici_id, onek=onek, son_deger=adet)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BelgeSayaci.kullanici_id, BelgeSayaci.onek],
+        set_={"son_deger": BelgeSayaci.son_deger + stmt.excluded.son_deger}
+    ).returning(BelgeSayaci.son_deger)
+    son = db.execute(stmt).scalar_one()
+    return son - adet + 1, son
+
+def siradaki_belge_numarasi(db: Session, kullanici_id: int, onek: str) -> str:
+    """Önek için bir sonraki numarayı ayırır ve biçimlendirilmiş halini döndürür."""
+    _, son = belge_numarasi_ayir(db, kullanici_id, onek)
+    return belge_numarasi_bicimle(onek, son)
+
+def belge_numarasi_onizle(db: Session, kullanici_id: int, onek: str) -> str:
+    """
+    Önek için sıradaki numarayı sayacı ilerletmeden döndürür (form önizlemesi). Numara ayrılmaz; kayıt
+    oluşturulurken gönderilen numara belge_sayaclarini_esitle ile sayaca işlenir.
+    """
+    if onek not in BELGE_NUMARA_HANELERI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Bilinmeyen belge öneki: {onek}")
+    BelgeSayaci = modeller.BelgeSayaci
+    son = db.query(BelgeSayaci.son_deger).filter(
+        BelgeSayaci.kullanici_id == kullanici_id, BelgeSayaci.onek == onek
+    ).scalar()
+    return belge_numarasi_bicimle(onek, (son or 0) + 1)
+
+def belge_sayaclarini_esitle(db: Session, kullanici_id: int, onekler: Sequence[str], numaralar):
+    """
+    Elle girilen veya içe aktarılan numaralardan, verilen öneklerin sayacının üretebileceği biçimde olanları
+    (örn. M000000042) bulur ve sayacı GREATEST(son_deger, numara) ile en az o değere çeker. Böylece sayaç
+    sonradan kullanımdaki bir numarayı vermez. Önek başına tek satır, önek sırasıyla tek ifadede yazılır.
+    """
+    en_buyukler: Dict[str, int] = {}
+    for numara in numaralar:
+        for onek in onekler:
+            rakamlar = numara[len(onek):] if isinstance(numara, str) and numara.startswith(onek) else ""
+            # bigint sınırı aşılmasın diye 18 haneden uzunlar dikkate alınmaz.
+            if not rakamlar.isdigit() or not rakamlar.isascii() or len(rakamlar) > 18:
+                continue
+            deger = int(rakamlar)
+            if belge_numarasi_bicimle(onek, deger) == numara and deger > en_buyukler.get(onek, 0):
+                en_buyukler[onek] = deger
+    if not en_buyukler:
+        return
+    BelgeSayaci = modeller.BelgeSayaci
+    stmt = pg_insert(BelgeSayaci).values([
+        {"kullanici_id": kullanici_id, "onek": onek, "son_deger": deger} for onek, deger in sorted(en_buyukler.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BelgeSayaci.kullanici_id, BelgeSayaci.onek],
+        set_={"son_deger": func.greatest(BelgeSayaci.son_deger, stmt.excluded.son_deger)}
+    )
+    db.execute(stmt)
+
+def _enum_degeri(deger):
+    """Enum ise .value, değilse kendisini döndürür."""
+    return getattr(deger, "value", deger)
+
+def _cari_hareket_delta(islem_yone, tutar) -> float:
+    """Bir cari hareketin bakiyeye etkisi: ALACAK (+), BORC (-). Diğer yönler bakiyeyi etkilemez."""
+    yon = _enum_degeri(islem_yone)
+    if yon == semalar.IslemYoneEnum.ALACAK.value:
+        return float(tutar or 0.0)
+    if yon == semalar.IslemYoneEnum.BORC.value:
+        return -float(tutar or 0.0)
+    return 0.0
+
+def _cari_bakiye_delta_uygula(db: Session, cari_id: int, cari_tip, kullanici_id: int, delta: float):
+    """
+    cari_hesaplar tablosundaki bakiyeyi 'bakiye = bakiye + delta' şeklinde atomik olarak günceller.
+    Satır yoksa INSERT ... ON CONFLICT ile oluşturulur; okuma-yazma yarışına girilmez.
+    """
+    if not cari_id or not delta:
+        return
+    stmt = pg_insert(modeller.CariHesap).values(
+        cari_id=cari_id,
+        cari_tip=_enum_degeri(cari_tip),
+        kullanici_id=kullanici_id,
+        bakiye=delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[modeller.CariHesap.kullanici_id, modeller.CariHesap.cari_tip, modeller.CariHesap.cari_id],
+        set_={"bakiye": modeller.CariHesap.bakiye + stmt.excluded.bakiye}
+    )
+    db.execute(stmt)
+
+def _cari_hareket_bakiyeye_isle(db: Session, hareket: modeller.CariHareket, isaret: int = 1):
+    """Yeni eklenen (isaret=1) veya silinecek (isaret=-1) tek bir cari hareketi bakiyeye yansıtır."""
+    _cari_bakiye_delta_uygula(
+        db, hareket.cari_id, hareket.cari_tip, hareket.kullanici_id,
+        isaret * _cari_hareket_delta(hareket.islem_yone, hareket.tutar)
+    )
+
+def _cari_hareketleri_bakiyeden_dus(db: Session, *kosullar):
+    """
+    Verilen koşullara uyan cari hareketler silinmeden ÖNCE çağrılır.
+    Etkilenen her cari için toplam etki tek bir gruplanmış sorguyla bulunur ve bakiyeden düşülür.
+    """
+    CariHareket = modeller.CariHareket
+    etki = func.coalesce(func.sum(case(
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.ALACAK, CariHareket.tutar),
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.BORC, -CariHareket.tutar),
+        else_=0
+    )), 0)
+    gruplar = db.query(
+        CariHareket.cari_id, CariHareket.cari_tip, CariHareket.kullanici_id, etki.label("etki")
+    ).filter(and_(*kosullar)).group_by(
+        CariHareket.cari_id, CariHareket.cari_tip, CariHareket.kullanici_id
+    ).all()
+    for grup in gruplar:
+        _cari_bakiye_delta_uygula(db, grup.cari_id, grup.cari_tip, grup.kullanici_id, -grup.etki)
+
+def cari_bakiyelerini_yeniden_olustur(db: Session, kullanici_id: Optional[int] = None, cari_id: Optional[int] = None, cari_tip: Optional[str] = None) -> int:
+    """
+    cari_hesaplar tablosunu cari_hareketler üzerinden tek geçişte yeniden kurar (mutabakat).
+    Filtre verilmezse tüm kullanıcılar için çalışır. Commit çağıran tarafa bırakılır.
+    Oluşturulan bakiye satırı sayısını döndürür.
+    """
+    CariHareket = modeller.CariHareket
+    CariHesap = modeller.CariHesap
+
+    hareket_kosullari = []
+    hesap_kosullari = []
+    if kullanici_id is not None:
+        hareket_kosullari.append(CariHareket.kullanici_id == kullanici_id)
+        hesap_kosullari.append(CariHesap.kullanici_id == kullanici_id)
+    if cari_id is not None:
+        hareket_kosullari.append(CariHareket.cari_id == cari_id)
+        hesap_kosullari.append(CariHesap.cari_id == cari_id)
+    if cari_tip is not None:
+        hareket_kosullari.append(CariHareket.cari_tip == _enum_degeri(cari_tip))
+        hesap_kosullari.append(CariHesap.cari_tip == _enum_degeri(cari_tip))
+
+    db.query(CariHesap).filter(*hesap_kosullari).delete(synchronize_session=False)
 
-        if cari:
-            # Not: Musteri/Tedarikci modellerinde bakiye kolonu olduğu varsayılır.
-            setattr(cari, 'net_bakiye', guncel_bakiye) # net_bakiye alanı kullanıldığı varsayılmıştır
-            db.commit()
-            db.refresh(cari)
-            logger.info(f"Cari ID {cari_id} için bakiye başarıyla güncellendi. Yeni bakiye: {guncel_bakiye}")
-        else:
-            logger.warning(f"Cari ID {cari_id} bulunamadığı için bakiye güncellenemedi.")
+    etki = func.coalesce(func.sum(case(
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.ALACAK, CariHareket.tutar),
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.BORC, -CariHareket.tutar),
+        else_=0
+    )), 0)
+    kaynak = db.query(
+        CariHareket.cari_id, CariHareket.cari_tip, CariHareket.kullanici_id, etki
+    ).filter(*hareket_kosullari).group_by(
+        CariHareket.cari_id, CariHareket.cari_tip, CariHareket.kullanici_id
+    )
+    sonuc = db.execute(
+        modeller.CariHesap.__table__.insert().from_select(
+            ["cari_id", "cari_tip", "kullanici_id", "bakiye"], kaynak.statement
+        )
+    )
+    return sonuc.rowcount or 0
 
+def _cari_bakiyesini_guncelle(db: Session, cari_id: int, cari_tipi: str, kullanici_id: int):
+    """
+    Belirli bir carinin (Müşteri/Tedarikçi) cari_hesaplar bakiyesini hareketlerden SQL tarafında yeniden hesaplar.
+    Normal akışta bakiye artımlı tutulur; bu fonksiyon tek bir carinin mutabakatı için kullanılır.
+    """
+    try:
+        cari_bakiyelerini_yeniden_olustur(db, kullanici_id=kullanici_id, cari_id=cari_id, cari_tip=cari_tipi)
+        db.commit()
+        logger.info(f"Cari ID {cari_id} ({cari_tipi}) için bakiye yeniden hesaplandı.")
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Cari bakiye güncellenirken veritabanı hatası: {e}", exc_info=True)
@@ -52,4 +355,328 @@ def _cari_bakiyesini_guncelle(db: Session, cari_id: int, cari_tipi: str, kullani
     except Exception as e:
         db.rollback()
         logger.error(f"Cari bakiye güncellenirken beklenmeyen bir hata oluştu: {e}", exc_info=True)
-        raise e
\ No newline at end of file
+        raise e
+
+GUNLUK_OZET_ALANLARI = (
+    "satis_toplami", "satis_maliyeti", "alis_toplami",
+    "gelir_toplami", "gider_toplami", "nakit_giris", "nakit_cikis"
+)
+# Hesap açılışında yazılan kasa/banka hareketi bakiyeyi kurar; dönem içi nakit giriş/çıkışı değildir,
+# bu yüzden günlük özetin nakit alanlarına katılmaz.
+KASA_ACILIS_ISLEM_TURU = "Açılış Bakiyesi"
+
+# Fatura türüne göre stok miktarının yönü ve yazılacak stok hareketi tipi.
+FATURA_STOK_YONLERI = {
+    semalar.FaturaTuruEnum.SATIS: -1,
+    semalar.FaturaTuruEnum.ALIS: 1,
+    semalar.FaturaTuruEnum.SATIS_IADE: 1,
+    semalar.FaturaTuruEnum.ALIS_IADE: -1,
+    semalar.FaturaTuruEnum.DEVIR_GIRIS: 1,
+}
+FATURA_STOK_ISLEM_TIPLERI = {
+    semalar.FaturaTuruEnum.SATIS: semalar.StokIslemTipiEnum.SATIŞ,
+    semalar.FaturaTuruEnum.ALIS: semalar.StokIslemTipiEnum.ALIŞ,
+    semalar.FaturaTuruEnum.SATIS_IADE: semalar.StokIslemTipiEnum.SATIŞ_İADE,
+    semalar.FaturaTuruEnum.ALIS_IADE: semalar.StokIslemTipiEnum.ALIŞ_İADE,
+    semalar.FaturaTuruEnum.DEVIR_GIRIS: semalar.StokIslemTipiEnum.GIRIS,
+}
+
+def _satirlari_kilitle(db: Session, model, kolon, kullanici_id: int, idler) -> Dict[int, float]:
+    """
+    Verilen satırları tek bir SELECT ... ORDER BY id FOR UPDATE ile kilitler ve kolonun güncel değerini döndürür.
+    Kilitler her istekte aynı (id) sırasıyla alındığından aynı satırlara dokunan eşzamanlı belgeler
+    birbirini bekler; kayıp güncelleme ve kilitlenme (deadlock) oluşmaz. Bulunamayan id'ler sonuçta yer almaz.
+    """
+    idler = sorted(set(idler))
+    if not idler:
+        return {}
+    satirlar = db.execute(
+        select(model.id, kolon)
+        .where(model.id.in_(idler), model.kullanici_id == kullanici_id)
+        .order_by(model.id)
+        .with_for_update()
+    ).all()
+    return {satir[0]: satir[1] or 0.0 for satir in satirlar}
+
+def _farklari_uygula(db: Session, model, kolon, kullanici_id: int, farklar: Dict[int, float]):
+    """Satır bazındaki farkları tek bir UPDATE ... SET kolon = kolon + fark FROM (VALUES ...) ile uygular."""
+    farklar = {satir_id: fark for satir_id, fark in farklar.items() if fark}
+    if not farklar:
+        return
+    fark_tablosu = values(column("id", Integer), column("fark", Float), name="farklar").data(sorted(farklar.items()))
+    db.execute(
+        update(model)
+        .where(model.id == fark_tablosu.c.id, model.kullanici_id == kullanici_id)
+        .values({kolon: func.coalesce(kolon, 0) + fark_tablosu.c.fark})
+        .execution_options(synchronize_session=False)
+    )
+
+def _faturalar_stoklarini_isle(db: Session, kullanici_id: int, faturalar: Sequence[Tuple[modeller.Fatura, Sequence]], isaret: int = 1, hareket_yaz: bool = True):
+    """
+    Bir veya daha fazla faturanın kalemlerinin stok etkisini uygular (isaret=1) veya geri alır (isaret=-1).
+    faturalar (fatura, kalemler) çiftleridir; kalemler urun_id, miktar ve birim_fiyat alanlarına sahip nesnelerdir
+    (Pydantic kalem veya FaturaKalemi). Tüm ürünler tek sorguda kilitlenir, miktarlar tek UPDATE ile yazılır ve
+    hareket_yaz ise stok hareketleri tek bir toplu INSERT ile eklenir. Bulunamayan ürün için 404 verilir.
+    """
+    Stok = modeller.Stok
+    faturalar = [(fatura, kalemler) for fatura, kalemler in faturalar if FATURA_STOK_YONLERI.get(fatura.fatura_turu) and kalemler]
+    if not faturalar:
+        return
+
+    stoklar = _satirlari_kilitle(db, Stok, Stok.miktar, kullanici_id, [kalem.urun_id for _, kalemler in faturalar for kalem in kalemler])
+    farklar: Dict[int, float] = defaultdict(float)
+    hareketler = []
+    for fatura, kalemler in faturalar:
+        yon = FATURA_STOK_YONLERI[fatura.fatura_turu]
+        aciklama = f"{fatura.fatura_no} nolu fatura ({_enum_degeri(fatura.fatura_turu)})"
+        for kalem in kalemler:
+            if kalem.urun_id not in stoklar:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ürün ID {kalem.urun_id} bulunamadı.")
+            # Aynı ürün birden fazla kalemde olabilir; önceki/sonraki stok kalem sırasıyla yürütülür.
+            fark = isaret * yon * kalem.miktar
+            onceki_stok = stoklar[kalem.urun_id]
+            stoklar[kalem.urun_id] = onceki_stok + fark
+            farklar[kalem.urun_id] += fark
+            if hareket_yaz:
+                hareketler.append({
+                    "urun_id": kalem.urun_id,
+                    "tarih": fatura.tarih,
+                    "islem_tipi": FATURA_STOK_ISLEM_TIPLERI[fatura.fatura_turu],
+                    "miktar": kalem.miktar,
+                    "birim_fiyat": kalem.birim_fiyat,
+                    "aciklama": aciklama,
+                    "kaynak": semalar.KaynakTipEnum.FATURA.value,
+                    "kaynak_id": fatura.id,
+                    "onceki_stok": onceki_stok,
+                    "sonraki_stok": stoklar[kalem.urun_id],
+                    "kullanici_id": kullanici_id,
+                })
+
+    _farklari_uygula(db, Stok, Stok.miktar, kullanici_id, farklar)
+    if hareketler:
+        db.execute(insert(modeller.StokHareket), hareketler)
+
+def _fatura_stoklarini_isle(db: Session, fatura: modeller.Fatura, kalemler: Sequence, isaret: int = 1, hareket_yaz: bool = True):
+    """Tek bir faturanın stok etkisini uygular veya geri alır (bkz. _faturalar_stoklarini_isle)."""
+    _faturalar_stoklarini_isle(db, fatura.kullanici_id, [(fatura, kalemler)], isaret=isaret, hareket_yaz=hareket_yaz)
+
+def _gunluk_ozet_delta_uygula(db: Session, kullanici_id: int, tarih: date, **deltalar):
+    """
+    gunluk_ozet tablosundaki (kullanici_id, tarih) satırına verilen farkları 'alan = alan + delta' olarak ekler.
+    Satır yoksa INSERT ... ON CONFLICT ile oluşturulur (cari_hesaplar ile aynı yöntem).
+    """
+    deltalar = {alan: float(deger) for alan, deger in deltalar.items() if deger}
+    if not kullanici_id or not tarih or not deltalar:
+        return
+    GunlukOzet = modeller.GunlukOzet
+    stmt = pg_insert(GunlukOzet).values(
+        kullanici_id=kullanici_id,
+        tarih=tarih,
+        **{alan: deltalar.get(alan, 0.0) for alan in GUNLUK_OZET_ALANLARI}
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GunlukOzet.kullanici_id, GunlukOzet.tarih],
+        set_={alan: getattr(GunlukOzet, alan) + getattr(stmt.excluded, alan) for alan in deltalar}
+    )
+    db.execute(stmt)
+
+def _fatura_gunluk_ozete_isle(db: Session, fatura: modeller.Fatura, isaret: int = 1):
+    """
+    Faturayı günlük özete ekler (isaret=1) veya çıkarır (isaret=-1).
+    Eklemede kalemler eklendikten SONRA, çıkarmada kalemler silinmeden ÖNCE çağrılmalıdır (maliyet kalemlerden okunur).
+    """
+    if fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
+        db.flush()
+        maliyet = db.query(
+            func.coalesce(func.sum(modeller.FaturaKalemi.miktar * modeller.FaturaKalemi.alis_fiyati_fatura_aninda), 0)
+        ).filter(modeller.FaturaKalemi.fatura_id == fatura.id).scalar()
+        _gunluk_ozet_delta_uygula(
+            db, fatura.kullanici_id, fatura.tarih,
+            satis_toplami=isaret * (fatura.genel_toplam or 0.0),
+            satis_maliyeti=isaret * (maliyet or 0.0)
+        )
+    elif fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
+        _gunluk_ozet_delta_uygula(db, fatura.kullanici_id, fatura.tarih, alis_toplami=isaret * (fatura.genel_toplam or 0.0))
+
+def _gelir_gider_gunluk_ozete_isle(db: Session, kayit: modeller.GelirGider, isaret: int = 1):
+    """Gelir/gider kaydını günlük özete ekler (isaret=1) veya çıkarır (isaret=-1)."""
+    alan = "gelir_toplami" if kayit.tip == semalar.GelirGiderTipEnum.GELİR else "gider_toplami"
+    _gunluk_ozet_delta_uygula(db, kayit.kullanici_id, kayit.tarih, **{alan: isaret * (kayit.tutar or 0.0)})
+
+def _kasa_hareket_gunluk_ozete_isle(db: Session, hareket: modeller.KasaBankaHareket, isaret: int = 1):
+    """Kasa/banka hareketini günlük nakit giriş/çıkışına ekler (isaret=1) veya çıkarır (isaret=-1)."""
+    if hareket.islem_turu == KASA_ACILIS_ISLEM_TURU:
+        return
+    if hareket.islem_yone == semalar.IslemYoneEnum.GIRIS:
+        alan = "nakit_giris"
+    elif hareket.islem_yone == semalar.IslemYoneEnum.CIKIS:
+        alan = "nakit_cikis"
+    else:
+        return
+    _gunluk_ozet_delta_uygula(db, hareket.kullanici_id, hareket.tarih, **{alan: isaret * (hareket.tutar or 0.0)})
+
+def _kasa_hareketleri_gunluk_ozetten_dus(db: Session, *kosullar):
+    """
+    Verilen koşullara uyan kasa/banka hareketleri toplu silinmeden ÖNCE çağrılır.
+    Etkilenen günler tek bir gruplanmış sorguyla bulunur ve nakit toplamlarından düşülür.
+    """
+    KasaBankaHareket = modeller.KasaBankaHareket
+    gruplar = db.query(
+        KasaBankaHareket.kullanici_id,
+        KasaBankaHareket.tarih,
+        func.coalesce(func.sum(case((KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.GIRIS, KasaBankaHareket.tutar), else_=0)), 0).label("giris"),
+        func.coalesce(func.sum(case((KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.CIKIS, KasaBankaHareket.tutar), else_=0)), 0).label("cikis")
+    ).filter(
+        and_(*kosullar), KasaBankaHareket.islem_turu.is_distinct_from(KASA_ACILIS_ISLEM_TURU)
+    ).group_by(KasaBankaHareket.kullanici_id, KasaBankaHareket.tarih).all()
+    for grup in gruplar:
+        _gunluk_ozet_delta_uygula(db, grup.kullanici_id, grup.tarih, nakit_giris=-grup.giris, nakit_cikis=-grup.cikis)
+
+def _stok_hareketlerini_geri_al(db: Session, kullanici_id: int, *kosullar):
+    """
+    Verilen koşullara uyan fatura kaynaklı stok hareketleri silinmeden ÖNCE çağrılır.
+    Ürün başına net etki tek bir gruplanmış alt sorguda hesaplanır ve stoklara tek bir UPDATE ... FROM ile
+    ters olarak yansıtılır. Etkilenen stoklar önce id sırasıyla kilitlenir (bkz. _satirlari_kilitle).
+    """
+    Stok, StokHareket = modeller.Stok, modeller.StokHareket
+    yonler = {FATURA_STOK_ISLEM_TIPLERI[fatura_turu]: yon for fatura_turu, yon in FATURA_STOK_YONLERI.items()}
+    etki = func.sum(case(
+        *[(StokHareket.islem_tipi == islem_tipi, yon * StokHareket.miktar) for islem_tipi, yon in yonler.items()],
+        else_=0
+    ))
+    etkiler = select(StokHareket.urun_id.label("urun_id"), etki.label("etki")) \
+        .where(and_(*kosullar)).group_by(StokHareket.urun_id).subquery("etkiler")
+
+    urun_idleri = db.scalars(select(etkiler.c.urun_id)).all()
+    if not _satirlari_kilitle(db, Stok, Stok.miktar, kullanici_id, urun_idleri):
+        return
+    db.execute(
+        update(Stok)
+        .where(Stok.id == etkiler.c.urun_id, Stok.kullanici_id == kullanici_id)
+        .values(miktar=func.coalesce(Stok.miktar, 0) - func.coalesce(etkiler.c.etki, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+def _kasa_hareketlerini_bakiyeden_dus(db: Session, kullanici_id: int, *kosullar):
+    """
+    Verilen koşullara uyan kasa/banka hareketleri silinmeden ÖNCE çağrılır.
+    Hesap başına net etki (GIRIS +, CIKIS -) gruplanmış alt sorguyla bulunur ve bakiyelerden tek bir
+    UPDATE ... FROM ile düşülür; günlük özetteki nakit toplamları da düzeltilir.
+    """
+    KasaBankaHesap, KasaBankaHareket = modeller.KasaBankaHesap, modeller.KasaBankaHareket
+    etki = func.sum(case(
+        (KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.GIRIS, KasaBankaHareket.tutar),
+        (KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.CIKIS, -KasaBankaHareket.tutar),
+        else_=0
+    ))
+    etkiler = select(KasaBankaHareket.kasa_banka_id.label("kasa_banka_id"), etki.label("etki")) \
+        .where(and_(*kosullar)).group_by(KasaBankaHareket.kasa_banka_id).subquery("etkiler")
+
+    _kasa_hareketleri_gunluk_ozetten_dus(db, *kosullar)
+    kasa_idleri = db.scalars(select(etkiler.c.kasa_banka_id)).all()
+    if not _satirlari_kilitle(db, KasaBankaHesap, KasaBankaHesap.bakiye, kullanici_id, [kasa_id for kasa_id in kasa_idleri if kasa_id]):
+        return
+    db.execute(
+        update(KasaBankaHesap)
+        .where(KasaBankaHesap.id == etkiler.c.kasa_banka_id, KasaBankaHesap.kullanici_id == kullanici_id)
+        .values(bakiye=func.coalesce(KasaBankaHesap.bakiye, 0) - func.coalesce(etkiler.c.etki, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+def _faturalari_gunluk_ozetten_dus(db: Session, kullanici_id: int, fatura_idler: Sequence[int]):
+    """
+    Silinecek faturaların günlük özete katkısını gün bazında iki gruplanmış sorguyla bulup düşer.
+    Satış maliyeti kalemlerden okunduğundan kalemler silinmeden ÖNCE çağrılmalıdır.
+    """
+    Fatura, FaturaKalemi = modeller.Fatura, modeller.FaturaKalemi
+    kosullar = (Fatura.id.in_(fatura_idler), Fatura.kullanici_id == kullanici_id)
+    farklar: Dict[date, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    for grup in db.query(
+        Fatura.tarih,
+        func.coalesce(func.sum(case((Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS, Fatura.genel_toplam), else_=0)), 0).label("satis"),
+        func.coalesce(func.sum(case((Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS, Fatura.genel_toplam), else_=0)), 0).label("alis")
+    ).filter(*kosullar).group_by(Fatura.tarih).all():
+        farklar[grup.tarih]["satis_toplami"] -= grup.satis
+        farklar[grup.tarih]["alis_toplami"] -= grup.alis
+
+    for grup in db.query(
+        Fatura.tarih,
+        func.coalesce(func.sum(FaturaKalemi.miktar * FaturaKalemi.alis_fiyati_fatura_aninda), 0).label("maliyet")
+    ).join(FaturaKalemi, FaturaKalemi.fatura_id == Fatura.id).filter(
+        *kosullar, Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS
+    ).group_by(Fatura.tarih).all():
+        farklar[grup.tarih]["satis_maliyeti"] -= grup.maliyet
+
+    for tarih, alanlar in sorted(farklar.items()):
+        _gunluk_ozet_delta_uygula(db, kullanici_id, tarih, **alanlar)
+
+def gunluk_ozeti_yeniden_olustur(db: Session, kullanici_id: Optional[int] = None) -> int:
+    """
+    gunluk_ozet tablosunu faturalar, fatura_kalemleri, gelir_giderler ve kasa_banka_hareketleri üzerinden
+    tek bir INSERT ... SELECT ile yeniden kurar (ilk doldurma ve mutabakat için).
+    kullanici_id verilmezse tüm kullanıcılar için çalışır. Commit çağıran tarafa bırakılır. Oluşan gün satırı sayısını döndürür.
+    """
+    Fatura = modeller.Fatura
+    FaturaKalemi = modeller.FaturaKalemi
+    GelirGider = modeller.GelirGider
+    KasaBankaHareket = modeller.KasaBankaHareket
+    GunlukOzet = modeller.GunlukOzet
+
+    def _kaynak(model, tarih_kolonu, kullanici_kolonu, degerler, *kosullar, kaynak_tablo=None):
+        # Her kaynak, tüm özet alanlarını aynı sırada üretir; katkı vermediği alanlar 0 olur.
+        kolonlar = [kullanici_kolonu.label("kullanici_id"), tarih_kolonu.label("tarih")]
+        kolonlar += [degerler.get(alan, literal(0.0, Float)).label(alan) for alan in GUNLUK_OZET_ALANLARI]
+        sorgu = select(*kolonlar).select_from(kaynak_tablo if kaynak_tablo is not None else model).where(*kosullar)
+        if kullanici_id is not None:
+            sorgu = sorgu.where(kullanici_kolonu == kullanici_id)
+        return sorgu
+
+    faturalar = _kaynak(
+        Fatura, Fatura.tarih, Fatura.kullanici_id,
+        {
+            "satis_toplami": case((Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS, Fatura.genel_toplam), else_=0),
+            "alis_toplami": case((Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS, Fatura.genel_toplam), else_=0),
+        },
+        Fatura.fatura_turu.in_([semalar.FaturaTuruEnum.SATIS, semalar.FaturaTuruEnum.ALIS])
+    )
+    maliyetler = _kaynak(
+        FaturaKalemi, Fatura.tarih, Fatura.kullanici_id,
+        {"satis_maliyeti": FaturaKalemi.miktar * FaturaKalemi.alis_fiyati_fatura_aninda},
+        Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
+        kaynak_tablo=FaturaKalemi.__table__.join(Fatura.__table__, FaturaKalemi.fatura_id == Fatura.id)
+    )
+    gelir_giderler = _kaynak(
+        GelirGider, GelirGider.tarih, GelirGider.kullanici_id,
+        {
+            "gelir_toplami": case((GelirGider.tip == semalar.GelirGiderTipEnum.GELİR, GelirGider.tutar), else_=0),
+            "gider_toplami": case((GelirGider.tip == semalar.GelirGiderTipEnum.GİDER, GelirGider.tutar), else_=0),
+        }
+    )
+    kasa_hareketleri = _kaynak(
+        KasaBankaHareket, KasaBankaHareket.tarih, KasaBankaHareket.kullanici_id,
+        {
+            "nakit_giris": case((KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.GIRIS, KasaBankaHareket.tutar), else_=0),
+            "nakit_cikis": case((KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.CIKIS, KasaBankaHareket.tutar), else_=0),
+        },
+        KasaBankaHareket.kullanici_id.isnot(None),
+        KasaBankaHareket.tarih.isnot(None),
+        KasaBankaHareket.islem_turu.is_distinct_from(KASA_ACILIS_ISLEM_TURU)
+    )
+
+    birlesik = union_all(faturalar, maliyetler, gelir_giderler, kasa_hareketleri).subquery("kaynaklar")
+    toplamlar = select(
+        birlesik.c.kullanici_id,
+        birlesik.c.tarih,
+        *[func.coalesce(func.sum(birlesik.c[alan]), 0).label(alan) for alan in GUNLUK_OZET_ALANLARI]
+    ).group_by(birlesik.c.kullanici_id, birlesik.c.tarih)
+
+    silme = db.query(GunlukOzet)
+    if kullanici_id is not None:
+        silme = silme.filter(GunlukOzet.kullanici_id == kullanici_id)
+    silme.delete(synchronize_session=False)
+
+    sonuc = db.execute(
+        GunlukOzet.__table__.insert().from_select(["kullanici_id", "tarih", *GUNLUK_OZET_ALANLARI], toplamlar)
+    )
+    return sonuc.rowcount or 0
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from .. import modeller, semalar, guvenlik
 from ..veritabani import get_db
+from .api_yardimcilar import _cari_hareket_bakiyeye_isle, sayfala, _kasa_hareket_gunluk_ozete_isle, _kasa_hareketleri_gunluk_ozetten_dus
 from datetime import date
 from sqlalchemy import and_ # and_ import edildi
 
@@ -20,6 +21,9 @@ def read_cari_hareketler(
     cari_tip: Optional[semalar.CariTipiEnum] = None,
     baslangic_tarihi: Optional[date] = None,
     bitis_tarihi: Optional[date] = None,
+    after: Optional[str] = Query(None, description="İmleç modunda önceki sayfanın next_cursor değeri"),
+    cursor: bool = Query(False, description="Ofset yerine imleç (keyset) sayfalaması kullan"),
+    include_total: bool = Query(False, description="İmleç modunda toplam kayıt sayısını da hesapla"),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user), # JWT ile kullanıcı bilgisi
     db: Session = Depends(get_db)
 ):
@@ -36,14 +40,16 @@ def read_cari_hareketler(
     if bitis_tarihi:
         query = query.filter(modeller.CariHareket.tarih <= bitis_tarihi)
 
-    total_count = query.count()
-    # HATA DÜZELTİLDİ: Eksik olan 'olusturma_tarihi_saat' kolonuna göre sıralama eklendi.
-    hareketler = query.order_by(modeller.CariHareket.tarih.desc(), modeller.CariHareket.olusturma_tarihi_saat.desc()).offset(skip).limit(limit).all()
+    # Aynı gün içindeki kayıtlar id ile (oluşturulma sırası) sıralanır; bu anahtar imleç için de benzersizdir.
+    hareketler, total_count, next_cursor = sayfala(
+        query, (modeller.CariHareket.tarih, modeller.CariHareket.id), limit,
+        skip=skip, after=after, imlec_modu=cursor, toplam_iste=include_total
+    )
 
     # Yanıt modeline uygun hale getirme
     items = [modeller.CariHareketRead.model_validate(h, from_attributes=True) for h in hareketler]
 
-    return {"items": items, "total": total_count}
+    return {"items": items, "total": total_count, "next_cursor": next_cursor}
 
 # --- VERİ OLUŞTURMA (CREATE) ---
 @router.post("/manuel", response_model=modeller.CariHareketRead)
@@ -62,6 +68,7 @@ def create_manuel_cari_hareket(
         )
         db.add(db_hareket)
         db.flush() # ID'yi almak için
+        _cari_hareket_bakiyeye_isle(db, db_hareket)
         
         # 2. İlişkili Kasa Hareketi ve Bakiye Güncelleme (Eğer kasa/banka kullanılıyorsa)
         if db_hareket.kasa_banka_id and db_hareket.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP:
@@ -86,6 +93,7 @@ def create_manuel_cari_hareket(
                     kullanici_id=current_user.id
                 )
                 db.add(db_kasa_banka_hareket)
+                _kasa_hareket_gunluk_ozete_isle(db, db_kasa_banka_hareket)
                 
                 # Kasa/Banka Bakiyesini Güncelle
                 db_kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == db_hareket.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == current_user.id).first()
@@ -150,14 +158,17 @@ def delete_cari_hareket(
                 db.add(kasa_hesabi)
 
             # 2. İlişkili KasaBankaHareket kaydını sil (KRİTİK EKSİKLİK GİDERİLDİ)
-            db.query(modeller.KasaBankaHareket).filter(
+            kasa_hareket_kosullari = (
                 modeller.KasaBankaHareket.kasa_banka_id == db_hareket.kasa_banka_id,
                 modeller.KasaBankaHareket.kaynak == db_hareket.kaynak, # Kaynak tipi eşleştirildi
                 modeller.KasaBankaHareket.kaynak_id == db_hareket.id,
                 modeller.KasaBankaHareket.kullanici_id == current_user.id
-            ).delete(synchronize_session=False)
+            )
+            _kasa_hareketleri_gunluk_ozetten_dus(db, *kasa_hareket_kosullari)
+            db.query(modeller.KasaBankaHareket).filter(*kasa_hareket_kosullari).delete(synchronize_session=False)
 
-        # 3. Cari Hareketi sil
+        # 3. Cari Hareketi sil (bakiye etkisi geri alınarak)
+        _cari_hareket_bakiyeye_isle(db, db_hareket, isaret=-1)
         db.delete(db_hareket)
         db.commit()
     except Exception as e:
@@ -4,6 +4,10 @@ from sqlalchemy import String, and_, func
 from typing import List, Optional
 from .. import semalar, modeller, guvenlik # guvenlik eklendi
 from ..veritabani import get_db
+from .api_yardimcilar import (
+    _cari_hareket_bakiyeye_isle, sayfala, pano_onbellegini_temizle,
+    _gelir_gider_gunluk_ozete_isle, _kasa_hareket_gunluk_ozete_isle, _kasa_hareketleri_gunluk_ozetten_dus
+)
 from datetime import date, datetime
 # .. import guvenlik # Zaten yukarıda import edildi
 
@@ -20,6 +24,9 @@ def read_gelir_gider(
     baslangic_tarihi: Optional[date] = None,
     bitis_tarihi: Optional[date] = None,
     aciklama_filtre: Optional[str] = None,
+    after: Optional[str] = Query(None, description="İmleç modunda önceki sayfanın next_cursor değeri"),
+    cursor: bool = Query(False, description="Ofset yerine imleç (keyset) sayfalaması kullan"),
+    include_total: bool = Query(False, description="İmleç modunda toplam kayıt sayısını da hesapla"),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -39,12 +46,10 @@ def read_gelir_gider(
     if aciklama_filtre:
         query = query.filter(modeller.GelirGider.aciklama.ilike(f"%{aciklama_filtre}%"))
     
-    # Total count için sorguyu oluştur
-    total_count = db.query(func.count(modeller.GelirGider.id)).filter(
-        and_(*query._where_criteria) 
-    ).scalar()
-
-    items = query.order_by(modeller.GelirGider.tarih.desc(), modeller.GelirGider.id.desc()).offset(skip).limit(limit).all()
+    items, total_count, next_cursor = sayfala(
+        query, (modeller.GelirGider.tarih, modeller.GelirGider.id), limit,
+        skip=skip, after=after, imlec_modu=cursor, toplam_iste=include_total
+    )
 
     # Model dönüşümü kısmı
     items = [
@@ -52,7 +57,7 @@ def read_gelir_gider(
         for gg in items
     ]
 
-    return {"items": items, "total": total_count}
+    return {"items": items, "total": total_count, "next_cursor": next_cursor}
 
 @router.get("/count", response_model=int)
 def get_gelir_gider_count(
@@ -103,6 +108,7 @@ def create_gelir_gider(
         )
         db.add(db_kayit)
         db.flush() # ID'yi almak için
+        _gelir_gider_gunluk_ozete_isle(db, db_kayit)
 
         # KRİTİK DÜZELTME: Kasa/Banka hareketleri oluşturulur
         if kayit.kasa_banka_id:
@@ -127,6 +133,7 @@ def create_gelir_gider(
                     kullanici_id=current_user.id
                 )
                 db.add(db_kasa_hareket)
+                _kasa_hareket_gunluk_ozete_isle(db, db_kasa_hareket)
 
             # Kasa/Banka Bakiyesini Güncelle (Güvenlik filtresi eklendi)
             kasa_hesabi = db.query(modeller.KasaBankaHesap).filter( 
@@ -169,8 +176,10 @@ def create_gelir_gider(
                     kullanici_id=current_user.id
                 )
                 db.add(db_cari_hareket)
+                _cari_hareket_bakiyeye_isle(db, db_cari_hareket)
 
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         db.refresh(db_kayit)
         
         kayit_model = modeller.GelirGiderRead.model_validate(db_kayit, from_attributes=True)
@@ -215,11 +224,13 @@ def delete_gelir_gider(
                     kasa_hesabi.bakiye += db_kayit.tutar
             
             # 2. İlişkili KasaBankaHareket kaydını sil
-            db.query(modeller.KasaBankaHareket).filter(
+            kasa_hareket_kosullari = (
                 modeller.KasaBankaHareket.kaynak == semalar.KaynakTipEnum.GELIR_GIDER.value,
                 modeller.KasaBankaHareket.kaynak_id == kayit_id,
                 modeller.KasaBankaHareket.kullanici_id == current_user.id
-            ).delete(synchronize_session=False)
+            )
+            _kasa_hareketleri_gunluk_ozetten_dus(db, *kasa_hareket_kosullari)
+            db.query(modeller.KasaBankaHareket).filter(*kasa_hareket_kosullari).delete(synchronize_session=False)
 
         # 3. İlişkili Cari Hareketi sil (kaynak ve kaynak_id üzerinden)
         cari_hareket = db.query(modeller.CariHareket).filter(
@@ -229,11 +240,14 @@ def delete_gelir_gider(
         ).first()
 
         if cari_hareket:
+            _cari_hareket_bakiyeye_isle(db, cari_hareket, isaret=-1)
             db.delete(cari_hareket)
 
         # 4. Ana Gelir/Gider kaydını sil
+        _gelir_gider_gunluk_ozete_isle(db, db_kayit, isaret=-1)
         db.delete(db_kayit)
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Gelir/Gider kaydı silinirken hata: {str(e)}")
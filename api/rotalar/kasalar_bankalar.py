@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from .. import semalar, modeller, guvenlik
 from ..veritabani import get_db
+from .api_yardimcilar import _cari_hareket_bakiyeye_isle, KASA_ACILIS_ISLEM_TURU
 from datetime import date
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -68,7 +69,7 @@ def create_kasa_banka(
             db_kasa_banka_hareket = modeller.KasaBankaHareket(
                 kasa_banka_id=db_hesap.id,
                 tarih=date.today(),
-                islem_turu="Açılış Bakiyesi",
+                islem_turu=KASA_ACILIS_ISLEM_TURU,
                 islem_yone=islem_yone, # Para kasaya girer (GIRIS) veya çıkar (CIKIS, eğer negatif bakiye ise)
                 tutar=abs(acilis_bakiyesi), # Tutar daima pozitif olmalı
                 aciklama="Açılış Bakiyesi",
@@ -76,6 +77,7 @@ def create_kasa_banka(
                 kaynak_id=None,
                 kullanici_id=current_user.id
             )
+            # Açılış bakiyesi dönem içi nakit akışı değildir; günlük özete işlenmez.
             db.add(db_kasa_banka_hareket)
 
             # CARİ HAREKET (Muhasebesel kayıt tutarlılığı için - Özel KASA_BANKA tipi ile)
@@ -94,6 +96,7 @@ def create_kasa_banka(
                 kullanici_id=current_user.id
             )
             db.add(db_cari_hareket)
+            _cari_hareket_bakiyeye_isle(db, db_cari_hareket)
             
         db.commit()
         db.refresh(db_hesap)
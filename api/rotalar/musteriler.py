@@ -7,6 +7,7 @@ from typing import List, Optional
 from .. import modeller, semalar
 from ..veritabani import get_db
 from ..api_servisler import CariHesaplamaService
+from .api_yardimcilar import bulanik_arama, belge_sayaclarini_esitle
 from .. import guvenlik
 
 router = APIRouter(prefix="/musteriler", tags=["Müşteriler"])
@@ -18,6 +19,8 @@ def create_musteri(
     db: Session = Depends(get_db)
 ):
     db_musteri = modeller.Musteri(**musteri.model_dump(exclude={"kullanici_id"}), kullanici_id=current_user.id)
+    # Kod elle girildiyse veya önizlemeden alındıysa sayaç en az bu koda çekilir.
+    belge_sayaclarini_esitle(db, current_user.id, ("M",), [db_musteri.kod])
     db.add(db_musteri)
     db.commit()
     db.refresh(db_musteri)
@@ -30,34 +33,35 @@ def read_musteriler(
     skip: int = 0,
     limit: int = 25,
     arama: Optional[str] = None,
-    aktif_durum: Optional[bool] = None
+    aktif_durum: Optional[bool] = None,
+    sirali: bool = Query(False, description="Arama sonuçlarını benzerliğe göre sırala (yazım hatalarına toleranslı)")
 ):
     # KRİTİK DÜZELTME: Sorgularda semalar.Musteri yerine modeller.Musteri kullanıldı.
     query = db.query(modeller.Musteri).filter(modeller.Musteri.kullanici_id == current_user.id)
 
+    skor = None
     if arama:
-        search_term = f"%{arama}%"
-        query = query.filter(
-            or_(
-                modeller.Musteri.ad.ilike(search_term),
-                modeller.Musteri.kod.ilike(search_term),
-                modeller.Musteri.telefon.ilike(search_term),
-                modeller.Musteri.vergi_no.ilike(search_term)
-            )
+        arama_kosulu, skor = bulanik_arama(
+            (modeller.Musteri.ad, modeller.Musteri.kod, modeller.Musteri.telefon, modeller.Musteri.vergi_no),
+            arama, sirali=sirali
         )
+        query = query.filter(arama_kosulu)
         
     if aktif_durum is not None:
         query = query.filter(modeller.Musteri.aktif == aktif_durum)
 
     total_count = query.count()
+    if skor is not None:
+        query = query.order_by(skor.desc(), modeller.Musteri.id)
     musteriler = query.offset(skip).limit(limit).all()
 
+    # Sayfadaki tüm carilerin bakiyeleri tek bir gruplanmış sorguda hesaplanır.
     cari_hizmeti = CariHesaplamaService(db)
+    bakiyeler = cari_hizmeti.calculate_cari_net_bakiyeler([musteri.id for musteri in musteriler], "MUSTERI", kullanici_id=current_user.id)
     musteriler_with_balance = []
     for musteri in musteriler:
-        net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri.id, "MUSTERI")
         musteri_dict = modeller.MusteriRead.model_validate(musteri).model_dump()
-        musteri_dict["net_bakiye"] = net_bakiye
+        musteri_dict["net_bakiye"] = bakiyeler.get(musteri.id, 0.0)
         musteriler_with_balance.append(musteri_dict)
 
     return {"items": musteriler_with_balance, "total": total_count}
@@ -75,7 +79,7 @@ def read_musteri(
 
     # Müşterinin cari net bakiyesini CariHesaplamaService üzerinden çekiyoruz.
     cari_hizmeti = CariHesaplamaService(db)
-    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri_id, "MUSTERI")
+    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri_id, "MUSTERI", kullanici_id=current_user.id)
     
     # ORM objesini Pydantic Read modeline dönüştürürken bakiye bilgisini ekliyoruz.
     musteri_read = modeller.MusteriRead.model_validate(musteri, from_attributes=True)
@@ -94,8 +98,11 @@ def update_musteri(
     db_musteri = db.query(modeller.Musteri).filter(modeller.Musteri.id == musteri_id, modeller.Musteri.kullanici_id == current_user.id).first()
     if not db_musteri:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Müşteri bulunamadı")
-    for key, value in musteri.model_dump(exclude_unset=True).items():
+    update_data = musteri.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(db_musteri, key, value)
+    if "kod" in update_data:
+        belge_sayaclarini_esitle(db, current_user.id, ("M",), [update_data["kod"]])
     db.commit()
     db.refresh(db_musteri)
     return db_musteri
@@ -126,5 +133,5 @@ def get_net_bakiye_endpoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Müşteri bulunamadı")
 
     cari_hizmeti = CariHesaplamaService(db)
-    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri_id, "MUSTERI")
+    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri_id, "MUSTERI", kullanici_id=current_user.id)
     return {"net_bakiye": net_bakiye}
\ No newline at end of file
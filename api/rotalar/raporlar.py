@@ -1,127 +1,127 @@
 # api/rotalar/raporlar.py dosyasının tamamı 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract, case, String
+from sqlalchemy import func, and_, extract, case, String, Date, DateTime, Float, tuple_, select, literal, text
 from datetime import date, datetime, timedelta
 from typing import Optional, List
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from .. import modeller, semalar, guvenlik
 from ..veritabani import get_db
 from ..api_servisler import CariHesaplamaService
-import openpyxl
+from ..rapor_yurutucu import paralel_sorgula
+from ..rapor_isleri import REPORTS_DIR, satis_raporu_excel_olustur, rapor_isi_baslat
+from .api_yardimcilar import imlec_olustur, imlec_coz, pano_onbellekten_al, pano_onbellege_yaz
 import os
 
 router = APIRouter(prefix="/raporlar", tags=["Raporlar"])
 
-REPORTS_DIR = "server_reports"
-os.makedirs(REPORTS_DIR, exist_ok=True)
-
 @router.get("/dashboard_ozet", response_model=modeller.PanoOzetiYanit)
 def get_dashboard_ozet_endpoint(
     baslangic_tarihi: date = Query(None, description="Başlangıç tarihi (YYYY-MM-DD)"),
     bitis_tarihi: date = Query(None, description="Bitiş tarihi (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
     kullanici_id = current_user.id
-    
-    # ORM modelleri zaten kullanılıyor.
-    satis_query = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.kullanici_id == kullanici_id,
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS
-    )
-    alis_query = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.kullanici_id == kullanici_id,
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS
-    )
-
-    tahsilat_query = db.query(func.sum(modeller.GelirGider.tutar)).filter(
-        modeller.GelirGider.kullanici_id == kullanici_id,
-        modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GELİR
-    )
-    odeme_query = db.query(func.sum(modeller.GelirGider.tutar)).filter(
-        modeller.GelirGider.kullanici_id == kullanici_id,
-        modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GİDER
-    )
+    today = date.today()
 
-    # Tarih filtreleri (modeller kullanılıyor)
-    if baslangic_tarihi:
-        satis_query = satis_query.filter(modeller.Fatura.tarih >= baslangic_tarihi)
-        alis_query = alis_query.filter(modeller.Fatura.tarih >= baslangic_tarihi)
-        tahsilat_query = tahsilat_query.filter(modeller.GelirGider.tarih >= baslangic_tarihi)
-        odeme_query = odeme_query.filter(modeller.GelirGider.tarih >= baslangic_tarihi)
-    if bitis_tarihi:
-        satis_query = satis_query.filter(modeller.Fatura.tarih <= bitis_tarihi)
-        alis_query = alis_query.filter(modeller.Fatura.tarih <= bitis_tarihi)
-        tahsilat_query = tahsilat_query.filter(modeller.GelirGider.tarih <= bitis_tarihi)
-        odeme_query = odeme_query.filter(modeller.GelirGider.tarih <= bitis_tarihi)
-
-    toplam_satislar = satis_query.scalar() or 0.0
-    toplam_alislar = alis_query.scalar() or 0.0
-    toplam_tahsilatlar = tahsilat_query.scalar() or 0.0
-    toplam_odemeler = odeme_query.scalar() or 0.0
-
-    # En çok satan ürünler (modeller kullanılıyor)
-    en_cok_satan_urunler_query = db.query(
-        modeller.Stok.ad,
+    # Vade hesapları bugüne bağlı olduğundan gün de anahtara dahildir.
+    onbellek_anahtari = (kullanici_id, baslangic_tarihi, bitis_tarihi, today)
+    onbellekteki = pano_onbellekten_al(onbellek_anahtari)
+    if onbellekteki is not None:
+        return onbellekteki
+
+    Fatura = modeller.Fatura
+    GunlukOzet = modeller.GunlukOzet
+    Stok = modeller.Stok
+
+    def _tarih_araligi(tarih_kolonu):
+        kosullar = []
+        if baslangic_tarihi:
+            kosullar.append(tarih_kolonu >= baslangic_tarihi)
+        if bitis_tarihi:
+            kosullar.append(tarih_kolonu <= bitis_tarihi)
+        return kosullar
+
+    def _kosullu_toplam(kolon, *kosullar):
+        return func.coalesce(func.sum(case((and_(*kosullar), kolon), else_=0)), 0)
+
+    # Her kaynak birer kez taranır; vade ve kritik stok toplamları koşullu SUM/COUNT ile aynı ifadede hesaplanır.
+    acik_hesap = Fatura.odeme_turu.cast(String) == semalar.OdemeTuruEnum.ACIK_HESAP.value
+    fatura_aralik = _tarih_araligi(Fatura.tarih)
+    fatura_ozet = select(
+        _kosullu_toplam(
+            Fatura.genel_toplam,
+            Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS, acik_hesap,
+            Fatura.vade_tarihi >= today, Fatura.vade_tarihi <= (today + timedelta(days=30))
+        ).label("vadesi_yaklasan_alacaklar_toplami"),
+        _kosullu_toplam(
+            Fatura.genel_toplam,
+            Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS, acik_hesap, Fatura.vade_tarihi < today
+        ).label("vadesi_gecmis_borclar_toplami")
+    ).where(Fatura.kullanici_id == kullanici_id).cte("fatura_ozet")
+
+    # Satış/alış ve tahsilat/ödeme toplamları günlük ön-toplam tablosundan okunur.
+    donem_ozet = select(
+        func.coalesce(func.sum(GunlukOzet.satis_toplami), 0).label("toplam_satislar"),
+        func.coalesce(func.sum(GunlukOzet.alis_toplami), 0).label("toplam_alislar"),
+        func.coalesce(func.sum(GunlukOzet.gelir_toplami), 0).label("toplam_tahsilatlar"),
+        func.coalesce(func.sum(GunlukOzet.gider_toplami), 0).label("toplam_odemeler")
+    ).where(GunlukOzet.kullanici_id == kullanici_id, *_tarih_araligi(GunlukOzet.tarih)).cte("donem_ozet")
+
+    stok_ozet = select(
+        func.count(Stok.id).label("kritik_stok_sayisi")
+    ).where(
+        Stok.kullanici_id == kullanici_id,
+        Stok.aktif == True,
+        Stok.miktar <= Stok.min_stok_seviyesi
+    ).cte("stok_ozet")
+
+    ozet_sorgusu = select(fatura_ozet, donem_ozet, stok_ozet) \
+        .select_from(fatura_ozet.join(donem_ozet, literal(True)).join(stok_ozet, literal(True)))
+
+    # En çok satan ürünler gruplama + sıralama gerektirdiğinden ikinci ifadedir.
+    en_cok_satan_sorgusu = select(
+        Stok.ad,
         func.sum(modeller.FaturaKalemi.miktar).label('toplam_miktar')
     ).join(
-        modeller.FaturaKalemi, modeller.Stok.id == modeller.FaturaKalemi.urun_id
+        modeller.FaturaKalemi, Stok.id == modeller.FaturaKalemi.urun_id
     ).join(
-        modeller.Fatura, modeller.FaturaKalemi.fatura_id == modeller.Fatura.id
+        Fatura, modeller.FaturaKalemi.fatura_id == Fatura.id
     ).filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
-        modeller.Stok.kullanici_id == kullanici_id
-    )
-    if baslangic_tarihi:
-        en_cok_satan_urunler_query = en_cok_satan_urunler_query.filter(modeller.Fatura.tarih >= baslangic_tarihi)
-    if bitis_tarihi:
-        en_cok_satan_urunler_query = en_cok_satan_urunler_query.filter(modeller.Fatura.tarih <= bitis_tarihi)
-
-    en_cok_satan_urunler = en_cok_satan_urunler_query.group_by(
-        modeller.Stok.ad
+        Fatura.kullanici_id == kullanici_id,
+        Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
+        Stok.kullanici_id == kullanici_id,
+        *fatura_aralik
+    ).group_by(
+        Stok.ad
     ).order_by(
         func.sum(modeller.FaturaKalemi.miktar).desc()
-    ).limit(5).all()
-    
-    # Vadesi geçenler (modeller kullanılıyor)
-    today = date.today()
-    vadesi_yaklasan_alacaklar_toplami = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
-        modeller.Fatura.odeme_turu.cast(String) == semalar.OdemeTuruEnum.ACIK_HESAP.value,
-        modeller.Fatura.vade_tarihi >= today,
-        modeller.Fatura.vade_tarihi <= (today + timedelta(days=30)),
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-
-    vadesi_gecmis_borclar_toplami = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS,
-        modeller.Fatura.odeme_turu.cast(String) == semalar.OdemeTuruEnum.ACIK_HESAP.value,
-        modeller.Fatura.vade_tarihi < today,
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-    query_stok = db.query(modeller.Stok).filter(modeller.Stok.kullanici_id == kullanici_id)
-    kritik_stok_sayisi = query_stok.filter(
-        modeller.Stok.aktif == True,
-        modeller.Stok.miktar <= modeller.Stok.min_stok_seviyesi
-    ).count()
-
-    # En çok satan ürünler formatlama
-    formatted_top_sellers = [
-        {"urun_adi": urun_ad, "toplam_miktar": toplam_miktar}
-        for urun_ad, toplam_miktar in en_cok_satan_urunler
-    ]
-
-    return {
-        "toplam_satislar": toplam_satislar,
-        "toplam_alislar": toplam_alislar,
-        "toplam_tahsilatlar": toplam_tahsilatlar,
-        "toplam_odemeler": toplam_odemeler,
-        "kritik_stok_sayisi": kritik_stok_sayisi,
-        "en_cok_satan_urunler": formatted_top_sellers,
-        "vadesi_yaklasan_alacaklar_toplami": vadesi_yaklasan_alacaklar_toplami,
-        "vadesi_gecmis_borclar_toplami": vadesi_gecmis_borclar_toplami
+    ).limit(5)
+
+    # İki ifade birbirinden bağımsızdır; ayrı bağlantılarda eşzamanlı çalıştırılır.
+    sonuclar = paralel_sorgula({
+        "ozet": lambda oturum: oturum.execute(ozet_sorgusu).mappings().one(),
+        "en_cok_satanlar": lambda oturum: oturum.execute(en_cok_satan_sorgusu).all(),
+    })
+    ozet = sonuclar["ozet"]
+    en_cok_satan_urunler = sonuclar["en_cok_satanlar"]
+
+    sonuc = {
+        "toplam_satislar": ozet["toplam_satislar"],
+        "toplam_alislar": ozet["toplam_alislar"],
+        "toplam_tahsilatlar": ozet["toplam_tahsilatlar"],
+        "toplam_odemeler": ozet["toplam_odemeler"],
+        "kritik_stok_sayisi": ozet["kritik_stok_sayisi"],
+        "en_cok_satan_urunler": [
+            {"urun_adi": urun_ad, "toplam_miktar": toplam_miktar}
+            for urun_ad, toplam_miktar in en_cok_satan_urunler
+        ],
+        "vadesi_yaklasan_alacaklar_toplami": ozet["vadesi_yaklasan_alacaklar_toplami"],
+        "vadesi_gecmis_borclar_toplami": ozet["vadesi_gecmis_borclar_toplami"]
     }
+    pano_onbellege_yaz(onbellek_anahtari, sonuc)
+    return sonuc
 
 @router.get("/satislar_detayli_rapor", response_model=modeller.FaturaListResponse)
 def get_satislar_detayli_rapor_endpoint(
@@ -156,78 +156,65 @@ def generate_tarihsel_satis_raporu_excel_endpoint(
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
-    kullanici_id = current_user.id
+    """
+    Raporu istek içinde üretir ve dosyayı doğrudan yanıt olarak döner; dosya gönderildikten sonra sunucudan silinir.
+    Büyük aralıklar için POST /raporlar/jobs/satis_raporu_excel kullanılmalıdır.
+    """
+    parametreler = {"baslangic_tarihi": baslangic_tarihi.isoformat(), "bitis_tarihi": bitis_tarihi.isoformat(), "cari_id": cari_id}
     try:
-        # KRİTİK DÜZELTME: semalar.Fatura -> modeller.Fatura
-        query = db.query(modeller.Fatura).filter(
-            modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
-            modeller.Fatura.tarih >= baslangic_tarihi,
-            modeller.Fatura.tarih <= bitis_tarihi,
-            modeller.Fatura.kullanici_id == kullanici_id
-        ).order_by(modeller.Fatura.tarih.desc())
-
-        if cari_id:
-            query = query.filter(modeller.Fatura.cari_id == cari_id)
-
-        faturalar = query.all()
-
-        detailed_sales_data = [modeller.FaturaRead.model_validate(fatura, from_attributes=True) for fatura in faturalar]
-
-        if not detailed_sales_data:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Belirtilen tarih aralığında satış faturası bulunamadı.")
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Satış Raporu"
-
-        headers = [
-            "Fatura No", "Tarih", "Cari Adı", "Ürün Kodu", "Ürün Adı", "Miktar",
-            "Birim Fiyat", "KDV (%)", "İskonto 1 (%)", "İskonto 2 (%)", "Uygulanan İskonto Tutarı",
-            "Kalem Toplam (KDV Dahil)", "Fatura Genel Toplam (KDV Dahil)", "Ödeme Türü"
-        ]
-        ws.append(headers)
-
-        for fatura_item in detailed_sales_data:
-            # KRİTİK DÜZELTME: semalar.FaturaKalemi -> modeller.FaturaKalemi
-            kalemler = db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id == fatura_item.id).all()
-
-            fatura_no = fatura_item.fatura_no
-            tarih = fatura_item.tarih.strftime("%Y-%m-%d") if isinstance(fatura_item.tarih, date) else str(fatura_item.tarih)
-            cari_adi = fatura_item.cari_adi if fatura_item.cari_adi else "N/A"
-            genel_toplam_fatura = fatura_item.genel_toplam
-            odeme_turu = fatura_item.odeme_turu.value if hasattr(fatura_item.odeme_turu, 'value') else str(fatura_item.odeme_turu)
-
-            for kalem in kalemler:
-                # KRİTİK DÜZELTME: semalar.Stok -> modeller.Stok
-                urun = db.query(modeller.Stok).filter(modeller.Stok.id == kalem.urun_id, modeller.Stok.kullanici_id == kullanici_id).first()
-                urun_kodu = urun.kod if urun else "N/A"
-                urun_adi = urun.ad if urun else "N/A"
-
-                birim_fiyat_kdv_dahil_kalem_orig = kalem.birim_fiyat * (1 + kalem.kdv_orani / 100)
-                iskontolu_birim_fiyat_kdv_dahil = birim_fiyat_kdv_dahil_kalem_orig * (1 - kalem.iskonto_yuzde_1 / 100) * (1 - kalem.iskonto_yuzde_2 / 100)
-                uygulanan_iskonto_tutari = (birim_fiyat_kdv_dahil_kalem_orig - iskontolu_birim_fiyat_kdv_dahil) * kalem.miktar
-                kalem_toplam_kdv_dahil = iskontolu_birim_fiyat_kdv_dahil * kalem.miktar
-
-                row_data = [
-                    fatura_no, tarih, cari_adi, urun_kodu, urun_adi, kalem.miktar,
-                    iskontolu_birim_fiyat_kdv_dahil, kalem.kdv_orani, kalem.iskonto_yuzde_1,
-                    kalem.iskonto_yuzde_2, uygulanan_iskonto_tutari, kalem_toplam_kdv_dahil,
-                    genel_toplam_fatura, odeme_turu
-                ]
-                ws.append(row_data)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"satis_raporu_{timestamp}.xlsx"
+        filename = satis_raporu_excel_olustur(db, current_user.id, parametreler)
         filepath = os.path.join(REPORTS_DIR, filename)
-        wb.save(filepath)
-
-        return {"message": f"Satış raporu başarıyla oluşturuldu: {filename}", "filepath": filepath}
+        return FileResponse(
+            path=filepath,
+            filename=filename,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            background=BackgroundTask(os.remove, filepath)
+        )
 
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Rapor oluşturulurken beklenmedik bir hata oluştu: {e}")
 
+def _rapor_isi_yaniti(rapor_isi: modeller.RaporIsi) -> modeller.RaporIsiRead:
+    yanit = modeller.RaporIsiRead.model_validate(rapor_isi, from_attributes=True)
+    if rapor_isi.durum == "TAMAMLANDI" and rapor_isi.dosya_adi:
+        yanit.indirme_adresi = f"{router.prefix}/download_report/{rapor_isi.dosya_adi}"
+    return yanit
+
+@router.post("/jobs/satis_raporu_excel", response_model=modeller.RaporIsiRead, status_code=status.HTTP_202_ACCEPTED)
+def create_satis_raporu_excel_isi(
+    baslangic_tarihi: date = Query(..., description="Başlangıç tarihi (YYYY-MM-DD)"),
+    bitis_tarihi: date = Query(..., description="YYYY-MM-DD formatında bitiş tarihi"),
+    cari_id: Optional[int] = Query(None, description="Opsiyonel Cari ID"),
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    Satış raporu Excel dosyasını arka planda üretecek bir iş oluşturur ve hemen döner.
+    İstemci GET /raporlar/jobs/{is_id} ile durumu izler; TAMAMLANDI olduğunda indirme_adresi'nden dosyayı alır.
+    """
+    if baslangic_tarihi > bitis_tarihi:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Başlangıç tarihi bitiş tarihinden sonra olamaz.")
+
+    parametreler = {"baslangic_tarihi": baslangic_tarihi.isoformat(), "bitis_tarihi": bitis_tarihi.isoformat(), "cari_id": cari_id}
+    rapor_isi = rapor_isi_baslat(db, current_user.id, "satis_raporu_excel", parametreler)
+    return _rapor_isi_yaniti(rapor_isi)
+
+@router.get("/jobs/{is_id}", response_model=modeller.RaporIsiRead)
+def get_rapor_isi(
+    is_id: int,
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    rapor_isi = db.query(modeller.RaporIsi).filter(
+        modeller.RaporIsi.id == is_id,
+        modeller.RaporIsi.kullanici_id == current_user.id
+    ).first()
+    if not rapor_isi:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapor işi bulunamadı.")
+    return _rapor_isi_yaniti(rapor_isi)
+
 @router.get("/kar_zarar_verileri", response_model=modeller.KarZararResponse)
 def get_kar_zarar_verileri_endpoint(
     baslangic_tarihi: date = Query(..., description="YYYY-MM-DD formatında başlangıç tarihi"),
@@ -236,45 +223,26 @@ def get_kar_zarar_verileri_endpoint(
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
     kullanici_id = current_user.id
-    
-    # Tüm sorgularda modeller.X ve Enum üye adları düzeltildi
-    toplam_satis_geliri = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
-        modeller.Fatura.tarih >= baslangic_tarihi,
-        modeller.Fatura.tarih <= bitis_tarihi,
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-
-    toplam_satis_maliyeti = db.query(
-        func.sum(modeller.FaturaKalemi.miktar * modeller.FaturaKalemi.alis_fiyati_fatura_aninda)
-    ).join(modeller.Fatura, modeller.FaturaKalemi.fatura_id == modeller.Fatura.id) \
-     .filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
-        modeller.Fatura.tarih >= baslangic_tarihi,
-        modeller.Fatura.tarih <= bitis_tarihi,
-        modeller.Fatura.kullanici_id == kullanici_id
-      ).scalar() or 0.0
+    GunlukOzet = modeller.GunlukOzet
+
+    # Dönem toplamları gunluk_ozet üzerinden okunur; bir yıllık rapor en fazla 365 satır toplar.
+    ozet = db.query(
+        func.coalesce(func.sum(GunlukOzet.satis_toplami), 0).label("satis"),
+        func.coalesce(func.sum(GunlukOzet.satis_maliyeti), 0).label("maliyet"),
+        func.coalesce(func.sum(GunlukOzet.alis_toplami), 0).label("alis"),
+        func.coalesce(func.sum(GunlukOzet.gelir_toplami), 0).label("gelir"),
+        func.coalesce(func.sum(GunlukOzet.gider_toplami), 0).label("gider")
+    ).filter(
+        GunlukOzet.kullanici_id == kullanici_id,
+        GunlukOzet.tarih >= baslangic_tarihi,
+        GunlukOzet.tarih <= bitis_tarihi
+    ).one()
 
-    toplam_alis_gideri = db.query(func.sum(modeller.Fatura.genel_toplam)).filter(
-        modeller.Fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS,
-        modeller.Fatura.tarih >= baslangic_tarihi,
-        modeller.Fatura.tarih <= bitis_tarihi,
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-
-    diger_gelirler = db.query(func.sum(modeller.GelirGider.tutar)).filter(
-        modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GELİR,
-        modeller.GelirGider.tarih >= baslangic_tarihi,
-        modeller.GelirGider.tarih <= bitis_tarihi,
-        modeller.GelirGider.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-
-    diger_giderler = db.query(func.sum(modeller.GelirGider.tutar)).filter(
-        modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GİDER,
-        modeller.GelirGider.tarih >= baslangic_tarihi,
-        modeller.GelirGider.tarih <= bitis_tarihi,
-        modeller.GelirGider.kullanici_id == kullanici_id
-    ).scalar() or 0.0
+    toplam_satis_geliri = ozet.satis
+    toplam_satis_maliyeti = ozet.maliyet
+    toplam_alis_gideri = ozet.alis
+    diger_gelirler = ozet.gelir
+    diger_giderler = ozet.gider
 
     brut_kar = toplam_satis_geliri - toplam_satis_maliyeti
     net_kar = brut_kar + diger_gelirler - diger_giderler - toplam_alis_gideri
@@ -289,88 +257,205 @@ def get_kar_zarar_verileri_endpoint(
         "net_kar": net_kar
     }
 
+NAKIT_AKISI_DONEMLERI = ("day", "week", "month") # date_trunc alanları
+
 @router.get("/nakit_akisi_raporu", response_model=modeller.NakitAkisiResponse)
 def get_nakit_akisi_raporu_endpoint(
     baslangic_tarihi: date = Query(..., description="YYYY-MM-DD formatında başlangıç tarihi"),
     bitis_tarihi: date = Query(..., description="YYYY-MM-DD formatında bitiş tarihi"),
+    granularity: Optional[str] = Query(None, description="Zaman serisi için dönem: day, week veya month"),
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
+    if granularity is not None and granularity not in NAKIT_AKISI_DONEMLERI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Geçersiz granularity: {granularity}. Desteklenen: day, week, month")
+
     kullanici_id = current_user.id
-    
-    # KRİTİK ÇÖZÜM: Hardcoded NAKİT/KART/EFT filtresini ENUM değerleri ile değiştirme.
-    safe_odeme_turleri = [
-        semalar.OdemeTuruEnum.NAKIT.value,
-        semalar.OdemeTuruEnum.KART.value,
-        semalar.OdemeTuruEnum.EFT_HAVALE.value
-    ]
-    
-    # 1.1. CARİ HAREKETLER (Tahsilat/Ödeme)
-    cari_nakit_select = db.query(
-        modeller.CariHareket.islem_turu.label('tip'),
-        modeller.CariHareket.tutar,
-        modeller.CariHareket.tarih,
-        modeller.CariHareket.aciklama,
-        modeller.KasaBankaHesap.hesap_adi.label('hesap_adi'),
-        modeller.CariHareket.kaynak.label('kaynak')
-    ).join(
-        modeller.KasaBankaHesap, modeller.KasaBankaHesap.id == modeller.CariHareket.kasa_banka_id
-    ).filter(
-        modeller.CariHareket.kullanici_id == kullanici_id,
-        modeller.CariHareket.tarih >= baslangic_tarihi if baslangic_tarihi else True,
-        modeller.CariHareket.tarih <= bitis_tarihi if bitis_tarihi else True,
-        modeller.CariHareket.odeme_turu.in_(safe_odeme_turleri)
-    ).subquery().select()
-
-    # 1.2. GELİR/GİDER HAREKETLERİ (Manuel Girişler) - Sadece nakit hareketler
-    gg_nakit_select = db.query(
-        # KRİTİK DÜZELTME: tip sütununu String'e (VARCHAR) çevirerek DatatypeMismatch hatasını çöz
-        modeller.GelirGider.tip.cast(String).label('tip'),
-        modeller.GelirGider.tutar,
-        modeller.GelirGider.tarih,
-        modeller.GelirGider.aciklama,
-        modeller.KasaBankaHesap.hesap_adi.label('hesap_adi'),
-        modeller.GelirGider.kaynak.label('kaynak')
-    ).join(
-        modeller.KasaBankaHesap, modeller.KasaBankaHesap.id == modeller.GelirGider.kasa_banka_id
-    ).filter(
-        modeller.GelirGider.kullanici_id == kullanici_id,
-        modeller.GelirGider.tarih >= baslangic_tarihi if baslangic_tarihi else True,
-        modeller.GelirGider.tarih <= bitis_tarihi if bitis_tarihi else True,
-        modeller.GelirGider.kasa_banka_id.isnot(None) 
-    ).subquery().select()
-    
-    # Her iki sorguyu birleştir (UNION ALL)
-    nakit_akisi_union = cari_nakit_select.union_all(gg_nakit_select)
-    
-    # Birleşmiş sorguyu çalıştırıp sonuçları al ve sırala
-    nakit_akisi_data = db.execute(
-        nakit_akisi_union.order_by(nakit_akisi_union.c.tarih.desc())
-    ).all()
+    GunlukOzet = modeller.GunlukOzet
+    aralik = (
+        GunlukOzet.kullanici_id == kullanici_id,
+        GunlukOzet.tarih >= baslangic_tarihi,
+        GunlukOzet.tarih <= bitis_tarihi
+    )
 
-    nakit_girisleri = 0.0
-    nakit_cikislar = 0.0
-    formatted_items = []
-    
-    for item in nakit_akisi_data:
-        tutar = float(item.tutar)
-        tip = str(item.tip).upper()
-        
-        # Giriş/Çıkış hesaplaması (Gelir = Giriş, Gider = Çıkış)
-        if tip == 'GELİR' or tip == 'TAHSILAT' or tip == 'FATURA_SATIS_PESIN':
-            nakit_girisleri += tutar
-        elif tip == 'GIDER' or tip == 'ODEME' or tip == 'FATURA_ALIS_PESIN':
-            nakit_cikislar += tutar
-
-        # Rapor satırı oluşturma (Bu kısım model dönüşümü için buraya dahil edilmiştir, normalde Pydantic'e çevrilir)
-        # Sadece NakitAkisiResponse modelindeki toplamları döndürüyoruz.
-        pass # Rapor satırı oluşturma mantığı burada devam etmiyor, sadece özet hesaplanıyor.
+    # Nakit giriş/çıkışları kasa/banka hareketlerinden günlük olarak ön-toplanmıştır (gunluk_ozet).
+    ozet = db.query(
+        func.coalesce(func.sum(GunlukOzet.nakit_giris), 0).label("giris"),
+        func.coalesce(func.sum(GunlukOzet.nakit_cikis), 0).label("cikis")
+    ).filter(*aralik).one()
+
+    nakit_girisleri = float(ozet.giris)
+    nakit_cikislar = float(ozet.cikis)
+
+    items = []
+    if granularity:
+        # Dönem başına tek satır: veritabanında date_trunc ile gruplanır, yalnızca seri noktaları aktarılır.
+        donem = func.date_trunc(granularity, GunlukOzet.tarih).cast(Date).label("donem")
+        seri = db.query(
+            donem,
+            func.coalesce(func.sum(GunlukOzet.nakit_giris), 0).label("giris"),
+            func.coalesce(func.sum(GunlukOzet.nakit_cikis), 0).label("cikis")
+        ).filter(*aralik).group_by(donem).order_by(donem).all()
+        items = [
+            {
+                "donem": satir.donem,
+                "nakit_giris": float(satir.giris),
+                "nakit_cikis": float(satir.cikis),
+                "net_nakit_akisi": float(satir.giris) - float(satir.cikis)
+            }
+            for satir in seri
+        ]
 
     return {
         "nakit_girisleri": nakit_girisleri,
         "nakit_cikislar": nakit_cikislar,
         "net_nakit_akisi": nakit_girisleri - nakit_cikislar,
-        "items": [] # items listesi burada boş döndürülmelidir (modeller.NakitAkisiResponse şemasına göre)
+        "items": items
+    }
+
+# /zaman_serisi için desteklenen defterler: tarih kolonu, ölçüler ve izin verilen filtre kolonları.
+ZAMAN_SERISI_DEFTERLERI = {
+    "faturalar": {
+        "model": modeller.Fatura,
+        "olculer": {
+            "toplam": func.sum(modeller.Fatura.genel_toplam),
+            "kdv_haric": func.sum(modeller.Fatura.toplam_kdv_haric),
+            "adet": func.count(modeller.Fatura.id),
+        },
+        "filtreler": ("fatura_turu", "cari_id", "cari_tip", "odeme_turu", "kasa_banka_id"),
+    },
+    "gelir_giderler": {
+        "model": modeller.GelirGider,
+        "olculer": {
+            "tutar": func.sum(modeller.GelirGider.tutar),
+            "adet": func.count(modeller.GelirGider.id),
+        },
+        "filtreler": ("tip", "cari_id", "kasa_banka_id"),
+    },
+    "cari_hareketler": {
+        "model": modeller.CariHareket,
+        "olculer": {
+            "tutar": func.sum(modeller.CariHareket.tutar),
+            "net": func.sum(case(
+                (modeller.CariHareket.islem_yone == semalar.IslemYoneEnum.ALACAK, modeller.CariHareket.tutar),
+                (modeller.CariHareket.islem_yone == semalar.IslemYoneEnum.BORC, -modeller.CariHareket.tutar),
+                else_=0
+            )),
+            "adet": func.count(modeller.CariHareket.id),
+        },
+        "filtreler": ("cari_id", "cari_tip", "islem_yone", "odeme_turu", "kasa_banka_id"),
+    },
+    "stok_hareketleri": {
+        "model": modeller.StokHareket,
+        "olculer": {
+            "miktar": func.sum(modeller.StokHareket.miktar),
+            "tutar": func.sum(modeller.StokHareket.miktar * modeller.StokHareket.birim_fiyat),
+            "adet": func.count(modeller.StokHareket.id),
+        },
+        "filtreler": ("urun_id", "islem_tipi"),
+    },
+    "kasa_banka_hareketleri": {
+        "model": modeller.KasaBankaHareket,
+        "olculer": {
+            "tutar": func.sum(modeller.KasaBankaHareket.tutar),
+            "net": func.sum(case(
+                (modeller.KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.GIRIS, modeller.KasaBankaHareket.tutar),
+                (modeller.KasaBankaHareket.islem_yone == semalar.IslemYoneEnum.CIKIS, -modeller.KasaBankaHareket.tutar),
+                else_=0
+            )),
+            "adet": func.count(modeller.KasaBankaHareket.id),
+        },
+        "filtreler": ("kasa_banka_id", "islem_yone"),
+    },
+}
+ZAMAN_SERISI_DONEMLERI = {"day": 1, "week": 7, "month": 28, "quarter": 90, "year": 365} # dönem -> en kısa gün sayısı
+MAKS_SERI_NOKTASI = 5000
+
+@router.get("/zaman_serisi", response_model=modeller.ZamanSerisiResponse)
+def get_zaman_serisi_endpoint(
+    defter: str = Query(..., description="faturalar, gelir_giderler, cari_hareketler, stok_hareketleri veya kasa_banka_hareketleri"),
+    olcu: str = Query(..., description="Deftere göre: toplam, kdv_haric, tutar, net, miktar, adet"),
+    donem: str = Query("month", description="day, week, month, quarter veya year"),
+    baslangic_tarihi: date = Query(..., description="YYYY-MM-DD formatında başlangıç tarihi"),
+    bitis_tarihi: date = Query(..., description="YYYY-MM-DD formatında bitiş tarihi"),
+    fatura_turu: Optional[str] = Query(None),
+    tip: Optional[str] = Query(None, description="Gelir/gider tipi"),
+    cari_id: Optional[int] = Query(None),
+    cari_tip: Optional[str] = Query(None),
+    urun_id: Optional[int] = Query(None),
+    kasa_banka_id: Optional[int] = Query(None),
+    islem_yone: Optional[str] = Query(None),
+    islem_tipi: Optional[str] = Query(None, description="Stok işlem tipi"),
+    odeme_turu: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    Seçilen defter ve ölçü için dönem bazında yoğun (boşluksuz) bir zaman serisi döndürür.
+    Gruplama date_trunc ile veritabanında yapılır; generate_series ile üretilen dönem listesine LEFT JOIN
+    edildiğinden verisi olmayan dönemler 0 değeriyle yer alır. Her grafik tek bir çağrıyla beslenebilir.
+    """
+    defter_tanimi = ZAMAN_SERISI_DEFTERLERI.get(defter)
+    if defter_tanimi is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Geçersiz defter: {defter}. Desteklenen: {', '.join(ZAMAN_SERISI_DEFTERLERI)}")
+    olcu_ifadesi = defter_tanimi["olculer"].get(olcu)
+    if olcu_ifadesi is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"'{defter}' için geçersiz ölçü: {olcu}. Desteklenen: {', '.join(defter_tanimi['olculer'])}")
+    if donem not in ZAMAN_SERISI_DONEMLERI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Geçersiz dönem: {donem}. Desteklenen: {', '.join(ZAMAN_SERISI_DONEMLERI)}")
+    if bitis_tarihi < baslangic_tarihi:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bitiş tarihi başlangıç tarihinden önce olamaz.")
+    if (bitis_tarihi - baslangic_tarihi).days // ZAMAN_SERISI_DONEMLERI[donem] + 1 > MAKS_SERI_NOKTASI:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Seri en fazla {MAKS_SERI_NOKTASI} nokta içerebilir; daha geniş bir dönem seçin.")
+
+    model = defter_tanimi["model"]
+    kosullar = [
+        model.kullanici_id == current_user.id,
+        model.tarih >= baslangic_tarihi,
+        model.tarih <= bitis_tarihi
+    ]
+    filtre_degerleri = {
+        "fatura_turu": fatura_turu, "tip": tip, "cari_id": cari_id, "cari_tip": cari_tip, "urun_id": urun_id,
+        "kasa_banka_id": kasa_banka_id, "islem_yone": islem_yone, "islem_tipi": islem_tipi, "odeme_turu": odeme_turu
+    }
+    for alan, deger in filtre_degerleri.items():
+        if deger is None:
+            continue
+        if alan not in defter_tanimi["filtreler"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"'{defter}' defteri '{alan}' filtresini desteklemiyor.")
+        kolon = getattr(model, alan)
+        gecerli_degerler = getattr(kolon.type, "enums", None)
+        if gecerli_degerler and deger not in gecerli_degerler:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Geçersiz {alan}: {deger}. Desteklenen: {', '.join(gecerli_degerler)}")
+        kosullar.append(kolon == deger)
+
+    def _donem_basi(tarih_ifadesi):
+        return func.date_trunc(donem, tarih_ifadesi.cast(DateTime)).cast(Date)
+
+    veri = select(
+        _donem_basi(model.tarih).label("donem"),
+        olcu_ifadesi.label("deger")
+    ).where(*kosullar).group_by(_donem_basi(model.tarih)).cte("veri")
+
+    seri = select(
+        func.generate_series(
+            func.date_trunc(donem, literal(baslangic_tarihi, Date).cast(DateTime)),
+            func.date_trunc(donem, literal(bitis_tarihi, Date).cast(DateTime)),
+            text(f"interval '1 {donem}'") # donem yukarıda beyaz listeyle doğrulandı
+        ).cast(Date).label("donem")
+    ).cte("seri")
+
+    satirlar = db.execute(
+        select(seri.c.donem, func.coalesce(veri.c.deger, 0).label("deger"))
+        .select_from(seri.outerjoin(veri, veri.c.donem == seri.c.donem))
+        .order_by(seri.c.donem)
+    ).all()
+
+    return {
+        "defter": defter,
+        "olcu": olcu,
+        "donem": donem,
+        "items": [{"donem": satir.donem, "deger": float(satir.deger)} for satir in satirlar]
     }
 
 @router.get("/cari_yaslandirma_raporu", response_model=modeller.CariYaslandirmaResponse)
@@ -378,110 +463,135 @@ def get_cari_yaslandirma_verileri_endpoint(
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
-    kullanici_id = current_user.id
-    today = date.today()
+    # Tüm carilerin yaşlandırması tek bir SQL sorgusuyla hesaplanır.
+    cari_hizmeti = CariHesaplamaService(db)
+    satirlar = cari_hizmeti.calculate_cari_yaslandirma(current_user.id, bugun=date.today())
 
     musteri_alacaklar = []
     tedarikci_borclar = []
-
-    cari_hizmeti = CariHesaplamaService(db)
-
-    # KRİTİK DÜZELTME: semalar.Musteri -> modeller.Musteri
-    musteriler = db.query(modeller.Musteri).filter(modeller.Musteri.aktif == True, modeller.Musteri.kullanici_id == kullanici_id).all()
-    for musteri in musteriler:
-        net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(musteri.id, semalar.CariTipiEnum.MUSTERI)
-        if net_bakiye > 0:
-            musteri_alacaklar.append({
-                "cari_id": musteri.id,
-                "cari_ad": musteri.ad,
-                "bakiye": net_bakiye,
-                "vade_tarihi": None
-            })
-
-    # KRİTİK DÜZELTME: semalar.Tedarikci -> modeller.Tedarikci
-    tedarikciler = db.query(modeller.Tedarikci).filter(modeller.Tedarikci.aktif == True, modeller.Tedarikci.kullanici_id == kullanici_id).all()
-    for tedarikci in tedarikciler:
-        net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci.id, semalar.CariTipiEnum.TEDARIKCI)
-        if net_bakiye < 0:
-            tedarikci_borclar.append({
-                "cari_id": tedarikci.id,
-                "cari_ad": tedarikci.ad,
-                "bakiye": abs(net_bakiye),
-                "vade_tarihi": None
-            })
+    for satir in satirlar:
+        kayit = {
+            "cari_id": satir["cari_id"],
+            "cari_ad": satir["cari_ad"],
+            "bakiye": satir["bakiye"],
+            "vade_tarihi": satir["vade_tarihi"],
+            "gun_0_30": satir["gun_0_30"],
+            "gun_31_60": satir["gun_31_60"],
+            "gun_61_90": satir["gun_61_90"],
+            "gun_90_ustu": satir["gun_90_ustu"]
+        }
+        if satir["cari_tip"] == semalar.CariTipiEnum.MUSTERI.value:
+            musteri_alacaklar.append(kayit)
+        else:
+            tedarikci_borclar.append(kayit)
 
     return {
         "musteri_alacaklar": musteri_alacaklar,
         "tedarikci_borclar": tedarikci_borclar
     }
 
-@router.get("/cari_hesap_ekstresi", response_model=modeller.CariHareketListResponse)
+@router.get("/cari_hesap_ekstresi", response_model=modeller.CariHesapEkstresiResponse)
 def get_cari_hesap_ekstresi_endpoint(
     cari_id: int = Query(..., description="Cari ID"),
     cari_turu: semalar.CariTipiEnum = Query(..., description="Cari Türü (MUSTERI veya TEDARIKCI)"),
     baslangic_tarihi: date = Query(..., description="Başlangıç tarihi (YYYY-MM-DD)"),
     bitis_tarihi: date = Query(..., description="Bitiş tarihi (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Sayfa boyutu (verilmezse tüm dönem döner)"),
+    after: Optional[str] = Query(None, description="Önceki sayfanın next_cursor değeri"),
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
     kullanici_id = current_user.id
     if cari_turu == semalar.CariTipiEnum.MUSTERI:
-        cari_obj = db.query(modeller.Musteri).filter(modeller.Musteri.id == cari_id, modeller.Musteri.kullanici_id == kullanici_id).first()
+        cari_obj = db.query(modeller.Musteri.id).filter(modeller.Musteri.id == cari_id, modeller.Musteri.kullanici_id == kullanici_id).first()
     else:
-        cari_obj = db.query(modeller.Tedarikci).filter(modeller.Tedarikci.id == cari_id, modeller.Tedarikci.kullanici_id == kullanici_id).first()
+        cari_obj = db.query(modeller.Tedarikci.id).filter(modeller.Tedarikci.id == cari_id, modeller.Tedarikci.kullanici_id == kullanici_id).first()
 
     if not cari_obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cari bulunamadı")
 
-    devreden_bakiye_alacak = db.query(func.sum(modeller.CariHareket.tutar)).filter(
-        modeller.CariHareket.cari_id == cari_id,
-        modeller.CariHareket.cari_tip == cari_turu, 
-        modeller.CariHareket.islem_yone == semalar.IslemYoneEnum.ALACAK,
-        modeller.CariHareket.tarih < baslangic_tarihi,
-        modeller.CariHareket.kullanici_id == kullanici_id
-    ).scalar() or 0.0
-
-    devreden_bakiye_borc = db.query(func.sum(modeller.CariHareket.tutar)).filter(
-        modeller.CariHareket.cari_id == cari_id,
-        modeller.CariHareket.cari_tip == cari_turu, 
-        modeller.CariHareket.islem_yone == semalar.IslemYoneEnum.BORC,
-        modeller.CariHareket.tarih < baslangic_tarihi,
-        modeller.CariHareket.kullanici_id == kullanici_id
-    ).scalar() or 0.0
+    CariHareket = modeller.CariHareket
 
-    if cari_turu == semalar.CariTipiEnum.MUSTERI:
-        devreden_bakiye = devreden_bakiye_alacak - devreden_bakiye_borc
-    else:
-        devreden_bakiye = devreden_bakiye_borc - devreden_bakiye_alacak
+    # Müşteride ALACAK, tedarikçide BORC bakiyeyi artırır.
+    etki = case(
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.ALACAK, CariHareket.tutar),
+        (CariHareket.islem_yone == semalar.IslemYoneEnum.BORC, -CariHareket.tutar),
+        else_=0
+    )
+    if cari_turu == semalar.CariTipiEnum.TEDARIKCI:
+        etki = -etki
 
-    hareketler_query = db.query(modeller.CariHareket).filter(
-        modeller.CariHareket.cari_id == cari_id,
-        modeller.CariHareket.cari_tip == cari_turu, 
-        modeller.CariHareket.tarih >= baslangic_tarihi,
-        modeller.CariHareket.tarih <= bitis_tarihi,
-        modeller.CariHareket.kullanici_id == kullanici_id
-    ).order_by(modeller.CariHareket.tarih.asc(), modeller.CariHareket.id.asc())
+    cari_kosullari = (
+        CariHareket.cari_id == cari_id,
+        CariHareket.cari_tip == cari_turu.value,
+        CariHareket.kullanici_id == kullanici_id
+    )
 
-    hareketler = hareketler_query.all()
+    # İmleç; son satırın (tarih, id) anahtarını, o satırdaki yürüyen bakiyeyi, devreden bakiyeyi ve dönem satır
+    # sayısını taşır. Böylece sonraki sayfalar geçmişi yeniden toplamaz, yalnızca imleçten sonraki satırları okur.
+    if after:
+        son_tarih, son_id, onceki_bakiye, devreden_bakiye, toplam = imlec_coz(after, (date, int, float, float, int))
+        aralik = tuple_(CariHareket.tarih, CariHareket.id) > tuple_(son_tarih, son_id)
+    else:
+        devreden_bakiye = db.query(func.coalesce(func.sum(etki), 0)).filter(
+            *cari_kosullari, CariHareket.tarih < baslangic_tarihi
+        ).scalar() or 0.0
+        toplam = db.query(func.count(CariHareket.id)).filter(
+            *cari_kosullari, CariHareket.tarih >= baslangic_tarihi, CariHareket.tarih <= bitis_tarihi
+        ).scalar()
+        onceki_bakiye = devreden_bakiye
+        aralik = CariHareket.tarih >= baslangic_tarihi
+
+    # Önce sayfanın satırları (sonraki sayfanın varlığını anlamak için bir fazlası) seçilir; yürüyen bakiye
+    # yalnızca bu satırlar üzerinde, önceki bakiyeden başlatılan bir pencere toplamıyla hesaplanır.
+    sayfa = select(CariHareket.id, CariHareket.tarih, etki.label("etki")).where(
+        *cari_kosullari, aralik, CariHareket.tarih <= bitis_tarihi
+    ).order_by(CariHareket.tarih, CariHareket.id)
+    if limit:
+        sayfa = sayfa.limit(limit + 1)
+    sayfa = sayfa.subquery("sayfa")
+    pencere = select(
+        sayfa.c.id.label("hareket_id"),
+        (literal(onceki_bakiye, Float) + func.sum(sayfa.c.etki).over(order_by=(sayfa.c.tarih, sayfa.c.id))).label("yuruyen_bakiye")
+    ).subquery("pencere")
+
+    satirlar = db.query(
+        CariHareket,
+        pencere.c.yuruyen_bakiye,
+        modeller.Fatura.fatura_no,
+        modeller.Fatura.fatura_turu,
+        modeller.KasaBankaHesap.hesap_adi
+    ).join(
+        pencere, pencere.c.hareket_id == CariHareket.id
+    ).outerjoin(
+        modeller.Fatura, and_(
+            CariHareket.kaynak == semalar.KaynakTipEnum.FATURA.value,
+            modeller.Fatura.id == CariHareket.kaynak_id,
+            modeller.Fatura.kullanici_id == kullanici_id
+        )
+    ).outerjoin(
+        modeller.KasaBankaHesap, and_(
+            modeller.KasaBankaHesap.id == CariHareket.kasa_banka_id,
+            modeller.KasaBankaHesap.kullanici_id == kullanici_id
+        )
+    ).order_by(CariHareket.tarih.asc(), CariHareket.id.asc()).all()
+
+    next_cursor = None
+    if limit and len(satirlar) > limit:
+        satirlar = satirlar[:limit]
+        son_hareket, son_bakiye = satirlar[-1][0], satirlar[-1][1]
+        next_cursor = imlec_olustur(son_hareket.tarih, son_hareket.id, float(son_bakiye or 0.0), float(devreden_bakiye), toplam)
 
     hareket_read_models = []
-    for hareket in hareketler:
+    for hareket, yuruyen_bakiye, fatura_no, fatura_turu, kasa_banka_adi in satirlar:
         hareket_model_dict = modeller.CariHareketRead.model_validate(hareket, from_attributes=True).model_dump()
-
-        if hareket.kaynak == semalar.KaynakTipEnum.FATURA and hareket.kaynak_id:
-            fatura_obj = db.query(modeller.Fatura).filter(modeller.Fatura.id == hareket.kaynak_id, modeller.Fatura.kullanici_id == kullanici_id).first()
-            if fatura_obj:
-                hareket_model_dict['fatura_no'] = fatura_obj.fatura_no
-                hareket_model_dict['fatura_turu'] = fatura_obj.fatura_turu
-
-        if hareket.kasa_banka_id:
-            kasa_banka_obj = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == hareket.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
-            if kasa_banka_obj:
-                hareket_model_dict['kasa_banka_adi'] = kasa_banka_obj.hesap_adi
-
+        hareket_model_dict['fatura_no'] = fatura_no
+        hareket_model_dict['fatura_turu'] = fatura_turu
+        hareket_model_dict['kasa_banka_adi'] = kasa_banka_adi
+        hareket_model_dict['bakiye'] = yuruyen_bakiye or 0.0
         hareket_read_models.append(hareket_model_dict)
 
-    return {"items": hareket_read_models, "total": len(hareketler), "devreden_bakiye": devreden_bakiye}
+    return {"items": hareket_read_models, "total": toplam, "devreden_bakiye": devreden_bakiye, "next_cursor": next_cursor}
 
 @router.get("/stok_deger_raporu", response_model=modeller.StokDegerResponse)
 def get_stok_envanter_ozet_endpoint(
@@ -499,8 +609,15 @@ def get_stok_envanter_ozet_endpoint(
     }
 
 @router.get("/download_report/{filename}", status_code=status.HTTP_200_OK)
-async def download_report_excel_endpoint(filename: str, db: Session = Depends(get_db)):
-    # NOT: Bu metotta kullanici_id filtresi eksiktir, ancak dosya sistemine erişim dış katmanda yönetilmelidir.
+async def download_report_excel_endpoint(
+    filename: str,
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    if os.path.basename(filename) != filename:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Geçersiz dosya adı.")
+    # Rapor dosyaları satis_raporu_{kullanici_id}_... adıyla üretilir; kullanıcı yalnızca kendi dosyalarını indirebilir.
+    if not filename.startswith(f"satis_raporu_{current_user.id}_"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapor dosyası bulunamadı.")
     filepath = os.path.join(REPORTS_DIR, filename)
     if not os.path.exists(filepath):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rapor dosyası bulunamadı.")
@@ -514,17 +631,19 @@ def get_gelir_gider_aylik_ozet_endpoint(
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
     kullanici_id = current_user.id
-    # KRİTİK DÜZELTME: semalar.GelirGider -> modeller.GelirGider
+    GunlukOzet = modeller.GunlukOzet
+    # Aylık toplamlar gunluk_ozet satırlarından (yılda en fazla 366 satır) hesaplanır.
     gelir_gider_ozet = db.query(
-        extract('month', modeller.GelirGider.tarih).label('ay'),
-        func.sum(case((modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GELİR, modeller.GelirGider.tutar), else_=0)).label('toplam_gelir'),
-        func.sum(case((modeller.GelirGider.tip == semalar.GelirGiderTipEnum.GİDER, modeller.GelirGider.tutar), else_=0)).label('toplam_gider')
+        extract('month', GunlukOzet.tarih).label('ay'),
+        func.sum(GunlukOzet.gelir_toplami).label('toplam_gelir'),
+        func.sum(GunlukOzet.gider_toplami).label('toplam_gider')
     ).filter(
-        extract('year', modeller.GelirGider.tarih) == yil,
-        modeller.GelirGider.kullanici_id == kullanici_id
+        GunlukOzet.kullanici_id == kullanici_id,
+        GunlukOzet.tarih >= date(yil, 1, 1),
+        GunlukOzet.tarih <= date(yil, 12, 31)
     ) \
-     .group_by(extract('month', modeller.GelirGider.tarih)) \
-     .order_by(extract('month', modeller.GelirGider.tarih)) \
+     .group_by(extract('month', GunlukOzet.tarih)) \
+     .order_by(extract('month', GunlukOzet.tarih)) \
      .all()
 
     aylik_data = []
@@ -533,11 +652,13 @@ def get_gelir_gider_aylik_ozet_endpoint(
         7: "Temmuz", 8: "Ağustos", 9: "Eylül", 10: "Ekim", 11: "Kasım", 12: "Aralık"
     }
 
+    aylara_gore = {int(item.ay): item for item in gelir_gider_ozet}
     for i in range(1, 13):
         ay_adi = ay_adlari_dict.get(i, f"{i}. Ay")
 
-        gelir = next((item.toplam_gelir for item in gelir_gider_ozet if item.ay == i), 0.0)
-        gider = next((item.toplam_gider for item in gelir_gider_ozet if item.ay == i), 0.0)
+        ay_verisi = aylara_gore.get(i)
+        gelir = ay_verisi.toplam_gelir if ay_verisi else 0.0
+        gider = ay_verisi.toplam_gider if ay_verisi else 0.0
         aylik_data.append({
             "ay": i,
             "ay_adi": ay_adi,
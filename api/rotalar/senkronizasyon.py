@@ -0,0 +1,182 @@
+# api/rotalar/senkronizasyon.py
+import json
+import enum
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from .. import modeller, guvenlik
+from ..veritabani import get_db
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Senkronizasyon"]
+)
+
+# Akış (stream) ile indirilebilecek tablolar. Anahtar, URL'deki {tablo} değeridir.
+# Kalem tablolarında kullanici_id olmadığından kullanıcı filtresi üst belge üzerinden uygulanır.
+SENKRON_TABLOLARI = {
+    "stoklar": modeller.Stok,
+    "musteriler": modeller.Musteri,
+    "tedarikciler": modeller.Tedarikci,
+    "kasalar_bankalar": modeller.KasaBankaHesap,
+    "faturalar": modeller.Fatura,
+    "fatura_kalemleri": modeller.FaturaKalemi,
+    "siparisler": modeller.Siparis,
+    "siparis_kalemleri": modeller.SiparisKalemi,
+    "cari_hareketler": modeller.CariHareket,
+    "stok_hareketleri": modeller.StokHareket,
+    "kasa_banka_hareketleri": modeller.KasaBankaHareket,
+    "gelir_gider": modeller.GelirGider,
+    "kategoriler": modeller.UrunKategori,
+    "markalar": modeller.UrunMarka,
+    "urun_gruplari": modeller.UrunGrubu,
+    "urun_birimleri": modeller.UrunBirimi,
+    "ulkeler": modeller.Ulke,
+    "gelir_siniflandirmalari": modeller.GelirSiniflandirma,
+    "gider_siniflandirmalari": modeller.GiderSiniflandirma,
+}
+
+AKIS_PARCA_BOYUTU = 1000 # Sunucu tarafı imleçten her seferde çekilecek satır sayısı
+
+def _json_varsayilan(deger):
+    """json.dumps'ın tanımadığı tipleri (tarih, enum, decimal) dönüştürür."""
+    if isinstance(deger, (date, datetime)):
+        return deger.isoformat()
+    if isinstance(deger, enum.Enum):
+        return deger.value
+    if isinstance(deger, Decimal):
+        return float(deger)
+    raise TypeError(f"{type(deger).__name__} JSON'a çevrilemez")
+
+def _senkron_modeli(tablo: str):
+    model = SENKRON_TABLOLARI.get(tablo)
+    if model is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Senkronize edilemeyen tablo: {tablo}")
+    return model
+
+def _senkron_sorgusu(tablo: str, kullanici_id: int):
+    """Verilen tablo için kullanıcıya ait tüm satırları seçen (sırasız) Core sorgusunu döndürür."""
+    model = _senkron_modeli(tablo)
+
+    sorgu = select(*model.__table__.columns)
+    if model is modeller.FaturaKalemi:
+        sorgu = sorgu.join(modeller.Fatura, modeller.Fatura.id == modeller.FaturaKalemi.fatura_id) \
+                     .where(modeller.Fatura.kullanici_id == kullanici_id)
+    elif model is modeller.SiparisKalemi:
+        sorgu = sorgu.join(modeller.Siparis, modeller.Siparis.id == modeller.SiparisKalemi.siparis_id) \
+                     .where(modeller.Siparis.kullanici_id == kullanici_id)
+    else:
+        sorgu = sorgu.where(model.kullanici_id == kullanici_id)
+    return sorgu
+
+def _ndjson_akisi(sorgu):
+    """
+    Sorguyu sunucu tarafı imleçle (yield_per) parça parça okuyup her satırı bir JSON satırı olarak üretir.
+    Yanıt gövdesi istek bittikten sonra okunduğundan kendi oturumunu açar ve kapatır.
+    """
+    db = next(get_db())
+    try:
+        sonuc = db.execute(sorgu.execution_options(yield_per=AKIS_PARCA_BOYUTU))
+        for satir in sonuc.mappings():
+            yield json.dumps(dict(satir), default=_json_varsayilan, ensure_ascii=False) + "\n"
+    except Exception as e:
+        logger.error(f"Senkronizasyon akışı sırasında hata: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+@router.get("/{tablo}/stream")
+def stream_tablo(
+    tablo: str,
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    Kullanıcının ilgili tablodaki tüm satırlarını application/x-ndjson olarak akıtır (her satır bir JSON nesnesi).
+    Sunucu belleği tablo boyutundan bağımsızdır; istemci indirme sürerken satırları işlemeye başlayabilir.
+    """
+    sorgu = _senkron_sorgusu(tablo, current_user.id).order_by(_senkron_modeli(tablo).id)
+    return StreamingResponse(_ndjson_akisi(sorgu), media_type="application/x-ndjson")
+
+def _kesin_surum(db: Session) -> int:
+    """
+    Anlık görüntünün xmin değerini döndürür: bundan küçük kimlikli bütün işlemler tamamlanmıştır.
+    row_version satırı yazan işlemin kimliği olduğundan bu değerin altındaki sürümler artık değişmez;
+    üstündekiler ise henüz commit edilmemiş (ve görünmeyen) bir işleme ait olabilir.
+    """
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+
+def _surum_olaylari(db: Session, tablo: str, kullanici_id: int, alt: int, ust: int, limit: Optional[int] = None):
+    """alt <= row_version < ust aralığındaki değişen satırları ve silinen kayıtları sürüm sırasıyla birleştirir."""
+    model = _senkron_modeli(tablo)
+    degisen_sorgu = _senkron_sorgusu(tablo, kullanici_id) \
+        .where(model.row_version >= alt, model.row_version < ust) \
+        .order_by(model.row_version, model.id)
+    silinen_sorgu = select(modeller.SilinenKayit.kayit_id, modeller.SilinenKayit.row_version).where(
+        modeller.SilinenKayit.tablo == model.__tablename__,
+        modeller.SilinenKayit.kullanici_id == kullanici_id,
+        modeller.SilinenKayit.row_version >= alt,
+        modeller.SilinenKayit.row_version < ust
+    ).order_by(modeller.SilinenKayit.row_version, modeller.SilinenKayit.id)
+    if limit is not None:
+        degisen_sorgu = degisen_sorgu.limit(limit)
+        silinen_sorgu = silinen_sorgu.limit(limit)
+
+    olaylar = [(satir["row_version"], dict(satir), None) for satir in db.execute(degisen_sorgu).mappings()]
+    olaylar += [(silinen.row_version, None, silinen.kayit_id) for silinen in db.execute(silinen_sorgu)]
+    olaylar.sort(key=lambda olay: olay[0])
+    return olaylar[:limit] if limit is not None else olaylar
+
+@router.get("/surum")
+def get_senkron_surumu(
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Tam (stream) senkronizasyondan ÖNCE alınacak yüksek su işaretini döndürür. Bu sürümden küçük bütün
+    değişiklikler akışta görünür; akış sırasında veya sonrasında commit edilenler sonraki /sync/changes
+    çağrısında gelir (upsert idempotent olduğundan iki kez gelmeleri zararsızdır).
+    """
+    return {"surum": _kesin_surum(db)}
+
+@router.get("/changes")
+def get_degisiklikler(
+    tablo: str = Query(..., description="Senkronize edilecek tablo (örn. stoklar)"),
+    since: int = Query(0, ge=0, description="İstemcinin bu tablo için sakladığı son sonraki_since/surum değeri"),
+    limit: int = Query(5000, ge=1, le=20000),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    since değerinden itibaren tamamlanmış işlemlerin eklediği/güncellediği satırları ve silinen kayıt id'lerini
+    sürüm sırasıyla döndürür. Henüz commit edilmemiş bir işlemden büyük sürümler beklenir; böylece geç commit
+    edilen satırlar atlanmaz. İstemci sonraki_since değerini saklar ve devami_var false olana kadar tekrar çağırır.
+    """
+    _senkron_modeli(tablo)
+    kullanici_id = current_user.id
+    ust_sinir = max(_kesin_surum(db), since)
+
+    olaylar = _surum_olaylari(db, tablo, kullanici_id, since, ust_sinir, limit + 1)
+    devami_var = len(olaylar) > limit
+    sonraki_since = ust_sinir
+    if devami_var:
+        # Sayfa bir işlemin ortasında kesilmez: sayfaya sığmayan ilk olayın işlemi bir sonraki sayfaya kalır.
+        sonraki_since = olaylar[limit][0]
+        olaylar = [olay for olay in olaylar if olay[0] < sonraki_since]
+        if not olaylar:
+            # Tek bir işlemin değişiklikleri sayfadan büyükse o işlem bütünüyle gönderilir.
+            olaylar = _surum_olaylari(db, tablo, kullanici_id, sonraki_since, sonraki_since + 1)
+            sonraki_since += 1
+
+    return {
+        "items": [veri for _, veri, _ in olaylar if veri is not None],
+        "silinenler": [kayit_id for _, _, kayit_id in olaylar if kayit_id is not None],
+        "sonraki_since": sonraki_since,
+        "devami_var": devami_var
+    }
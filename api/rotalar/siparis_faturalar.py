@@ -1,12 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
-from typing import List, Optional, Union
+from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload, noload
+from sqlalchemy import func, insert, select
+from typing import List, Optional, Sequence, Tuple, Union
+from collections import defaultdict
+from itertools import zip_longest
+from types import SimpleNamespace
 from datetime import datetime, date
 
 from .. import modeller, semalar, guvenlik
 from ..veritabani import get_db
 from hizmetler import FaturaService
+from .api_yardimcilar import (
+    _cari_hareket_bakiyeye_isle, _cari_hareketleri_bakiyeden_dus, sayfala, pano_onbellegini_temizle,
+    _fatura_gunluk_ozete_isle, _kasa_hareket_gunluk_ozete_isle, bulanik_arama, benzerlige_gore_sayfala,
+    _fatura_stoklarini_isle, FATURA_NUMARA_ONEKLERI, siradaki_belge_numarasi, belge_numarasi_onizle, belge_sayaclarini_esitle,
+    _faturalar_stoklarini_isle, _satirlari_kilitle, _farklari_uygula, _enum_degeri, _cari_hareket_delta,
+    _cari_bakiye_delta_uygula, _gunluk_ozet_delta_uygula, FATURA_STOK_YONLERI, FATURA_STOK_ISLEM_TIPLERI,
+    _faturalari_gunluk_ozetten_dus, _stok_hareketlerini_geri_al, _kasa_hareketlerini_bakiyeden_dus
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +51,7 @@ def create_siparis(siparis: modeller.SiparisCreate, db: Session = Depends(get_db
 
     db.add(db_siparis)
     db.flush() 
+    belge_sayaclarini_esitle(db, kullanici_id, ("S-",), [siparis.siparis_no])
 
     for kalem_data in siparis.kalemler:
         # FaturaKalemi modelinde kullanici_id kolonu olmadığından, eklenmedi.
@@ -123,6 +135,8 @@ def update_siparis(siparis_id: int, siparis_update: modeller.SiparisUpdate, curr
     update_data = siparis_update.model_dump(exclude_unset=True, exclude={"kalemler"})
     for key, value in update_data.items():
         setattr(db_siparis, key, value)
+    if "siparis_no" in update_data:
+        belge_sayaclarini_esitle(db, kullanici_id, ("S-",), [update_data["siparis_no"]])
     
     if siparis_update.kalemler is not None:
         # Önceki kalemleri sil
@@ -168,21 +182,8 @@ def convert_siparis_to_fatura(
 
     fatura_turu_olustur = semalar.FaturaTuruEnum.SATIS if db_siparis.siparis_turu == semalar.SiparisTuruEnum.SATIŞ_SIPARIS else semalar.FaturaTuruEnum.ALIS
 
-    # Fatura numarasını al (Güvenlik filtresi eklendi)
-    last_fatura = db.query(modeller.Fatura).filter(modeller.Fatura.fatura_turu == fatura_turu_olustur, modeller.Fatura.kullanici_id == kullanici_id) \
-                                       .order_by(modeller.Fatura.fatura_no.desc()).first()
-    
-    prefix = "SF" if fatura_turu_olustur == semalar.FaturaTuruEnum.SATIS else "AF"
-    next_sequence = 1
-    if last_fatura and last_fatura.fatura_no.startswith(prefix):
-        try:
-            current_sequence_str = last_fatura.fatura_no[len(prefix):]
-            current_sequence = int(current_sequence_str)
-            next_sequence = current_sequence + 1
-        except ValueError:
-            pass
-    
-    new_fatura_no = f"{prefix}{next_sequence:09d}"
+    # Fatura numarası kullanıcının sayacından ayrılır; dönüşüm geri alınırsa numara da geri alınır.
+    new_fatura_no = siradaki_belge_numarasi(db, kullanici_id, FATURA_NUMARA_ONEKLERI[fatura_turu_olustur])
 
     # Faturayı oluştur
     db_fatura = modeller.Fatura(
@@ -288,6 +289,7 @@ def convert_siparis_to_fatura(
     db_fatura.genel_toplam = db_fatura.toplam_kdv_dahil
 
     db.add(db_fatura)
+    _fatura_gunluk_ozete_isle(db, db_fatura)
 
     # CARİ HAREKET ve KASA/BANKA HAREKETİ OLUŞTURMA
     if fatura_donusum.odeme_turu == semalar.OdemeTuruEnum.ACIK_HESAP:
@@ -317,6 +319,7 @@ def convert_siparis_to_fatura(
                 kullanici_id=kullanici_id
             )
             db.add(db_cari_hareket)
+            _cari_hareket_bakiyeye_isle(db, db_cari_hareket)
 
     # Kasa/Banka Hareketi (Açık Hesap değilse)
     if fatura_donusum.kasa_banka_id and fatura_donusum.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP:
@@ -340,6 +343,7 @@ def convert_siparis_to_fatura(
                 kullanici_id=kullanici_id
             )
             db.add(db_kasa_banka_hareket)
+            _kasa_hareket_gunluk_ozete_isle(db, db_kasa_banka_hareket)
             
             # Kasa Bakiyesi Güncelleme (Güvenlik filtresi eklendi)
             db_kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == fatura_donusum.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
@@ -355,6 +359,7 @@ def convert_siparis_to_fatura(
     db.add(db_siparis)
 
     db.commit()
+    pano_onbellegini_temizle(current_user.id)
     db.refresh(db_fatura)
     return db_fatura
 
@@ -413,6 +418,138 @@ def get_siparis_kalemleri_endpoint(
 
 # --- FATURALAR ENDPOINT'leri ---
 
+# Fatura türüne göre cari hesaba yazılacak fatura kaydının yönü (ödeme kaydı bunun tersidir) ve kasa/banka yönü.
+FATURA_CARI_YONLERI = {
+    semalar.FaturaTuruEnum.SATIS: semalar.IslemYoneEnum.ALACAK,
+    semalar.FaturaTuruEnum.ALIS: semalar.IslemYoneEnum.BORC,
+    semalar.FaturaTuruEnum.SATIS_IADE: semalar.IslemYoneEnum.BORC,
+    semalar.FaturaTuruEnum.DEVIR_GIRIS: semalar.IslemYoneEnum.BORC,
+    semalar.FaturaTuruEnum.ALIS_IADE: semalar.IslemYoneEnum.ALACAK,
+}
+FATURA_KASA_YONLERI = {
+    semalar.FaturaTuruEnum.SATIS: semalar.IslemYoneEnum.GIRIS,
+    semalar.FaturaTuruEnum.ALIS_IADE: semalar.IslemYoneEnum.GIRIS,
+    semalar.FaturaTuruEnum.DEVIR_GIRIS: semalar.IslemYoneEnum.GIRIS,
+    semalar.FaturaTuruEnum.ALIS: semalar.IslemYoneEnum.CIKIS,
+    semalar.FaturaTuruEnum.SATIS_IADE: semalar.IslemYoneEnum.CIKIS,
+}
+MAKS_TOPLU_FATURA = 500
+
+def _fatura_toplamlarini_hesapla(kalemler: Sequence, genel_iskonto_tipi: Optional[str], genel_iskonto_degeri: Optional[float]) -> dict:
+    """
+    Kalem iskontoları, KDV ve genel iskonto uygulanmış fatura toplamlarını döndürür.
+    kalemler Pydantic kalem veya FaturaKalemi nesneleri olabilir.
+    """
+    toplam_kdv_haric_calc = 0.0
+    toplam_kdv_dahil_calc = 0.0
+    genel_iskonto_degeri = genel_iskonto_degeri or 0.0
+    
+    for kalem in kalemler:
+        miktar = kalem.miktar
+        birim_fiyat_kdv_haric_orig = kalem.birim_fiyat
+        kdv_orani = kalem.kdv_orani or 0.0
+        iskonto_yuzde_1 = kalem.iskonto_yuzde_1 or 0.0
+        iskonto_yuzde_2 = kalem.iskonto_yuzde_2 or 0.0
+
+        bf_kdv_dahil_orig = birim_fiyat_kdv_haric_orig * (1 + kdv_orani / 100)
+        bf_iskonto_1 = bf_kdv_dahil_orig * (1 - iskonto_yuzde_1 / 100)
+        bf_iskontolu_dahil = bf_iskonto_1 * (1 - iskonto_yuzde_2 / 100)
+
+        bf_iskontolu_haric = bf_iskontolu_dahil / (1 + kdv_orani / 100) if kdv_orani != 0 else bf_iskontolu_dahil
+        
+        toplam_kdv_haric_calc += bf_iskontolu_haric * miktar
+        toplam_kdv_dahil_calc += bf_iskontolu_dahil * miktar
+        
+    genel_iskonto_tutari = 0.0
+    if genel_iskonto_tipi == "YUZDE" and genel_iskonto_degeri > 0:
+        genel_iskonto_tutari = toplam_kdv_dahil_calc * (genel_iskonto_degeri / 100) 
+    elif genel_iskonto_tipi == "TUTAR" and genel_iskonto_degeri > 0:
+        genel_iskonto_tutari = genel_iskonto_degeri
+        
+    genel_toplam_final = toplam_kdv_dahil_calc - genel_iskonto_tutari
+    
+    # Genel iskonto sonrası KDV hariç toplamı yeniden hesaplayalım 
+    if genel_iskonto_tutari > 0:
+        genel_iskonto_oran_dahil = genel_iskonto_tutari / toplam_kdv_dahil_calc if toplam_kdv_dahil_calc > 0 else 0
+        toplam_kdv_haric_iskontolu = toplam_kdv_haric_calc * (1 - genel_iskonto_oran_dahil)
+    else:
+        toplam_kdv_haric_iskontolu = toplam_kdv_haric_calc
+
+    return {
+        "genel_toplam": genel_toplam_final,
+        "toplam_kdv_haric": toplam_kdv_haric_iskontolu,
+        "toplam_kdv_dahil": genel_toplam_final, # KDV Dahil toplam, genel toplama eşittir
+        "toplam_kdv": genel_toplam_final - toplam_kdv_haric_iskontolu
+    }
+
+def _fatura_orm_nesnesi(fatura_data: modeller.FaturaCreate, kullanici_id: int) -> modeller.Fatura:
+    """İstek verisinden, toplamları hesaplanmış (henüz oturuma eklenmemiş) Fatura nesnesi üretir."""
+    fatura_dict = fatura_data.model_dump(exclude_unset=True)
+    
+    fatura_dict.pop('kalemler', None) 
+    fatura_dict.pop('olusturan_kullanici_id', None)
+    fatura_dict.pop('kullanici_id', None)
+    fatura_dict.pop('original_fatura_id', None) 
+    
+    return modeller.Fatura(**fatura_dict, kullanici_id=kullanici_id, **_fatura_toplamlarini_hesapla(
+        fatura_data.kalemler, fatura_data.genel_iskonto_tipi, fatura_data.genel_iskonto_degeri
+    ))
+
+def _fatura_hareket_satirlari(fatura: modeller.Fatura) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Kaydedilmiş (id'si olan) bir faturanın cari hareketlerini ve varsa kasa/banka hareketini sözlük olarak döndürür.
+    Fatura kaydı carinin borç/alacağını oluşturur; açık hesap dışındaki ödemelerde ters yönde bir ödeme kaydı
+    ve kasa/banka hareketi eklenir. Toplu INSERT'te kullanılabilmesi için tüm cari satırları aynı anahtarlara sahiptir.
+    """
+    cari_satirlari = []
+    kasa_satiri = None
+    cari_tip = _enum_degeri(fatura.cari_tip)
+    fatura_turu = _enum_degeri(fatura.fatura_turu)
+    odeme_turu = _enum_degeri(fatura.odeme_turu)
+    islem_yone_fatura = FATURA_CARI_YONLERI.get(fatura.fatura_turu)
+
+    # 1. CARI HAREKET - FATURA KAYDI (Borç/Alacak Oluşturma)
+    if fatura.cari_id and islem_yone_fatura:
+        cari_satirlari.append(dict(
+            cari_id=fatura.cari_id, cari_tip=cari_tip, tarih=fatura.tarih,
+            islem_turu=semalar.KaynakTipEnum.FATURA.value, islem_yone=islem_yone_fatura,
+            tutar=fatura.genel_toplam, aciklama=f"{fatura.fatura_no} nolu Fatura Kaydı ({fatura_turu})",
+            kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=fatura.id,
+            odeme_turu=fatura.odeme_turu, vade_tarihi=fatura.vade_tarihi, kasa_banka_id=None,
+            kullanici_id=fatura.kullanici_id
+        ))
+
+    # 2. CARI HAREKET ve KASA/BANKA HAREKETİ - Ödeme/Tahsilat (Sadece ACIK_HESAP olmayanlar için)
+    if fatura.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP and fatura.kasa_banka_id:
+        # 2a. CARI HAREKET - Ödeme/Tahsilat Kaydı (Fatura Kaydını Kapatır)
+        if fatura.cari_id and islem_yone_fatura:
+            islem_yone_odeme = semalar.IslemYoneEnum.BORC if islem_yone_fatura == semalar.IslemYoneEnum.ALACAK else semalar.IslemYoneEnum.ALACAK
+            cari_satirlari.append(dict(
+                cari_id=fatura.cari_id, cari_tip=cari_tip, tarih=fatura.tarih,
+                islem_turu=odeme_turu, islem_yone=islem_yone_odeme,
+                tutar=fatura.genel_toplam, aciklama=f"{fatura.fatura_no} nolu fatura ({odeme_turu}) ile ödendi/tahsil edildi",
+                kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=fatura.id,
+                odeme_turu=fatura.odeme_turu, vade_tarihi=None, kasa_banka_id=fatura.kasa_banka_id,
+                kullanici_id=fatura.kullanici_id
+            ))
+
+        # 2b. KASA/BANKA HAREKETİ
+        islem_yone_kasa = FATURA_KASA_YONLERI.get(fatura.fatura_turu)
+        if islem_yone_kasa:
+            kasa_satiri = dict(
+                kasa_banka_id=fatura.kasa_banka_id, tarih=fatura.tarih,
+                islem_turu=fatura_turu, islem_yone=islem_yone_kasa,
+                tutar=fatura.genel_toplam, aciklama=f"{fatura.fatura_no} nolu fatura ({fatura_turu})",
+                kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=fatura.id,
+                kullanici_id=fatura.kullanici_id
+            )
+
+    return cari_satirlari, kasa_satiri
+
+def _kasa_hareket_bakiye_farki(islem_yone, tutar) -> float:
+    """Bir kasa/banka hareketinin hesap bakiyesine etkisi: GIRIS (+), CIKIS (-)."""
+    return (tutar or 0.0) if _enum_degeri(islem_yone) == semalar.IslemYoneEnum.GIRIS.value else -(tutar or 0.0)
+
 @faturalar_router.post("/", response_model=modeller.FaturaRead, status_code=status.HTTP_201_CREATED)
 def create_fatura(fatura_data: modeller.FaturaCreate, current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user), db: Session = Depends(get_db)):
     db.begin_nested()
@@ -421,187 +558,180 @@ def create_fatura(fatura_data: modeller.FaturaCreate, current_user: modeller.Kul
     try:
         if db.query(modeller.Fatura).filter(modeller.Fatura.fatura_no == fatura_data.fatura_no, modeller.Fatura.kullanici_id == kullanici_id).first():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bu fatura numarası zaten mevcut.")
-            
-        toplam_kdv_haric_calc = 0.0
-        toplam_kdv_dahil_calc = 0.0
-        
-        for kalem in fatura_data.kalemler:
-            miktar = kalem.miktar
-            birim_fiyat_kdv_haric_orig = kalem.birim_fiyat
-            kdv_orani = kalem.kdv_orani
-            iskonto_yuzde_1 = kalem.iskonto_yuzde_1
-            iskonto_yuzde_2 = kalem.iskonto_yuzde_2
-
-            bf_kdv_dahil_orig = birim_fiyat_kdv_haric_orig * (1 + kdv_orani / 100)
-            bf_iskonto_1 = bf_kdv_dahil_orig * (1 - iskonto_yuzde_1 / 100)
-            bf_iskontolu_dahil = bf_iskonto_1 * (1 - iskonto_yuzde_2 / 100)
-
-            bf_iskontolu_haric = bf_iskontolu_dahil / (1 + kdv_orani / 100) if kdv_orani != 0 else bf_iskontolu_dahil
-            
-            toplam_kdv_haric_calc += bf_iskontolu_haric * miktar
-            toplam_kdv_dahil_calc += bf_iskontolu_dahil * miktar
-            
-        genel_iskonto_tutari = 0.0
-        if fatura_data.genel_iskonto_tipi == "YUZDE" and fatura_data.genel_iskonto_degeri > 0:
-            genel_iskonto_tutari = toplam_kdv_dahil_calc * (fatura_data.genel_iskonto_degeri / 100) 
-        elif fatura_data.genel_iskonto_tipi == "TUTAR" and fatura_data.genel_iskonto_degeri > 0:
-            genel_iskonto_tutari = fatura_data.genel_iskonto_degeri
-            
-        genel_toplam_final = toplam_kdv_dahil_calc - genel_iskonto_tutari
-        
-        # Genel iskonto sonrası KDV hariç toplamı yeniden hesaplayalım 
-        if genel_iskonto_tutari > 0:
-            genel_iskonto_oran_dahil = genel_iskonto_tutari / toplam_kdv_dahil_calc if toplam_kdv_dahil_calc > 0 else 0
-            toplam_kdv_haric_iskontolu = toplam_kdv_haric_calc * (1 - genel_iskonto_oran_dahil)
-        else:
-            toplam_kdv_haric_iskontolu = toplam_kdv_haric_calc
+        # Numara elle girildiyse veya önizlemeden alındıysa sayaç en az bu numaraya çekilir.
+        belge_sayaclarini_esitle(db, kullanici_id, FATURA_NUMARA_ONEKLERI.values(), [fatura_data.fatura_no])
 
-        cari_tip_final = fatura_data.cari_tip
-
-        fatura_dict = fatura_data.model_dump(exclude_unset=True)
-        
-        fatura_dict.pop('kalemler', None) 
-        fatura_dict.pop('olusturan_kullanici_id', None)
-        fatura_dict.pop('kullanici_id', None)
-        fatura_dict.pop('original_fatura_id', None) 
-        
-        db_fatura = modeller.Fatura(
-            **fatura_dict,
-            kullanici_id=kullanici_id,
-            genel_toplam=genel_toplam_final,
-            toplam_kdv_haric=toplam_kdv_haric_iskontolu,
-            toplam_kdv_dahil=genel_toplam_final, # KDV Dahil toplam, genel toplama eşittir
-            toplam_kdv=genel_toplam_final - toplam_kdv_haric_iskontolu
-        )
-        
+        db_fatura = _fatura_orm_nesnesi(fatura_data, kullanici_id)
         db.add(db_fatura)
         db.flush()
 
-        for kalem_data in fatura_data.kalemler:
-            kalem_dict = kalem_data.model_dump()
-            db_kalem = modeller.FaturaKalemi(fatura_id=db_fatura.id, **kalem_dict) 
-            db.add(db_kalem)
-            
-            db_stok = db.query(modeller.Stok).filter(modeller.Stok.id == kalem_data.urun_id, modeller.Stok.kullanici_id == kullanici_id).first()
-            if not db_stok:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ürün ID {kalem_data.urun_id} bulunamadı.")
-            
-            stok_miktar_oncesi = db_stok.miktar
-            
-            if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
-                db_stok.miktar -= kalem_data.miktar
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
-                db_stok.miktar += kalem_data.miktar
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE:
-                db_stok.miktar += kalem_data.miktar
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE:
-                db_stok.miktar -= kalem_data.miktar
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.DEVIR_GIRIS:
-                db_stok.miktar += kalem_data.miktar
+        # Kalemler tek bir toplu INSERT ile eklenir; stoklar tek sorguda id sırasıyla kilitlenip tek UPDATE ile güncellenir.
+        kalem_satirlari = [dict(kalem_data.model_dump(), fatura_id=db_fatura.id) for kalem_data in fatura_data.kalemler]
+        if kalem_satirlari:
+            db.execute(insert(modeller.FaturaKalemi), kalem_satirlari)
+        _fatura_stoklarini_isle(db, db_fatura, fatura_data.kalemler)
 
-            islem_tipi_stok = None
-            if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS: islem_tipi_stok = semalar.StokIslemTipiEnum.SATIŞ 
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS: islem_tipi_stok = semalar.StokIslemTipiEnum.ALIŞ 
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE: islem_tipi_stok = semalar.StokIslemTipiEnum.SATIŞ_İADE
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE: islem_tipi_stok = semalar.StokIslemTipiEnum.ALIŞ_İADE
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.DEVIR_GIRIS: islem_tipi_stok = semalar.StokIslemTipiEnum.GİRİŞ
-            
-            if islem_tipi_stok:
-                db.add(db_stok)
-                db_stok_hareket = modeller.StokHareket(
-                    urun_id=kalem_data.urun_id, tarih=db_fatura.tarih, islem_tipi=islem_tipi_stok,
-                    miktar=kalem_data.miktar, birim_fiyat=kalem_data.birim_fiyat,
-                    aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.fatura_turu.value})",
-                    kaynak=semalar.KaynakTipEnum.FATURA, kaynak_id=db_fatura.id,
-                    onceki_stok=stok_miktar_oncesi, sonraki_stok=db_stok.miktar,
-                    kullanici_id=kullanici_id
-                )
-                db.add(db_stok_hareket)
-
-        # 1. CARI HAREKET - FATURA KAYDI (Borç/Alacak Oluşturma)
-        if db_fatura.cari_id:
-            islem_yone_fatura = None
-            if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS: 
-                islem_yone_fatura = semalar.IslemYoneEnum.ALACAK 
-            elif db_fatura.fatura_turu in [semalar.FaturaTuruEnum.ALIS, semalar.FaturaTuruEnum.SATIS_IADE, semalar.FaturaTuruEnum.DEVIR_GIRIS]: 
-                islem_yone_fatura = semalar.IslemYoneEnum.BORC
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE: 
-                islem_yone_fatura = semalar.IslemYoneEnum.ALACAK
-                
-            if islem_yone_fatura:
-                cari_tip_fatura_kaydi = cari_tip_final.value if cari_tip_final else db_fatura.cari_tip 
-                
-                fatura_cari_hareket = modeller.CariHareket(
-                    cari_id=db_fatura.cari_id, cari_tip=cari_tip_fatura_kaydi, tarih=db_fatura.tarih,
-                    islem_turu=semalar.KaynakTipEnum.FATURA.value, islem_yone=islem_yone_fatura,
-                    tutar=db_fatura.genel_toplam, aciklama=f"{db_fatura.fatura_no} nolu Fatura Kaydı ({db_fatura.fatura_turu.value})",
-                    kaynak=semalar.KaynakTipEnum.FATURA, kaynak_id=db_fatura.id,
-                    odeme_turu=db_fatura.odeme_turu, vade_tarihi=db_fatura.vade_tarihi,
-                    kullanici_id=kullanici_id
-                )
-                db.add(fatura_cari_hareket)
-
-        # 2. CARI HAREKET ve KASA/BANKA HAREKETİ - Ödeme/Tahsilat (Sadece ACIK_HESAP olmayanlar için)
-        if fatura_data.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP and fatura_data.kasa_banka_id:
+        _fatura_gunluk_ozete_isle(db, db_fatura)
+
+        cari_satirlari, kasa_satiri = _fatura_hareket_satirlari(db_fatura)
+        for cari_satiri in cari_satirlari:
+            cari_hareket = modeller.CariHareket(**cari_satiri)
+            db.add(cari_hareket)
+            _cari_hareket_bakiyeye_isle(db, cari_hareket)
+
+        if kasa_satiri:
+            db_kasa_banka_hareket = modeller.KasaBankaHareket(**kasa_satiri)
+            db.add(db_kasa_banka_hareket)
+            _kasa_hareket_gunluk_ozete_isle(db, db_kasa_banka_hareket)
             
-            # 2a. CARI HAREKET - Ödeme/Tahsilat Kaydı (Fatura Kaydını Kapatır)
-            if db_fatura.cari_id and islem_yone_fatura:
-                islem_yone_odeme = None
-                if islem_yone_fatura == semalar.IslemYoneEnum.ALACAK: 
-                    islem_yone_odeme = semalar.IslemYoneEnum.BORC # Alacağı kapattık (tahsilat)
-                elif islem_yone_fatura == semalar.IslemYoneEnum.BORC: 
-                    islem_yone_odeme = semalar.IslemYoneEnum.ALACAK # Borcu kapattık (ödeme)
-
-                if islem_yone_odeme:
-                    cari_tip_odeme_kaydi = cari_tip_final.value if cari_tip_final else db_fatura.cari_tip
-                    
-                    odeme_cari_hareket = modeller.CariHareket(
-                        cari_id=db_fatura.cari_id, cari_tip=cari_tip_odeme_kaydi, tarih=db_fatura.tarih,
-                        islem_turu=db_fatura.odeme_turu.value, 
-                        islem_yone=islem_yone_odeme,
-                        tutar=db_fatura.genel_toplam, aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.odeme_turu.value}) ile ödendi/tahsil edildi",
-                        kaynak=semalar.KaynakTipEnum.FATURA,
-                        kaynak_id=db_fatura.id,
-                        odeme_turu=db_fatura.odeme_turu,
-                        kasa_banka_id=db_fatura.kasa_banka_id,
-                        kullanici_id=kullanici_id
-                    )
-                    db.add(odeme_cari_hareket)
-
-            # 2b. KASA/BANKA HAREKETİ ve Bakiye Güncelleme
-            islem_yone_kasa = None
-            if db_fatura.fatura_turu in [semalar.FaturaTuruEnum.SATIS, semalar.FaturaTuruEnum.ALIS_IADE, semalar.FaturaTuruEnum.DEVIR_GIRIS]: 
-                islem_yone_kasa = semalar.IslemYoneEnum.GIRIS
-            elif db_fatura.fatura_turu in [semalar.FaturaTuruEnum.ALIS, semalar.FaturaTuruEnum.SATIS_IADE]: 
-                islem_yone_kasa = semalar.IslemYoneEnum.CIKIS
-
-            if islem_yone_kasa:
-                db_kasa_banka_hareket = modeller.KasaBankaHareket(
-                    kasa_banka_id=fatura_data.kasa_banka_id, tarih=db_fatura.tarih,
-                    islem_turu=db_fatura.fatura_turu.value, islem_yone=islem_yone_kasa,
-                    tutar=db_fatura.genel_toplam, aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.fatura_turu.value})",
-                    kaynak=semalar.KaynakTipEnum.FATURA, kaynak_id=db_fatura.id,
-                    kullanici_id=kullanici_id
-                )
-                db.add(db_kasa_banka_hareket)
-                
-                db_kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == fatura_data.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
-                if db_kasa_banka:
-                    if islem_yone_kasa == semalar.IslemYoneEnum.GIRIS:
-                        db_kasa_banka.bakiye += db_fatura.genel_toplam
-                    else:
-                        db_kasa_banka.bakiye -= db_fatura.genel_toplam
-                    db.add(db_kasa_banka)
+            db_kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == fatura_data.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
+            if db_kasa_banka:
+                db_kasa_banka.bakiye += _kasa_hareket_bakiye_farki(kasa_satiri["islem_yone"], kasa_satiri["tutar"])
+                db.add(db_kasa_banka)
 
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         db.refresh(db_fatura)
         
         return db_fatura
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Fatura oluşturulurken hata: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Fatura oluşturulurken hata: {str(e)}")
+
+@faturalar_router.post("/bulk", response_model=modeller.FaturaTopluResponse)
+def create_faturalar_toplu(
+    faturalar_data: List[modeller.FaturaCreate],
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Birden fazla faturayı tek istek ve tek işlemde (transaction) oluşturur (gün sonu aktarımları, POS entegrasyonu).
+    Tüm belgeler birlikte doğrulanır: fatura numaraları tek sorguda, stok/kasa satırları tek kilitli sorguda,
+    cariler tek sorguda kontrol edilir. Hatalı belgeler sonuçta gerekçesiyle raporlanır ve atlanır; geçerli
+    belgelerin faturaları, kalemleri, stok/cari/kasa hareketleri toplu INSERT'lerle yazılır.
+    """
+    if len(faturalar_data) > MAKS_TOPLU_FATURA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tek istekte en fazla {MAKS_TOPLU_FATURA} fatura gönderilebilir.")
+
+    kullanici_id = current_user.id
+    Fatura, Stok, KasaBankaHesap = modeller.Fatura, modeller.Stok, modeller.KasaBankaHesap
+    sonuclar = [{"sira": sira, "fatura_no": fatura_data.fatura_no, "basarili": False} for sira, fatura_data in enumerate(faturalar_data)]
+
+    try:
+        # 1. Toplu doğrulama: tüm referanslar birer sorguyla okunur; stok ve kasa satırları id sırasıyla kilitlenir.
+        fatura_nolari = [fatura_data.fatura_no for fatura_data in faturalar_data]
+        mevcut_nolar = {no for (no,) in db.query(Fatura.fatura_no).filter(Fatura.fatura_no.in_(fatura_nolari), Fatura.kullanici_id == kullanici_id).all()} if fatura_nolari else set()
+        stoklar = _satirlari_kilitle(db, Stok, Stok.miktar, kullanici_id, [kalem.urun_id for f in faturalar_data for kalem in f.kalemler])
+        kasalar = _satirlari_kilitle(db, KasaBankaHesap, KasaBankaHesap.bakiye, kullanici_id, [f.kasa_banka_id for f in faturalar_data if f.kasa_banka_id])
+        cariler = {}
+        for cari_tip, cari_model in ((semalar.CariTipiEnum.MUSTERI, modeller.Musteri), (semalar.CariTipiEnum.TEDARIKCI, modeller.Tedarikci)):
+            idler = {f.cari_id for f in faturalar_data if _enum_degeri(f.cari_tip) == cari_tip.value}
+            cariler[cari_tip.value] = {cari_id for (cari_id,) in db.query(cari_model.id).filter(cari_model.id.in_(idler), cari_model.kullanici_id == kullanici_id).all()} if idler else set()
+
+        gecerliler = []
+        gorulen_nolar = set()
+        for sira, fatura_data in enumerate(faturalar_data):
+            hata = None
+            if fatura_data.fatura_no in mevcut_nolar or fatura_data.fatura_no in gorulen_nolar:
+                hata = "Bu fatura numarası zaten mevcut."
+            elif fatura_data.cari_id not in cariler.get(_enum_degeri(fatura_data.cari_tip), set()):
+                hata = f"Cari ID {fatura_data.cari_id} bulunamadı."
+            elif fatura_data.kasa_banka_id and fatura_data.kasa_banka_id not in kasalar:
+                hata = f"Kasa/Banka ID {fatura_data.kasa_banka_id} bulunamadı."
+            else:
+                eksik_urun = next((kalem.urun_id for kalem in fatura_data.kalemler if kalem.urun_id not in stoklar), None)
+                if eksik_urun is not None:
+                    hata = f"Ürün ID {eksik_urun} bulunamadı."
+            gorulen_nolar.add(fatura_data.fatura_no)
+            if hata:
+                sonuclar[sira]["hata"] = hata
+            else:
+                gecerliler.append((sira, fatura_data))
+
+        if gecerliler:
+            belge_sayaclarini_esitle(db, kullanici_id, FATURA_NUMARA_ONEKLERI.values(), [fatura_data.fatura_no for _, fatura_data in gecerliler])
+
+            # 2. Faturalar tek flush ile eklenir; SQLAlchemy bunları çok satırlı INSERT ... RETURNING olarak gruplar.
+            db_faturalar = [_fatura_orm_nesnesi(fatura_data, kullanici_id) for _, fatura_data in gecerliler]
+            db.add_all(db_faturalar)
+            db.flush()
+            fatura_ciftleri = [(db_fatura, fatura_data) for db_fatura, (_, fatura_data) in zip(db_faturalar, gecerliler)]
+
+            # 3. Kalemler tek toplu INSERT ile eklenir; stoklar tek UPDATE ve tek toplu stok hareketi INSERT'i ile işlenir.
+            kalem_satirlari = [
+                dict(kalem_data.model_dump(), fatura_id=db_fatura.id)
+                for db_fatura, fatura_data in fatura_ciftleri for kalem_data in fatura_data.kalemler
+            ]
+            if kalem_satirlari:
+                db.execute(insert(modeller.FaturaKalemi), kalem_satirlari)
+            _faturalar_stoklarini_isle(db, kullanici_id, [(db_fatura, fatura_data.kalemler) for db_fatura, fatura_data in fatura_ciftleri])
+
+            # 4. Cari/kasa hareketleri toplu eklenir; bakiyeler ve günlük özet cari/gün bazında toplanmış farklarla güncellenir.
+            cari_satirlari, kasa_satirlari = [], []
+            cari_farklari = defaultdict(float)
+            kasa_farklari = defaultdict(float)
+            gunluk_farklar = defaultdict(lambda: defaultdict(float))
+            for db_fatura, fatura_data in fatura_ciftleri:
+                fatura_cari_satirlari, kasa_satiri = _fatura_hareket_satirlari(db_fatura)
+                cari_satirlari.extend(fatura_cari_satirlari)
+                for cari_satiri in fatura_cari_satirlari:
+                    cari_farklari[(cari_satiri["cari_id"], cari_satiri["cari_tip"])] += _cari_hareket_delta(cari_satiri["islem_yone"], cari_satiri["tutar"])
+                if kasa_satiri:
+                    kasa_satirlari.append(kasa_satiri)
+                    kasa_farki = _kasa_hareket_bakiye_farki(kasa_satiri["islem_yone"], kasa_satiri["tutar"])
+                    kasa_farklari[kasa_satiri["kasa_banka_id"]] += kasa_farki
+                    gunluk_farklar[db_fatura.tarih]["nakit_giris" if kasa_farki >= 0 else "nakit_cikis"] += abs(kasa_farki)
+
+                if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
+                    gunluk_farklar[db_fatura.tarih]["satis_toplami"] += db_fatura.genel_toplam or 0.0
+                    gunluk_farklar[db_fatura.tarih]["satis_maliyeti"] += sum(
+                        kalem.miktar * (kalem.alis_fiyati_fatura_aninda or 0.0) for kalem in fatura_data.kalemler
+                    )
+                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
+                    gunluk_farklar[db_fatura.tarih]["alis_toplami"] += db_fatura.genel_toplam or 0.0
+
+            if cari_satirlari:
+                db.execute(insert(modeller.CariHareket), cari_satirlari)
+            if kasa_satirlari:
+                db.execute(insert(modeller.KasaBankaHareket), kasa_satirlari)
+            for (cari_id, cari_tip), fark in sorted(cari_farklari.items()):
+                _cari_bakiye_delta_uygula(db, cari_id, cari_tip, kullanici_id, fark)
+            _farklari_uygula(db, KasaBankaHesap, KasaBankaHesap.bakiye, kullanici_id, kasa_farklari)
+            for tarih, farklar in sorted(gunluk_farklar.items()):
+                _gunluk_ozet_delta_uygula(db, kullanici_id, tarih, **farklar)
+
+            for db_fatura, (sira, _) in zip(db_faturalar, gecerliler):
+                sonuclar[sira].update(basarili=True, id=db_fatura.id)
+
+        db.commit()
+        if gecerliler:
+            pano_onbellegini_temizle(kullanici_id)
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Toplu fatura oluşturulurken hata: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Toplu fatura oluşturulurken hata: {str(e)}")
+
+    olusturulan = sum(1 for sonuc in sonuclar if sonuc["basarili"])
+    return {"olusturulan": olusturulan, "hatali": len(sonuclar) - olusturulan, "sonuclar": sonuclar}
     
+def _fatura_liste_satiri(fatura: modeller.Fatura) -> modeller.FaturaRead:
+    """Önceden yüklenmiş ilişkilerden cari ve kasa/banka adlarını ekleyerek FaturaRead üretir."""
+    fatura_read = modeller.FaturaRead.model_validate(fatura, from_attributes=True)
+    cari = fatura.musteri if fatura.cari_tip == semalar.CariTipiEnum.MUSTERI.value else fatura.tedarikci
+    if cari:
+        fatura_read.cari_adi = cari.ad
+        fatura_read.cari_kodu = cari.kod
+    if fatura.kasa_banka:
+        fatura_read.kasa_banka_adi = fatura.kasa_banka.hesap_adi
+    return fatura_read
+
 @faturalar_router.get("/", response_model=modeller.FaturaListResponse) 
 @faturalar_router.get("", response_model=modeller.FaturaListResponse)
 def read_faturalar(
@@ -609,27 +739,42 @@ def read_faturalar(
     limit: int = Query(100, ge=1, le=1000000),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
     arama: str = Query(None, min_length=1, max_length=50),
+    sirali: bool = Query(False, description="Arama sonuçlarını benzerliğe göre sırala (yazım hatalarına toleranslı)"),
     fatura_turu: Optional[semalar.FaturaTuruEnum] = Query(None),
     baslangic_tarihi: date = Query(None),
     bitis_tarihi: date = Query(None),
     cari_id: int = Query(None),
     odeme_turu: Optional[semalar.OdemeTuruEnum] = Query(None),
     kasa_banka_id: Optional[int] = Query(None),
+    after: Optional[str] = Query(None, description="İmleç modunda önceki sayfanın next_cursor değeri"),
+    cursor: bool = Query(False, description="Ofset yerine imleç (keyset) sayfalaması kullan"),
+    include_total: bool = Query(False, description="İmleç modunda toplam kayıt sayısını da hesapla"),
+    include: Optional[str] = Query(None, description="Virgülle ayrılmış ek alanlar. Desteklenen: 'kalemler'"),
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id 
+    ek_alanlar = {alan.strip() for alan in include.split(",")} if include else set()
 
+    # Cari ve kasa/banka adları aynı sorgudaki dış birleştirmelerden doldurulur (satır başına ek sorgu yok).
+    # Kalemler yalnızca istenirse tek bir ek IN sorgusuyla (selectinload) yüklenir.
     query = db.query(modeller.Fatura).filter(modeller.Fatura.kullanici_id == kullanici_id) \
-                                   .join(modeller.Musteri, modeller.Fatura.cari_id == modeller.Musteri.id, isouter=True) \
-                                   .join(modeller.Tedarikci, modeller.Fatura.cari_id == modeller.Tedarikci.id, isouter=True)
-
+                                   .outerjoin(modeller.Fatura.musteri) \
+                                   .outerjoin(modeller.Fatura.tedarikci) \
+                                   .outerjoin(modeller.Fatura.kasa_banka) \
+                                   .options(
+                                       contains_eager(modeller.Fatura.musteri),
+                                       contains_eager(modeller.Fatura.tedarikci),
+                                       contains_eager(modeller.Fatura.kasa_banka),
+                                       selectinload(modeller.Fatura.kalemler) if "kalemler" in ek_alanlar else noload(modeller.Fatura.kalemler)
+                                   )
+
+    skor = None
     if arama:
-        query = query.filter(
-            (modeller.Fatura.fatura_no.ilike(f"%{arama}%")) |
-            (modeller.Musteri.ad.ilike(f"%{arama}%")) | 
-            (modeller.Tedarikci.ad.ilike(f"%{arama}%")) |
-            (modeller.Fatura.misafir_adi.ilike(f"%{arama}%"))
+        arama_kosulu, skor = bulanik_arama(
+            (modeller.Fatura.fatura_no, modeller.Musteri.ad, modeller.Tedarikci.ad, modeller.Fatura.misafir_adi),
+            arama, sirali=sirali
         )
+        query = query.filter(arama_kosulu)
     
     if fatura_turu:
         query = query.filter(modeller.Fatura.fatura_turu == fatura_turu)
@@ -649,13 +794,15 @@ def read_faturalar(
     if kasa_banka_id:
         query = query.filter(modeller.Fatura.kasa_banka_id == kasa_banka_id)
 
-    total_count = query.count()
-    faturalar = query.order_by(modeller.Fatura.tarih.desc()).offset(skip).limit(limit).all()
+    if skor is not None:
+        faturalar, total_count, next_cursor = benzerlige_gore_sayfala(query, skor, modeller.Fatura.id, limit, skip=skip)
+    else:
+        faturalar, total_count, next_cursor = sayfala(
+            query, (modeller.Fatura.tarih, modeller.Fatura.id), limit,
+            skip=skip, after=after, imlec_modu=cursor, toplam_iste=include_total
+        )
 
-    return {"items": [
-        modeller.FaturaRead.model_validate(fatura, from_attributes=True)
-        for fatura in faturalar
-    ], "total": total_count}
+    return {"items": [_fatura_liste_satiri(fatura) for fatura in faturalar], "total": total_count, "next_cursor": next_cursor}
 
 @faturalar_router.get("/{fatura_id}", response_model=modeller.FaturaRead)
 def read_fatura(fatura_id: int, current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user), db: Session = Depends(get_db)):
@@ -664,344 +811,329 @@ def read_fatura(fatura_id: int, current_user: modeller.KullaniciRead = Depends(g
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura bulunamadı")
     return fatura
 
+# Güncellemede değiştiğinde cari/kasa hareketlerinin yeniden hesaplanmasını gerektiren fatura alanları.
+# Bunların dışındaki alanlar (notlar, misafir adı vb.) yalnızca fatura satırını günceller.
+FATURA_HAREKET_ALANLARI = (
+    "fatura_no", "fatura_turu", "tarih", "vade_tarihi", "cari_id", "cari_tip",
+    "odeme_turu", "kasa_banka_id", "genel_toplam"
+)
+FATURA_KALEM_ALANLARI = (
+    "urun_id", "miktar", "birim_fiyat", "kdv_orani", "alis_fiyati_fatura_aninda",
+    "iskonto_yuzde_1", "iskonto_yuzde_2", "iskonto_tipi", "iskonto_degeri"
+)
+
+def _urune_gore_grupla(satirlar) -> dict:
+    gruplar = defaultdict(list)
+    for satir in satirlar:
+        gruplar[satir.urun_id].append(satir)
+    return gruplar
+
+def _fatura_ozet_farklari(fatura_turu, genel_toplam: float, maliyet: float, isaret: int = 1) -> dict:
+    """Bir faturanın günlük özete katkısını alan/değer sözlüğü olarak döndürür (bkz. _fatura_gunluk_ozete_isle)."""
+    if fatura_turu == semalar.FaturaTuruEnum.SATIS:
+        return {"satis_toplami": isaret * (genel_toplam or 0.0), "satis_maliyeti": isaret * (maliyet or 0.0)}
+    if fatura_turu == semalar.FaturaTuruEnum.ALIS:
+        return {"alis_toplami": isaret * (genel_toplam or 0.0)}
+    return {}
+
+def _fatura_maliyeti(kalemler) -> float:
+    return sum((kalem.miktar or 0.0) * (kalem.alis_fiyati_fatura_aninda or 0.0) for kalem in kalemler)
+
+def _fatura_kalemlerini_esitle(db: Session, db_fatura: modeller.Fatura, eski_kalemler: List[modeller.FaturaKalemi], yeni_kalemler: Sequence) -> set:
+    """
+    Faturanın kalemlerini yeni listeye eşitler ve kalemi değişen ürün id'lerini döndürür.
+    Eski ve yeni kalemler ürün bazında sırayla eşleştirilir: eşleşen kalemlerde yalnızca değişen alanlar
+    güncellenir, fazla eski kalemler tek DELETE ile silinir, yeni kalemler tek toplu INSERT ile eklenir.
+    """
+    eski_gruplar = _urune_gore_grupla(eski_kalemler)
+    yeni_gruplar = _urune_gore_grupla(yeni_kalemler)
+    degisen_urunler = set()
+    silinecek_idler = []
+    eklenecekler = []
+
+    for urun_id in eski_gruplar.keys() | yeni_gruplar.keys():
+        for eski_kalem, yeni_kalem in zip_longest(eski_gruplar.get(urun_id, []), yeni_gruplar.get(urun_id, [])):
+            if yeni_kalem is None:
+                silinecek_idler.append(eski_kalem.id)
+                degisen_urunler.add(urun_id)
+            elif eski_kalem is None:
+                eklenecekler.append(dict(yeni_kalem.model_dump(), fatura_id=db_fatura.id))
+                degisen_urunler.add(urun_id)
+            else:
+                for alan, deger in yeni_kalem.model_dump().items():
+                    if alan in FATURA_KALEM_ALANLARI and getattr(eski_kalem, alan) != deger:
+                        setattr(eski_kalem, alan, deger)
+                        degisen_urunler.add(urun_id)
+
+    if silinecek_idler:
+        db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.id.in_(silinecek_idler)).delete(synchronize_session=False)
+    if eklenecekler:
+        db.execute(insert(modeller.FaturaKalemi), eklenecekler)
+    return degisen_urunler
+
+def _fatura_stok_hareketlerini_esitle(
+    db: Session, db_fatura: modeller.Fatura, eski_yon: int, eski_kalemler: Sequence, yeni_kalemler: Sequence,
+    degisen_urunler: set, baslik_degisti: bool
+):
+    """
+    Fatura güncellemesinin stok etkisini yalnızca net farklarla uygular.
+    Her ürün için eski etki (eski_yon * eski miktar) ile yeni etki arasındaki fark stoğa tek UPDATE ile yazılır.
+    Stok hareketleri yerinde güncellenir: başlık (no/tarih/tür) değiştiyse tüm satırlar tek UPDATE ile düzeltilir,
+    kalemi değişen ürünlerin hareketleri ise kalemlerle sırayla eşleştirilip güncellenir/silinir/eklenir.
+    """
+    kullanici_id = db_fatura.kullanici_id
+    StokHareket = modeller.StokHareket
+    yeni_yon = FATURA_STOK_YONLERI.get(db_fatura.fatura_turu, 0)
+    hareket_kosullari = (
+        StokHareket.kaynak == semalar.KaynakTipEnum.FATURA.value,
+        StokHareket.kaynak_id == db_fatura.id,
+        StokHareket.kullanici_id == kullanici_id
+    )
+    islem_tipi = FATURA_STOK_ISLEM_TIPLERI.get(db_fatura.fatura_turu)
+    aciklama = f"{db_fatura.fatura_no} nolu fatura ({_enum_degeri(db_fatura.fatura_turu)})"
+
+    if eski_yon != yeni_yon:
+        degisen_urunler = degisen_urunler | {kalem.urun_id for kalem in eski_kalemler} | {kalem.urun_id for kalem in yeni_kalemler}
+    if baslik_degisti:
+        db.query(StokHareket).filter(*hareket_kosullari).update(
+            {StokHareket.tarih: db_fatura.tarih, StokHareket.islem_tipi: islem_tipi, StokHareket.aciklama: aciklama},
+            synchronize_session=False
+        )
+    if not degisen_urunler:
+        return
+
+    eski_etki = defaultdict(float)
+    yeni_etki = defaultdict(float)
+    for kalem in eski_kalemler:
+        if kalem.urun_id in degisen_urunler:
+            eski_etki[kalem.urun_id] += eski_yon * kalem.miktar
+    for kalem in yeni_kalemler:
+        if kalem.urun_id in degisen_urunler:
+            yeni_etki[kalem.urun_id] += yeni_yon * kalem.miktar
+
+    stoklar = _satirlari_kilitle(db, modeller.Stok, modeller.Stok.miktar, kullanici_id, degisen_urunler)
+    eksik_urun = next((urun_id for urun_id in yeni_etki if urun_id not in stoklar), None)
+    if eksik_urun is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ürün ID {eksik_urun} bulunamadı.")
+    _farklari_uygula(db, modeller.Stok, modeller.Stok.miktar, kullanici_id, {
+        urun_id: yeni_etki[urun_id] - eski_etki[urun_id] for urun_id in degisen_urunler
+    })
+
+    # Hareketlerin önceki/sonraki stok değerleri ürünün fatura dışı stoğundan (güncel stok - eski etki) yürütülür.
+    yuruyen_stok = {urun_id: miktar - eski_etki[urun_id] for urun_id, miktar in stoklar.items()}
+    eski_hareketler = _urune_gore_grupla(
+        db.query(StokHareket).filter(*hareket_kosullari, StokHareket.urun_id.in_(degisen_urunler)).order_by(StokHareket.id).all()
+    )
+    yeni_gruplar = _urune_gore_grupla(yeni_kalemler)
+    silinecek_idler = []
+    eklenecekler = []
+    for urun_id in sorted(degisen_urunler):
+        for hareket, kalem in zip_longest(eski_hareketler.get(urun_id, []), yeni_gruplar.get(urun_id, [])):
+            if kalem is None:
+                silinecek_idler.append(hareket.id)
+                continue
+            onceki_stok = yuruyen_stok[urun_id]
+            yuruyen_stok[urun_id] = onceki_stok + yeni_yon * kalem.miktar
+            degerler = {
+                "miktar": kalem.miktar, "birim_fiyat": kalem.birim_fiyat,
+                "onceki_stok": onceki_stok, "sonraki_stok": yuruyen_stok[urun_id]
+            }
+            if hareket is None:
+                eklenecekler.append(dict(
+                    degerler, urun_id=urun_id, tarih=db_fatura.tarih, islem_tipi=islem_tipi, aciklama=aciklama,
+                    kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=db_fatura.id, kullanici_id=kullanici_id
+                ))
+            else:
+                for alan, deger in degerler.items():
+                    if getattr(hareket, alan) != deger:
+                        setattr(hareket, alan, deger)
+
+    if silinecek_idler:
+        db.query(StokHareket).filter(StokHareket.id.in_(silinecek_idler)).delete(synchronize_session=False)
+    if eklenecekler:
+        db.execute(insert(StokHareket), eklenecekler)
+
+def _fatura_cari_kasa_hareketlerini_esitle(db: Session, db_fatura: modeller.Fatura):
+    """
+    Faturanın cari ve kasa/banka hareketlerini güncel fatura başlığına eşitler.
+    Mevcut satırlar oluşturulma sırasıyla (fatura kaydı, ödeme kaydı) yeni satırlarla eşleştirilir; yalnızca farklı
+    olan satırlar güncellenir ve bunların eski etkisi bakiyeden/günlük özetten düşülüp yenisi eklenir.
+    """
+    kullanici_id = db_fatura.kullanici_id
+    CariHareket, KasaBankaHareket = modeller.CariHareket, modeller.KasaBankaHareket
+    yeni_cari_satirlari, yeni_kasa_satiri = _fatura_hareket_satirlari(db_fatura)
+
+    eski_cari_hareketler = db.query(CariHareket).filter(
+        CariHareket.kaynak == semalar.KaynakTipEnum.FATURA.value,
+        CariHareket.kaynak_id == db_fatura.id,
+        CariHareket.kullanici_id == kullanici_id
+    ).order_by(CariHareket.id).all()
+    for hareket, satir in zip_longest(eski_cari_hareketler, yeni_cari_satirlari):
+        if hareket is not None and satir is not None and all(_enum_degeri(getattr(hareket, alan)) == _enum_degeri(deger) for alan, deger in satir.items()):
+            continue
+        if hareket is not None:
+            _cari_hareket_bakiyeye_isle(db, hareket, isaret=-1)
+        if satir is None:
+            db.delete(hareket)
+            continue
+        if hareket is None:
+            hareket = modeller.CariHareket(**satir)
+            db.add(hareket)
+        else:
+            for alan, deger in satir.items():
+                setattr(hareket, alan, deger)
+        _cari_hareket_bakiyeye_isle(db, hareket)
+
+    eski_kasa_hareketler = db.query(KasaBankaHareket).filter(
+        KasaBankaHareket.kaynak == semalar.KaynakTipEnum.FATURA.value,
+        KasaBankaHareket.kaynak_id == db_fatura.id,
+        KasaBankaHareket.kullanici_id == kullanici_id
+    ).order_by(KasaBankaHareket.id).all()
+    kasa_farklari = defaultdict(float)
+    for hareket, satir in zip_longest(eski_kasa_hareketler, [yeni_kasa_satiri] if yeni_kasa_satiri else []):
+        if hareket is not None and satir is not None and all(_enum_degeri(getattr(hareket, alan)) == _enum_degeri(deger) for alan, deger in satir.items()):
+            continue
+        if hareket is not None:
+            kasa_farklari[hareket.kasa_banka_id] -= _kasa_hareket_bakiye_farki(hareket.islem_yone, hareket.tutar)
+            _kasa_hareket_gunluk_ozete_isle(db, hareket, isaret=-1)
+        if satir is None:
+            db.delete(hareket)
+            continue
+        if hareket is None:
+            hareket = modeller.KasaBankaHareket(**satir)
+            db.add(hareket)
+        else:
+            for alan, deger in satir.items():
+                setattr(hareket, alan, deger)
+        kasa_farklari[hareket.kasa_banka_id] += _kasa_hareket_bakiye_farki(satir["islem_yone"], satir["tutar"])
+        _kasa_hareket_gunluk_ozete_isle(db, hareket)
+    _farklari_uygula(db, modeller.KasaBankaHesap, modeller.KasaBankaHesap.bakiye, kullanici_id, kasa_farklari)
+
 @faturalar_router.put("/{fatura_id}", response_model=modeller.FaturaRead)
 def update_fatura(fatura_id: int, fatura: modeller.FaturaUpdate, current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user), db: Session = Depends(get_db)):
+    """
+    Faturayı fark (diff) tabanlı günceller: eski kayıtlar geri alınıp yeniden oluşturulmaz.
+    Kalemler ürün bazında karşılaştırılır ve yalnızca net stok farkları uygulanır; hareket satırları yerinde
+    güncellenir. kalemler gönderilmezse mevcut kalemler korunur. Yalnızca not gibi alanlar değiştiğinde
+    stok, cari ve kasa hareketlerine hiç dokunulmaz.
+    """
     kullanici_id = current_user.id
-    db_fatura = db.query(modeller.Fatura).filter(modeller.Fatura.id == fatura_id, modeller.Fatura.kullanici_id == kullanici_id).first()
+    db_fatura = db.query(modeller.Fatura).filter(modeller.Fatura.id == fatura_id, modeller.Fatura.kullanici_id == kullanici_id).with_for_update().first()
     if not db_fatura:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura bulunamadı")
     
     db.begin_nested()
 
     try:
-        # 1. Eski Kayıtları Geri Al (Stok, Cari, Kasa/Banka)
-        old_kalemler = db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id == fatura_id).all()
-
-        for old_kalem in old_kalemler:
-            stok = db.query(modeller.Stok).filter(modeller.Stok.id == old_kalem.urun_id, modeller.Stok.kullanici_id == kullanici_id).first()
-            if stok:
-                # Ters stok hareketi mantığı
-                if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
-                    stok.miktar += old_kalem.miktar
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
-                    stok.miktar -= old_kalem.miktar
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE:
-                    stok.miktar -= old_kalem.miktar
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE:
-                    stok.miktar += old_kalem.miktar
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.DEVIR_GIRIS:
-                    stok.miktar -= old_kalem.miktar
-                db.add(stok)
-
-        # Eski hareket kayıtlarını sil (MODEL TUTARLILIĞI DÜZELTİLDİ)
-        db.query(modeller.StokHareket).filter(
-            and_(
-                modeller.StokHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.StokHareket.kaynak_id == fatura_id,
-                modeller.StokHareket.kullanici_id == kullanici_id
-            )
-        ).delete(synchronize_session=False)
-
-        db.query(modeller.CariHareket).filter(
-            and_(
-                modeller.CariHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.CariHareket.kaynak_id == fatura_id,
-                modeller.CariHareket.kullanici_id == kullanici_id
-            )
-        ).delete(synchronize_session=False)
-        
-        # Sadece fatura silme işlemindeki hatalı döngüdeki delete'ler kaldırıldı.
-        # Toplu delete ile tüm hareketler silindiği için, alttaki bireysel delete döngülerine gerek kalmadı.
-
-        # Kasa/Banka hareketlerini geri al ve sil (MODEL TUTARLILIĞI DÜZELTİLDİ)
-        old_kasa_banka_hareketler = db.query(modeller.KasaBankaHareket).filter(
-            and_(
-                modeller.KasaBankaHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.KasaBankaHareket.kaynak_id == fatura_id,
-                modeller.KasaBankaHareket.kullanici_id == kullanici_id
-            )
-        ).all()
-        for old_kasa_banka_hareket in old_kasa_banka_hareketler:
-            # Model Tutarlılığı: semalar.KasaBanka -> modeller.KasaBankaHesap
-            kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == old_kasa_banka_hareket.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
-            if kasa_banka:
-                if old_kasa_banka_hareket.islem_yone == semalar.IslemYoneEnum.GIRIS:
-                    kasa_banka.bakiye -= old_kasa_banka_hareket.tutar
-                elif old_kasa_banka_hareket.islem_yone == semalar.IslemYoneEnum.CIKIS:
-                    kasa_banka.bakiye += old_kasa_banka_hareket.tutar
-                db.add(kasa_banka)
-            db.delete(old_kasa_banka_hareket)
-
-        # Eski fatura kalemlerini sil (MODEL TUTARLILIĞI DÜZELTİLDİ)
-        db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id == fatura_id).delete(synchronize_session=False)
-
-        # 2. Faturayı Güncelle ve Yeni Kayıtları Oluştur
-        update_data = fatura.model_dump(exclude_unset=True, exclude={"kalemler"})
+        eski_baslik = {alan: getattr(db_fatura, alan) for alan in FATURA_HAREKET_ALANLARI}
+        eski_yon = FATURA_STOK_YONLERI.get(db_fatura.fatura_turu, 0)
+        eski_kalemler = db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id == fatura_id).order_by(modeller.FaturaKalemi.id).all()
+        # Kalem nesneleri eşitleme sırasında yerinde değişeceğinden eski değerlerin kopyası alınır.
+        eski_kalem_ozetleri = [SimpleNamespace(
+            urun_id=k.urun_id, miktar=k.miktar, birim_fiyat=k.birim_fiyat, alis_fiyati_fatura_aninda=k.alis_fiyati_fatura_aninda
+        ) for k in eski_kalemler]
+
+        # 1. Başlık alanları
+        update_data = fatura.model_dump(exclude_unset=True, exclude={"kalemler", "kullanici_id"})
         for key, value in update_data.items():
-            setattr(db_fatura, key, value)
-        
-        new_toplam_kdv_haric_temp = 0.0
-        new_toplam_kdv_dahil_temp = 0.0
-        
-        for kalem_data in fatura.kalemler or []:
-            birim_fiyat_kdv_haric_temp = kalem_data.birim_fiyat
-            if kalem_data.kdv_orani > 0:
-                birim_fiyat_kdv_dahil_temp_calc = kalem_data.birim_fiyat * (1 + kalem_data.kdv_orani / 100)
-            else:
-                birim_fiyat_kdv_dahil_temp_calc = kalem_data.birim_fiyat
-
-            fiyat_iskonto_1_sonrasi_dahil = birim_fiyat_kdv_dahil_temp_calc * (1 - kalem_data.iskonto_yuzde_1 / 100)
-            iskontolu_birim_fiyat_kdv_dahil = fiyat_iskonto_1_sonrasi_dahil * (1 - kalem_data.iskonto_yuzde_2 / 100)
-            
-            if iskontolu_birim_fiyat_kdv_dahil < 0: iskontolu_birim_fiyat_kdv_dahil = 0.0
-
-            if kalem_data.kdv_orani > 0:
-                iskontolu_birim_fiyat_kdv_haric = iskontolu_birim_fiyat_kdv_dahil / (1 + kalem_data.kdv_orani / 100)
-            else:
-                iskontolu_birim_fiyat_kdv_haric = iskontolu_birim_fiyat_kdv_dahil
+            if getattr(db_fatura, key) != value:
+                setattr(db_fatura, key, value)
+        if "fatura_no" in update_data:
+            belge_sayaclarini_esitle(db, kullanici_id, FATURA_NUMARA_ONEKLERI.values(), [update_data["fatura_no"]])
+
+        # 2. Kalemler (gönderildiyse) ürün bazında eşitlenir
+        degisen_urunler = set()
+        if fatura.kalemler is not None:
+            yeni_kalemler = fatura.kalemler
+            degisen_urunler = _fatura_kalemlerini_esitle(db, db_fatura, eski_kalemler, yeni_kalemler)
+        else:
+            yeni_kalemler = eski_kalem_ozetleri
 
-            new_toplam_kdv_haric_temp += iskontolu_birim_fiyat_kdv_haric * kalem_data.miktar
-            new_toplam_kdv_dahil_temp += iskontolu_birim_fiyat_kdv_dahil * kalem_data.miktar
+        if degisen_urunler or "genel_iskonto_tipi" in update_data or "genel_iskonto_degeri" in update_data:
+            toplamlar = _fatura_toplamlarini_hesapla(
+                fatura.kalemler if fatura.kalemler is not None else eski_kalemler,
+                db_fatura.genel_iskonto_tipi, db_fatura.genel_iskonto_degeri
+            )
+            for alan, deger in toplamlar.items():
+                setattr(db_fatura, alan, deger)
 
-        if db_fatura.genel_iskonto_tipi == "YUZDE" and db_fatura.genel_iskonto_degeri > 0:
-            uygulanan_genel_iskonto_tutari_yeni = new_toplam_kdv_dahil_temp * (db_fatura.genel_iskonto_degeri / 100) # KDV DAHİL üzerinden hesaplandı
-        elif db_fatura.genel_iskonto_tipi == "TUTAR" and db_fatura.genel_iskonto_degeri > 0:
-            uygulanan_genel_iskonto_tutari_yeni = db_fatura.genel_iskonto_degeri
-        else:
-            uygulanan_genel_iskonto_tutari_yeni = 0.0
-        
-        # KDV hariç toplamı yeniden hesaplayalım
-        if uygulanan_genel_iskonto_tutari_yeni > 0 and new_toplam_kdv_dahil_temp > 0:
-            genel_iskonto_oran_dahil = uygulanan_genel_iskonto_tutari_yeni / new_toplam_kdv_dahil_temp
-            toplam_kdv_haric_iskontolu_yeni = new_toplam_kdv_haric_temp * (1 - genel_iskonto_oran_dahil)
-        else:
-            toplam_kdv_haric_iskontolu_yeni = new_toplam_kdv_haric_temp
-            
-        db_fatura.toplam_kdv_haric = toplam_kdv_haric_iskontolu_yeni
-        db_fatura.toplam_kdv_dahil = new_toplam_kdv_dahil_temp - uygulanan_genel_iskonto_tutari_yeni
-        db_fatura.genel_toplam = db_fatura.toplam_kdv_dahil
-        db_fatura.toplam_kdv = db_fatura.genel_toplam - db_fatura.toplam_kdv_haric
         db_fatura.son_guncelleme_tarihi_saat = datetime.now()
         db_fatura.son_guncelleyen_kullanici_id = kullanici_id
 
-        db.add(db_fatura)
+        # 3. Stok: yalnızca net farklar ve değişen hareket satırları
+        yeni_baslik = {alan: getattr(db_fatura, alan) for alan in FATURA_HAREKET_ALANLARI}
+        stok_basligi_degisti = any(eski_baslik[alan] != yeni_baslik[alan] for alan in ("fatura_no", "fatura_turu", "tarih"))
+        _fatura_stok_hareketlerini_esitle(db, db_fatura, eski_yon, eski_kalem_ozetleri, yeni_kalemler, degisen_urunler, stok_basligi_degisti)
 
-        for kalem_data in fatura.kalemler or []:
-            # Model Tutarlılığı: semalar.FaturaKalemi -> modeller.FaturaKalemi
-            db_kalem = modeller.FaturaKalemi(fatura_id=db_fatura.id, **kalem_data.model_dump())
-            db.add(db_kalem)
+        # 4. Günlük özet: eski katkı düşülür, yenisi eklenir (değiştiyse)
+        eski_ozet = (eski_baslik["fatura_turu"], eski_baslik["tarih"], eski_baslik["genel_toplam"], _fatura_maliyeti(eski_kalem_ozetleri))
+        yeni_ozet = (db_fatura.fatura_turu, db_fatura.tarih, db_fatura.genel_toplam, _fatura_maliyeti(yeni_kalemler))
+        if eski_ozet != yeni_ozet:
+            eski_tur, eski_tarih, eski_toplam, eski_maliyet = eski_ozet
+            yeni_tur, yeni_tarih, yeni_toplam, yeni_maliyet = yeni_ozet
+            _gunluk_ozet_delta_uygula(db, kullanici_id, eski_tarih, **_fatura_ozet_farklari(eski_tur, eski_toplam, eski_maliyet, isaret=-1))
+            _gunluk_ozet_delta_uygula(db, kullanici_id, yeni_tarih, **_fatura_ozet_farklari(yeni_tur, yeni_toplam, yeni_maliyet))
 
-            # Model Tutarlılığı: semalar.Stok -> modeller.Stok
-            db_stok = db.query(modeller.Stok).filter(modeller.Stok.id == kalem_data.urun_id, modeller.Stok.kullanici_id == kullanici_id).first()
-            if db_stok:
-                miktar_degisimi = kalem_data.miktar
-                islem_tipi = None
-                stok_miktar_oncesi = db_stok.miktar
-
-                if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
-                    db_stok.miktar -= miktar_degisimi
-                    islem_tipi = semalar.StokIslemTipiEnum.SATIŞ
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
-                    db_stok.miktar += miktar_degisimi
-                    islem_tipi = semalar.StokIslemTipiEnum.ALIŞ
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE:
-                    db_stok.miktar += miktar_degisimi
-                    islem_tipi = semalar.StokIslemTipiEnum.SATIŞ_İADE
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE:
-                    db_stok.miktar -= miktar_degisimi
-                    islem_tipi = semalar.StokIslemTipiEnum.ALIŞ_İADE
-                elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.DEVIR_GIRIS:
-                    db_stok.miktar += miktar_degisimi
-                    islem_tipi = semalar.StokIslemTipiEnum.GİRİŞ
-
-                if islem_tipi:
-                    db.add(db_stok)
-                    # Model Tutarlılığı: semalar.StokHareket -> modeller.StokHareket
-                    db_stok_hareket = modeller.StokHareket(
-                        urun_id=kalem_data.urun_id,
-                        tarih=db_fatura.tarih,
-                        islem_tipi=islem_tipi,
-                        miktar=miktar_degisimi,
-                        birim_fiyat=kalem_data.birim_fiyat,
-                        kaynak=semalar.KaynakTipEnum.FATURA,
-                        kaynak_id=db_fatura.id,
-                        aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.fatura_turu.value})",
-                        onceki_stok=stok_miktar_oncesi,
-                        sonraki_stok=db_stok.miktar,
-                        kullanici_id=kullanici_id
-                    )
-                    db.add(db_stok_hareket)
-
-        # 3. Yeni Cari ve Kasa Hareketlerini Oluştur
-        if db_fatura.cari_id:
-            islem_yone_fatura = None
-            cari_turu = None
-
-            if db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS:
-                islem_yone_fatura = semalar.IslemYoneEnum.ALACAK
-                cari_turu = semalar.CariTipiEnum.MUSTERI
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS:
-                islem_yone_fatura = semalar.IslemYoneEnum.BORC
-                cari_turu = semalar.CariTipiEnum.TEDARIKCI
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE:
-                islem_yone_fatura = semalar.IslemYoneEnum.BORC
-                cari_turu = semalar.CariTipiEnum.MUSTERI
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE:
-                islem_yone_fatura = semalar.IslemYoneEnum.ALACAK
-                cari_turu = semalar.CariTipiEnum.TEDARIKCI
-            elif db_fatura.fatura_turu == semalar.FaturaTuruEnum.DEVIR_GIRIS:
-                islem_yone_fatura = semalar.IslemYoneEnum.BORC
-                cari_turu = semalar.CariTipiEnum.TEDARIKCI
-
-            if islem_yone_fatura and cari_turu:
-                # Fatura kaydı (Borç/Alacak oluşturma)
-                db_cari_hareket = modeller.CariHareket(
-                    cari_id=db_fatura.cari_id,
-                    cari_tip=cari_turu.value,
-                    tarih=db_fatura.tarih,
-                    islem_turu=semalar.KaynakTipEnum.FATURA.value,
-                    islem_yone=islem_yone_fatura,
-                    tutar=db_fatura.genel_toplam,
-                    aciklama=f"{db_fatura.fatura_no} nolu Fatura Kaydı ({db_fatura.fatura_turu.value})",
-                    kaynak=semalar.KaynakTipEnum.FATURA,
-                    kaynak_id=db_fatura.id,
-                    odeme_turu=db_fatura.odeme_turu,
-                    vade_tarihi=db_fatura.vade_tarihi,
-                    kullanici_id=kullanici_id
-                )
-                db.add(db_cari_hareket)
-
-                # Ödeme/Tahsilat kaydı (Açık Hesap değilse)
-                if db_fatura.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP and db_fatura.kasa_banka_id:
-                    islem_yone_odeme = semalar.IslemYoneEnum.BORC if islem_yone_fatura == semalar.IslemYoneEnum.ALACAK else semalar.IslemYoneEnum.ALACAK
-                    
-                    odeme_cari_hareket = modeller.CariHareket(
-                        cari_id=db_fatura.cari_id,
-                        cari_tip=cari_turu.value,
-                        tarih=db_fatura.tarih,
-                        islem_turu=db_fatura.odeme_turu.value,
-                        islem_yone=islem_yone_odeme,
-                        tutar=db_fatura.genel_toplam,
-                        aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.odeme_turu.value}) ile ödendi/tahsil edildi",
-                        kaynak=semalar.KaynakTipEnum.FATURA,
-                        kaynak_id=db_fatura.id,
-                        odeme_turu=db_fatura.odeme_turu,
-                        kasa_banka_id=db_fatura.kasa_banka_id,
-                        kullanici_id=kullanici_id
-                    )
-                    db.add(odeme_cari_hareket)
-
-        # Kasa/Banka Hareket ve Bakiye Güncelleme (Açık Hesap değilse)
-        if db_fatura.odeme_turu != semalar.OdemeTuruEnum.ACIK_HESAP and db_fatura.kasa_banka_id:
-            islem_yone_kasa = None
-            if db_fatura.fatura_turu in [semalar.FaturaTuruEnum.SATIS, semalar.FaturaTuruEnum.ALIS_IADE, semalar.FaturaTuruEnum.DEVIR_GIRIS]: 
-                islem_yone_kasa = semalar.IslemYoneEnum.GIRIS
-            elif db_fatura.fatura_turu in [semalar.FaturaTuruEnum.ALIS, semalar.FaturaTuruEnum.SATIS_IADE]: 
-                islem_yone_kasa = semalar.IslemYoneEnum.CIKIS
-
-            if islem_yone_kasa:
-                # Model Tutarlılığı: semalar.KasaBankaHareket -> modeller.KasaBankaHareket
-                db_kasa_banka_hareket = modeller.KasaBankaHareket(
-                    kasa_banka_id=db_fatura.kasa_banka_id,
-                    tarih=db_fatura.tarih,
-                    islem_turu=db_fatura.fatura_turu.value,
-                    islem_yone=islem_yone_kasa,
-                    tutar=db_fatura.genel_toplam,
-                    aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.fatura_turu.value})",
-                    kaynak=semalar.KaynakTipEnum.FATURA,
-                    kaynak_id=db_fatura.id,
-                    kullanici_id=kullanici_id
-                )
-                db.add(db_kasa_banka_hareket)
-                
-                # Model Tutarlılığı: semalar.KasaBanka -> modeller.KasaBankaHesap
-                db_kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == db_fatura.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
-                if db_kasa_banka:
-                    if islem_yone_kasa == semalar.IslemYoneEnum.GIRIS:
-                        db_kasa_banka.bakiye += db_fatura.genel_toplam
-                    else:
-                        db_kasa_banka.bakiye -= db_fatura.genel_toplam
-                    db.add(db_kasa_banka)
+        # 5. Cari ve kasa/banka hareketleri yalnızca bunları etkileyen alanlar değiştiyse eşitlenir
+        if eski_baslik != yeni_baslik:
+            _fatura_cari_kasa_hareketlerini_esitle(db, db_fatura)
 
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         db.refresh(db_fatura)
         return db_fatura
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:  
         db.rollback()
         logger.error(f"Fatura güncellenirken hata: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fatura güncellenirken bir hata oluştu")
 
+def _faturalari_sil(db: Session, kullanici_id: int, fatura_idler: Sequence[int]):
+    """
+    Faturaları tüm etkileriyle birlikte küme tabanlı (set-based) siler; fatura sayısından bağımsız olarak
+    sabit sayıda sorgu çalışır. Stok ve kasa/banka bakiyeleri hareket tablolarından gruplanarak
+    UPDATE ... FROM ile geri alınır, cari bakiyeler ve günlük özet gruplanmış farklarla düzeltilir.
+    """
+    kaynak = semalar.KaynakTipEnum.FATURA.value
+    StokHareket, CariHareket, KasaBankaHareket = modeller.StokHareket, modeller.CariHareket, modeller.KasaBankaHareket
+    stok_kosullari = (StokHareket.kaynak == kaynak, StokHareket.kaynak_id.in_(fatura_idler), StokHareket.kullanici_id == kullanici_id)
+    cari_kosullari = (CariHareket.kaynak == kaynak, CariHareket.kaynak_id.in_(fatura_idler), CariHareket.kullanici_id == kullanici_id)
+    kasa_kosullari = (KasaBankaHareket.kaynak == kaynak, KasaBankaHareket.kaynak_id.in_(fatura_idler), KasaBankaHareket.kullanici_id == kullanici_id)
+
+    # 1. GÜNLÜK ÖZET (maliyet kalemlerden okunduğundan kalemler silinmeden önce)
+    _faturalari_gunluk_ozetten_dus(db, kullanici_id, fatura_idler)
+
+    # 2. STOK MİKTARLARINI GERİ AL ve STOK HAREKETLERİNİ SİL
+    _stok_hareketlerini_geri_al(db, kullanici_id, *stok_kosullari)
+    db.query(StokHareket).filter(*stok_kosullari).delete(synchronize_session=False)
+
+    # 3. CARİ BAKİYELERİ DÜZELT ve CARİ HAREKETLERİ SİL
+    _cari_hareketleri_bakiyeden_dus(db, *cari_kosullari)
+    db.query(CariHareket).filter(*cari_kosullari).delete(synchronize_session=False)
+
+    # 4. KASA/BANKA BAKİYELERİNİ DÜZELT ve HAREKETLERİ SİL
+    _kasa_hareketlerini_bakiyeden_dus(db, kullanici_id, *kasa_kosullari)
+    db.query(KasaBankaHareket).filter(*kasa_kosullari).delete(synchronize_session=False)
+
+    # 5. KALEMLERİ ve FATURALARI SİL
+    db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id.in_(fatura_idler)).delete(synchronize_session=False)
+    db.query(modeller.Fatura).filter(modeller.Fatura.id.in_(fatura_idler), modeller.Fatura.kullanici_id == kullanici_id).delete(synchronize_session=False)
+
 @faturalar_router.delete("/{fatura_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_fatura(fatura_id: int, current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user), db: Session = Depends(get_db)):
     # GÜVENLİK KURALI UYGULANDI: kullanici_id parametresi kaldırıldı, JWT'den alınıyor.
     kullanici_id = current_user.id
-    db_fatura = db.query(modeller.Fatura).filter(modeller.Fatura.id == fatura_id, modeller.Fatura.kullanici_id == kullanici_id).first()
+    db_fatura = db.query(modeller.Fatura.id).filter(modeller.Fatura.id == fatura_id, modeller.Fatura.kullanici_id == kullanici_id).with_for_update().first()
     if not db_fatura:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fatura bulunamadı")
     
     try:
-        db.begin_nested()
-        
-        # 1. FATURA KALEMLERİNİ SİL (kullanici_id filtresine gerek yok, fatura_id yeterli)
-        db.query(modeller.FaturaKalemi).filter(modeller.FaturaKalemi.fatura_id == fatura_id).delete(synchronize_session=False)
-
-        # 2. STOK HAREKETLERİNİ GERİ AL ve STOK MİKTARINI DÜZELT
-        stok_hareketleri = db.query(modeller.StokHareket).filter(
-            and_(
-                modeller.StokHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.StokHareket.kaynak_id == fatura_id,
-                modeller.StokHareket.kullanici_id == kullanici_id
-            )
-        ).all()
-        for hareket in stok_hareketleri:
-            stok = db.query(modeller.Stok).filter(modeller.Stok.id == hareket.urun_id, modeller.Stok.kullanici_id == kullanici_id).first()
-            if stok:
-                # Stok geri alma mantığı (İşlem tipini tersine çeviriyoruz)
-                if hareket.islem_tipi == semalar.StokIslemTipiEnum.SATIŞ:
-                    stok.miktar += hareket.miktar
-                elif hareket.islem_tipi == semalar.StokIslemTipiEnum.ALIŞ:
-                    stok.miktar -= hareket.miktar
-                elif hareket.islem_tipi == semalar.StokIslemTipiEnum.SATIŞ_İADE:
-                    stok.miktar -= hareket.miktar
-                elif hareket.islem_tipi == semalar.StokIslemTipiEnum.ALIŞ_İADE:
-                    stok.miktar += hareket.miktar
-                elif hareket.islem_tipi == semalar.StokIslemTipiEnum.GİRİŞ: # DEVIR_GIRIS
-                    stok.miktar -= hareket.miktar
-                db.add(stok)
-            db.delete(hareket)
-
-        # 3. CARİ HAREKETLERİ SİL
-        db.query(modeller.CariHareket).filter(
-            and_(
-                modeller.CariHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.CariHareket.kaynak_id == fatura_id,
-                modeller.CariHareket.kullanici_id == kullanici_id
-            )
-        ).delete(synchronize_session=False)
-        
-        # 4. KASA/BANKA HAREKETLERİNİ GERİ AL ve BAKİYEYİ DÜZELT
-        kasa_banka_hareketleri = db.query(modeller.KasaBankaHareket).filter(
-            and_(
-                modeller.KasaBankaHareket.kaynak == semalar.KaynakTipEnum.FATURA,
-                modeller.KasaBankaHareket.kaynak_id == fatura_id,
-                modeller.KasaBankaHareket.kullanici_id == kullanici_id
-            )
-        ).all()
-        for hareket in kasa_banka_hareketleri:
-            kasa_banka = db.query(modeller.KasaBankaHesap).filter(modeller.KasaBankaHesap.id == hareket.kasa_banka_id, modeller.KasaBankaHesap.kullanici_id == kullanici_id).first()
-            if kasa_banka:
-                # Kasa bakiye düzeltme mantığı
-                if hareket.islem_yone == semalar.IslemYoneEnum.GIRIS:
-                    kasa_banka.bakiye -= hareket.tutar # Girişi geri al
-                elif hareket.islem_yone == semalar.IslemYoneEnum.CIKIS:
-                    kasa_banka.bakiye += hareket.tutar # Çıkışı geri al
-                db.add(kasa_banka)
-            db.delete(hareket)
-
-        # 5. ANA FATURAYI SİL
-        db.delete(db_fatura)
+        _faturalari_sil(db, kullanici_id, [fatura_id])
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         return
 
     except Exception as e:
@@ -1009,6 +1141,42 @@ def delete_fatura(fatura_id: int, current_user: modeller.KullaniciRead = Depends
         logger.error(f"Fatura silinirken kritik hata: {e}", exc_info=True) 
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Fatura silinirken bir hata oluştu: {str(e)}")
 
+@faturalar_router.post("/bulk_delete", response_model=modeller.FaturaTopluSilmeResponse)
+def delete_faturalar_toplu(
+    istek: modeller.FaturaTopluSilmeRequest,
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Birden fazla faturayı tek işlemde (transaction) siler; stok, cari, kasa/banka ve günlük özet etkileri
+    tüm faturalar için birlikte geri alınır. Kullanıcıya ait olmayan veya bulunamayan id'ler raporlanır.
+    """
+    if len(istek.fatura_idler) > MAKS_TOPLU_FATURA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tek istekte en fazla {MAKS_TOPLU_FATURA} fatura silinebilir.")
+
+    kullanici_id = current_user.id
+    istenen_idler = sorted(set(istek.fatura_idler))
+    try:
+        fatura_idler = db.scalars(
+            select(modeller.Fatura.id)
+            .where(modeller.Fatura.id.in_(istenen_idler), modeller.Fatura.kullanici_id == kullanici_id)
+            .order_by(modeller.Fatura.id)
+            .with_for_update()
+        ).all() if istenen_idler else []
+
+        if fatura_idler:
+            _faturalari_sil(db, kullanici_id, fatura_idler)
+        db.commit()
+        if fatura_idler:
+            pano_onbellegini_temizle(kullanici_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Faturalar toplu silinirken hata: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Faturalar toplu silinirken bir hata oluştu: {str(e)}")
+
+    bulunan = set(fatura_idler)
+    return {"silinen_sayisi": len(fatura_idler), "bulunamayan_idler": [fatura_id for fatura_id in istenen_idler if fatura_id not in bulunan]}
+
 @faturalar_router.get("/get_next_fatura_number", response_model=modeller.NextFaturaNoResponse)
 def get_next_fatura_number_endpoint(
     fatura_turu: str = Query(..., description="Fatura türünün Enum üye adı (örn: SATIS, ALIS)"),
@@ -1025,27 +1193,7 @@ def get_next_fatura_number_endpoint(
             detail=f"Geçersiz fatura türü: '{fatura_turu}'. Beklenenler: SATIS, ALIS, SATIS_IADE, ALIS_IADE, DEVIR_GIRIS"
         )
 
-    last_fatura = db.query(modeller.Fatura).filter(
-        modeller.Fatura.fatura_turu == fatura_turu_enum,
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).order_by(modeller.Fatura.fatura_no.desc()).first()
-
-    prefix = ""
-    if fatura_turu_enum == semalar.FaturaTuruEnum.SATIS: prefix = "SF"
-    elif fatura_turu_enum == semalar.FaturaTuruEnum.ALIS: prefix = "AF"
-    elif fatura_turu_enum == semalar.FaturaTuruEnum.SATIS_IADE: prefix = "SI"
-    elif fatura_turu_enum == semalar.FaturaTuruEnum.ALIS_IADE: prefix = "AI"
-    else: prefix = "DG"
-
-    next_sequence = 1
-    if last_fatura and last_fatura.fatura_no.startswith(prefix):
-        try:
-            current_sequence = int(last_fatura.fatura_no[len(prefix):])
-            next_sequence = current_sequence + 1
-        except (ValueError, IndexError):
-            pass
-
-    next_fatura_no = f"{prefix}{next_sequence:09d}"
+    next_fatura_no = belge_numarasi_onizle(db, kullanici_id, FATURA_NUMARA_ONEKLERI[fatura_turu_enum])
     return {"fatura_no": next_fatura_no}
 
 @faturalar_router.get("/{fatura_id}/kalemler", response_model=List[modeller.FaturaKalemiRead])
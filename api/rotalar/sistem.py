@@ -6,6 +6,9 @@ from sqlalchemy import text
 from .. import modeller, semalar
 from ..veritabani import get_db, reset_db_connection
 from .. import guvenlik
+from .api_yardimcilar import (
+    FATURA_NUMARA_ONEKLERI, belge_numarasi_ayir, belge_numarasi_bicimle, belge_numarasi_onizle
+)
 
 router = APIRouter(prefix="/sistem", tags=["Sistem"])
 
@@ -117,9 +120,6 @@ def get_next_fatura_number_endpoint(
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id # JWT'den gelen ID kullanılıyor
-    # KURAL UYGULANDI: modeller.Fatura kullanıldı.
-    last_fatura = db.query(modeller.Fatura).filter(modeller.Fatura.fatura_turu == fatura_turu.upper(), modeller.Fatura.kullanici_id == kullanici_id) \
-                                        .order_by(modeller.Fatura.fatura_no.desc()).first()
 
     prefix = ""
     if fatura_turu.upper() == "SATIŞ":
@@ -129,16 +129,7 @@ def get_next_fatura_number_endpoint(
     else:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Geçersiz fatura türü. 'SATIŞ' veya 'ALIŞ' olmalıdır.")
 
-    next_sequence = 1
-    if last_fatura and last_fatura.fatura_no and last_fatura.fatura_no.startswith(prefix):
-        try:
-            current_sequence_str = last_fatura.fatura_no[len(prefix):]
-            current_sequence = int(current_sequence_str)
-            next_sequence = current_sequence + 1
-        except (ValueError, IndexError): # IndexError eklendi
-            pass
-
-    next_fatura_no = f"{prefix}{next_sequence:09d}"
+    next_fatura_no = belge_numarasi_onizle(db, kullanici_id, prefix)
     return {"fatura_no": next_fatura_no}
 
 @router.get("/next_musteri_code", response_model=dict)
@@ -147,20 +138,7 @@ def get_next_musteri_code_endpoint(
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id # JWT'den gelen ID kullanılıyor
-    # KRİTİK DÜZELTME: semalar.Musteri -> modeller.Musteri
-    last_musteri = db.query(modeller.Musteri).filter(modeller.Musteri.kullanici_id == kullanici_id).order_by(modeller.Musteri.kod.desc()).first()
-
-    prefix = "M"
-    next_sequence = 1
-    if last_musteri and last_musteri.kod and last_musteri.kod.startswith(prefix):
-        try:
-            current_sequence_str = last_musteri.kod[len(prefix):]
-            current_sequence = int(current_sequence_str)
-            next_sequence = current_sequence + 1
-        except ValueError:
-            pass
-
-    next_musteri_code = f"{prefix}{next_sequence:09d}"
+    next_musteri_code = belge_numarasi_onizle(db, kullanici_id, "M")
     return {"next_code": next_musteri_code}
 
 @router.get("/next_tedarikci_code", response_model=dict)
@@ -169,20 +147,7 @@ def get_next_tedarikci_code_endpoint(
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id # JWT'den gelen ID kullanılıyor
-    # KRİTİK DÜZELTME: semalar.Tedarikci -> modeller.Tedarikci
-    last_tedarikci = db.query(modeller.Tedarikci).filter(modeller.Tedarikci.kullanici_id == kullanici_id).order_by(modeller.Tedarikci.kod.desc()).first()
-
-    prefix = "T"
-    next_sequence = 1
-    if last_tedarikci and last_tedarikci.kod and last_tedarikci.kod.startswith(prefix):
-        try:
-            current_sequence_str = last_tedarikci.kod[len(prefix):]
-            current_sequence = int(current_sequence_str)
-            next_sequence = current_sequence + 1
-        except ValueError:
-            pass
-
-    next_tedarikci_code = f"{prefix}{next_sequence:09d}"
+    next_tedarikci_code = belge_numarasi_onizle(db, kullanici_id, "T")
     return {"next_code": next_tedarikci_code}
 
 @router.get("/next_stok_code", response_model=dict)
@@ -191,20 +156,7 @@ def get_next_stok_code_endpoint(
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id # JWT'den gelen ID kullanılıyor
-    # KRİTİK DÜZELTME: semalar.Stok -> modeller.Stok
-    last_stok = db.query(modeller.Stok).filter(modeller.Stok.kullanici_id == kullanici_id).order_by(modeller.Stok.kod.desc()).first()
-
-    prefix = "STK"
-    next_sequence = 1
-    if last_stok and last_stok.kod and last_stok.kod.startswith(prefix):
-        try:
-            current_sequence_str = last_stok.kod[len(prefix):]
-            current_sequence = int(current_sequence_str)
-            next_sequence = current_sequence + 1
-        except ValueError:
-            pass
-
-    next_stok_code = f"{prefix}{next_sequence:09d}"
+    next_stok_code = belge_numarasi_onizle(db, kullanici_id, "STK")
     return {"next_code": next_stok_code}
 
 @router.get("/next_siparis_kodu", response_model=modeller.NextSiparisKoduResponse)
@@ -213,21 +165,7 @@ def get_next_siparis_kodu_endpoint(
     db: Session = Depends(get_db)
 ):
     kullanici_id = current_user.id # JWT'den gelen ID kullanılıyor
-    # KRİTİK DÜZELTME: semalar.Siparis -> modeller.Siparis
-    son_siparis = db.query(modeller.Siparis).filter(modeller.Siparis.kullanici_id == kullanici_id).order_by(modeller.Siparis.id.desc()).first()
-    
-    prefix = "S-"
-    next_number = 1
-    
-    if son_siparis and son_siparis.siparis_no and son_siparis.siparis_no.startswith(prefix):
-        try:
-            last_number_str = son_siparis.siparis_no.split('-')[1]
-            last_number = int(last_number_str)
-            next_number = last_number + 1
-        except (ValueError, IndexError):
-            pass
-            
-    next_code = f"{prefix}{next_number:06d}"
+    next_code = belge_numarasi_onizle(db, kullanici_id, "S-")
     return {"next_code": next_code}
 
 @router.get("/status", response_model=dict)
@@ -253,26 +191,25 @@ def get_next_fatura_no_endpoint(
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
     kullanici_id = current_user.id
-    
-    last_fatura = db.query(modeller.Fatura).filter(
-        modeller.Fatura.fatura_turu == fatura_turu,
-        modeller.Fatura.kullanici_id == kullanici_id
-    ).order_by(modeller.Fatura.fatura_no.desc()).first()
-
-    prefix = ""
-    if fatura_turu == semalar.FaturaTuruEnum.SATIS: prefix = "SF"
-    elif fatura_turu == semalar.FaturaTuruEnum.ALIS: prefix = "AF"
-    elif fatura_turu == semalar.FaturaTuruEnum.SATIS_IADE: prefix = "SI"
-    elif fatura_turu == semalar.FaturaTuruEnum.ALIS_IADE: prefix = "AI"
-    else: prefix = "DG"
-
-    next_sequence = 1
-    if last_fatura and last_fatura.fatura_no and last_fatura.fatura_no.startswith(prefix):
-        try:
-            current_sequence = int(last_fatura.fatura_no[len(prefix):])
-            next_sequence = current_sequence + 1
-        except (ValueError, IndexError):
-            pass
+    next_fatura_no = belge_numarasi_onizle(db, kullanici_id, FATURA_NUMARA_ONEKLERI[fatura_turu])
+    return {"next_code": next_fatura_no}
 
-    next_fatura_no = f"{prefix}{next_sequence:09d}"
-    return {"next_code": next_fatura_no}
\ No newline at end of file
+@router.post("/belge_numarasi_rezerve", response_model=modeller.BelgeNumaralariResponse)
+def belge_numarasi_rezerve_endpoint(
+    onek: str = Query(..., description="Belge öneki: SF, AF, SI, AI, DG, M, T, STK veya S-"),
+    adet: int = Query(1, ge=1, le=1000, description="Ayrılacak ardışık numara sayısı"),
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    Masaüstü istemcinin çevrimdışı veya toplu kayıtta kullanması için ardışık bir numara bloğu ayırır.
+    Ayrılan numaralar başka bir istemciye verilmez; kullanılmayanlar boşluk olarak kalır.
+    """
+    ilk, son = belge_numarasi_ayir(db, current_user.id, onek, adet)
+    db.commit()
+    return {
+        "onek": onek,
+        "ilk": ilk,
+        "son": son,
+        "numaralar": [belge_numarasi_bicimle(onek, deger) for deger in range(ilk, son + 1)]
+    }
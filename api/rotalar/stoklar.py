@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, select, insert, literal, table, column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from .. import modeller, semalar, guvenlik
 from ..veritabani import get_db
 from typing import List, Optional, Any
 from datetime import datetime, date
+from collections import defaultdict
+import csv
+import io
 from sqlalchemy import String
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from hizmetler import FaturaService
+from sqlalchemy.exc import IntegrityError
+from .api_yardimcilar import (
+    sayfala, pano_onbellegini_temizle, bulanik_arama, benzerlige_gore_sayfala, belge_sayaclarini_esitle,
+    FATURA_STOK_YONLERI, FATURA_STOK_ISLEM_TIPLERI, _fatura_gunluk_ozete_isle
+)
 import logging
 from ..guvenlik import get_current_user
 
@@ -28,6 +35,7 @@ def create_stok(
         
         # ORM modelini oluştur
         db_stok = modeller.Stok(**stok_data, kullanici_id=current_user.id)
+        belge_sayaclarini_esitle(db, current_user.id, ("STK",), [db_stok.kod])
         
         db.add(db_stok)
         db.flush() # ID'yi almak için
@@ -50,6 +58,7 @@ def create_stok(
             db.add(db_hareket)
         
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         db.refresh(db_stok)
         
         # Pydantic modeline dönüştürerek döndür
@@ -64,28 +73,44 @@ def create_stok(
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Stok kaydı oluşturulurken beklenmedik hata: {str(e)}")
 
+def _stok_nitelik_secenekleri():
+    """
+    Stok nitelik ilişkilerini ana sorguya LEFT JOIN olarak ekleyen yükleme seçenekleri.
+    Çoka-bir ilişkiler oturumun kimlik haritasında (identity map) tekilleştirildiğinden,
+    istek boyunca aynı nitelik satırı yalnızca bir kez nesneye dönüştürülür.
+    """
+    return (
+        joinedload(modeller.Stok.kategori),
+        joinedload(modeller.Stok.marka),
+        joinedload(modeller.Stok.urun_grubu),
+        joinedload(modeller.Stok.birim),
+        joinedload(modeller.Stok.mense_ulke),
+    )
+
 @router.get("/", response_model=modeller.StokListResponse)
 def read_stoklar(
     skip: int = 0,
     limit: int = 25,
     arama: Optional[str] = None,
+    sirali: bool = Query(False, description="Arama sonuçlarını benzerliğe göre sırala (yazım hatalarına toleranslı)"),
     aktif_durum: Optional[bool] = True,
     kritik_stok_altinda: Optional[bool] = False,
     kategori_id: Optional[int] = None,
     marka_id: Optional[int] = None,
     urun_grubu_id: Optional[int] = None,
     stokta_var: Optional[bool] = None,
+    after: Optional[str] = Query(None, description="İmleç modunda önceki sayfanın next_cursor değeri"),
+    cursor: bool = Query(False, description="Ofset yerine imleç (keyset) sayfalaması kullan"),
+    include_total: bool = Query(False, description="İmleç modunda toplam kayıt sayısını da hesapla"),
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(get_current_user) # KRİTİK DÜZELTME: Tipi modeller.KullaniciRead olarak düzeltildi.
 ):
-    # KRİTİK DÜZELTME: Sorgularda modeller.Stok kullanıldı.
-    query = db.query(modeller.Stok).filter(modeller.Stok.kullanici_id == current_user.id)
+    # Nitelikler (kategori, marka, grup, birim, menşe) aynı SELECT içinde LEFT JOIN ile gelir.
+    query = db.query(modeller.Stok).filter(modeller.Stok.kullanici_id == current_user.id).options(*_stok_nitelik_secenekleri())
     
+    skor = None
     if arama:
-        search_filter = or_(
-            modeller.Stok.kod.ilike(f"%{arama}%"),
-            modeller.Stok.ad.ilike(f"%{arama}%")
-        )
+        search_filter, skor = bulanik_arama((modeller.Stok.kod, modeller.Stok.ad), arama, sirali=sirali)
         query = query.filter(search_filter)
 
     if aktif_durum is not None:
@@ -109,14 +134,19 @@ def read_stoklar(
         else:
             query = query.filter(modeller.Stok.miktar <= 0)
 
-    total_count = query.count()
-    
-    stoklar = query.offset(skip).limit(limit).all()
+    if skor is not None:
+        stoklar, total_count, next_cursor = benzerlige_gore_sayfala(query, skor, modeller.Stok.id, limit, skip=skip)
+    else:
+        # Stok kartlarının tarih alanı olmadığından sıralama anahtarı yalnızca id'dir.
+        stoklar, total_count, next_cursor = sayfala(
+            query, (modeller.Stok.id,), limit,
+            skip=skip, after=after, imlec_modu=cursor, toplam_iste=include_total, azalan=False
+        )
     
     return {"items": [
         modeller.StokRead.model_validate(s, from_attributes=True)
         for s in stoklar
-    ], "total": total_count}
+    ], "total": total_count, "next_cursor": next_cursor}
 
 @router.get("/ozet", response_model=modeller.StokOzetResponse)
 def get_stok_ozet(
@@ -146,28 +176,15 @@ def read_stok(
     current_user: modeller.KullaniciRead = Depends(get_current_user) # KRİTİK DÜZELTME: Tipi modeller.KullaniciRead olarak düzeltildi.
 ):
     # KRİTİK DÜZELTME: Sorgularda modeller.Stok kullanıldı.
-    stok = db.query(modeller.Stok).filter(
+    stok = db.query(modeller.Stok).options(*_stok_nitelik_secenekleri()).filter(
         modeller.Stok.id == stok_id,
         modeller.Stok.kullanici_id == current_user.id
     ).first()
     if not stok:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stok bulunamadı")
     
-    stok_read_data = modeller.StokRead.model_validate(stok, from_attributes=True).model_dump() # from_attributes eklendi
-    
-    # İlişki kontrolü (Lazy loading ile çalışması beklenir, eğer ilişkiler kurulduysa)
-    if stok.kategori:
-        stok_read_data['kategori'] = modeller.UrunKategoriRead.model_validate(stok.kategori, from_attributes=True).model_dump()
-    if stok.marka:
-        stok_read_data['marka'] = modeller.UrunMarkaRead.model_validate(stok.marka, from_attributes=True).model_dump()
-    if stok.urun_grubu:
-        stok_read_data['urun_grubu'] = modeller.UrunGrubuRead.model_validate(stok.urun_grubu, from_attributes=True).model_dump()
-    if stok.birim:
-        stok_read_data['birim'] = modeller.UrunBirimiRead.model_validate(stok.birim, from_attributes=True).model_dump()
-    if stok.mense_ulke:
-        stok_read_data['mense_ulke'] = modeller.UlkeRead.model_validate(stok.mense_ulke, from_attributes=True).model_dump()
-        
-    return stok_read_data
+    # Nitelik ilişkileri sorguyla birlikte yüklendiği için ek SELECT çalışmaz.
+    return modeller.StokRead.model_validate(stok, from_attributes=True)
 
 @router.put("/{stok_id}", response_model=modeller.StokRead)
 def update_stok(
@@ -183,9 +200,13 @@ def update_stok(
     ).first()
     if not db_stok:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stok bulunamadı")
-    for key, value in stok.model_dump(exclude_unset=True).items():
+    update_data = stok.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(db_stok, key, value)
+    if "kod" in update_data:
+        belge_sayaclarini_esitle(db, current_user.id, ("STK",), [update_data["kod"]])
     db.commit()
+    pano_onbellegini_temizle(current_user.id)
     db.refresh(db_stok)
     return db_stok
 
@@ -204,6 +225,7 @@ def delete_stok(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stok bulunamadı")
     db.delete(db_stok)
     db.commit()
+    pano_onbellegini_temizle(current_user.id)
     return
 
 @router.get("/{stok_id}/anlik_miktar", response_model=modeller.AnlikStokMiktariResponse)
@@ -284,6 +306,7 @@ def create_stok_hareket(
         db.add(db_hareket)
 
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         db.refresh(db_hareket)
         return modeller.StokHareketRead.model_validate(db_hareket, from_attributes=True)
 
@@ -359,178 +382,186 @@ def delete_stok_hareket(
     
     db.delete(db_hareket)
     db.commit()
+    pano_onbellegini_temizle(current_user.id)
     return {"detail": "Stok hareketi başarıyla silindi."}
 
+# Bu satır sayısının üzerindeki toplu stok aktarımları, satırlar parametre olarak gönderilmek yerine
+# PostgreSQL COPY ile geçici bir tabloya aktarılıp tek INSERT ... SELECT ile işlenir.
+STOK_COPY_ESIGI = 5000
+STOK_AKTARIM_KOLONLARI = tuple(modeller.StokBase.model_fields)
+# COPY CSV'de tırnaksız boş alan da NULL sayılır; NULL için ayrı işaret kullanılır.
+STOK_COPY_NULL = r'\N'
+
+def _stok_upsert_ifadesi(kaynak, guncellenecek_kolonlar):
+    """
+    kaynak (VALUES veya SELECT) için INSERT ... ON CONFLICT (kod) DO UPDATE ... RETURNING ifadesini kurar.
+    kod tüm kullanıcılar arasında benzersiz olduğundan güncelleme yalnızca satır aynı kullanıcıya aitse yapılır;
+    başka kullanıcının koduyla çakışan satırlar RETURNING sonucunda yer almaz.
+    """
+    Stok = modeller.Stok
+    stmt = kaynak.on_conflict_do_update(
+        index_elements=[Stok.kod],
+        set_={kolon: getattr(kaynak.excluded, kolon) for kolon in guncellenecek_kolonlar},
+        where=Stok.kullanici_id == kaynak.excluded.kullanici_id
+    )
+    return stmt.returning(Stok.id, Stok.kod, Stok.miktar)
+
+def _stoklari_copy_ile_yaz(db: Session, kullanici_id: int, satirlar: List[dict], guncellenecek_kolonlar) -> List:
+    """Satırları COPY ile geçici tabloya aktarır ve stoklar tablosuna tek INSERT ... SELECT ile yazar."""
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS stok_aktarim ON COMMIT DROP AS "
+        f"SELECT {', '.join(STOK_AKTARIM_KOLONLARI)} FROM stoklar WITH NO DATA"
+    ))
+    db.execute(text("TRUNCATE stok_aktarim"))
+
+    tampon = io.StringIO()
+    yazici = csv.writer(tampon)
+    for satir in satirlar:
+        # csv.writer None ile '' değerini aynı yazar; NULL'lar açık bir işaretle yazılır ki boş metinler NULL'a dönmesin.
+        yazici.writerow([STOK_COPY_NULL if satir[kolon] is None else satir[kolon] for kolon in STOK_AKTARIM_KOLONLARI])
+    tampon.seek(0)
+    # COPY, oturumun kendi bağlantısı (ve dolayısıyla aynı transaction) üzerinden çalıştırılır.
+    with db.connection().connection.cursor() as imlec:
+        imlec.copy_expert(
+            f"COPY stok_aktarim ({', '.join(STOK_AKTARIM_KOLONLARI)}) FROM STDIN WITH (FORMAT csv, NULL '{STOK_COPY_NULL}')",
+            tampon
+        )
+
+    aktarim = table("stok_aktarim", *[column(kolon) for kolon in STOK_AKTARIM_KOLONLARI])
+    kaynak = pg_insert(modeller.Stok).from_select(
+        [*STOK_AKTARIM_KOLONLARI, "kullanici_id"],
+        select(*[aktarim.c[kolon] for kolon in STOK_AKTARIM_KOLONLARI], literal(kullanici_id))
+    )
+    return db.execute(_stok_upsert_ifadesi(kaynak, guncellenecek_kolonlar)).all()
+
+def _stoklari_yaz(db: Session, kullanici_id: int, satirlar: List[dict], guncellenecek_kolonlar) -> List:
+    """Satırları stoklar tablosuna upsert eder ve (id, kod, miktar) döndürür; büyük listelerde COPY kullanılır."""
+    if len(satirlar) > STOK_COPY_ESIGI:
+        return _stoklari_copy_ile_yaz(db, kullanici_id, satirlar, guncellenecek_kolonlar)
+    return db.execute(
+        _stok_upsert_ifadesi(pg_insert(modeller.Stok), guncellenecek_kolonlar),
+        [dict(satir, kullanici_id=kullanici_id) for satir in satirlar]
+    ).all()
+
+def _toplu_stok_faturasi_olustur(db: Session, kullanici_id: int, fatura_turu: semalar.FaturaTuruEnum, fatura_no: str, fatura_notlari: str, kalemler: List[dict]):
+    """
+    Yeni eklenen ürünlerin açılış miktarları için otomatik fatura, kalemler ve stok hareketlerini toplu INSERT'lerle yazar.
+    Stok miktarları ürünle birlikte yazıldığından burada stok güncellenmez; hareketler yalnızca kayıt içindir.
+    """
+    toplam_kdv_haric = sum(k['birim_fiyat'] * k['miktar'] for k in kalemler)
+    toplam_kdv_dahil = sum(k['birim_fiyat'] * (1 + k['kdv_orani'] / 100) * k['miktar'] for k in kalemler)
+
+    db_fatura = modeller.Fatura(
+        fatura_no=fatura_no,
+        fatura_turu=fatura_turu,
+        tarih=datetime.now().date(),
+        cari_id=1, # Varsayılan Cari ID
+        cari_tip=semalar.CariTipiEnum.TEDARIKCI.value,
+        odeme_turu=semalar.OdemeTuruEnum.ETKISIZ_FATURA,
+        fatura_notlari=fatura_notlari,
+        toplam_kdv_haric=toplam_kdv_haric,
+        toplam_kdv_dahil=toplam_kdv_dahil,
+        genel_toplam=toplam_kdv_dahil,
+        kullanici_id=kullanici_id
+    )
+    db.add(db_fatura)
+    db.flush()
+
+    db.execute(insert(modeller.FaturaKalemi), [
+        dict(fatura_id=db_fatura.id, urun_id=k['urun_id'], miktar=k['miktar'], birim_fiyat=k['birim_fiyat'],
+             kdv_orani=k['kdv_orani'], alis_fiyati_fatura_aninda=k['birim_fiyat'])
+        for k in kalemler
+    ])
+    yon = FATURA_STOK_YONLERI[fatura_turu]
+    aciklama = f"{db_fatura.fatura_no} nolu fatura ({fatura_turu.value})"
+    db.execute(insert(modeller.StokHareket), [
+        dict(urun_id=k['urun_id'], tarih=db_fatura.tarih, islem_tipi=FATURA_STOK_ISLEM_TIPLERI[fatura_turu],
+             miktar=k['miktar'], birim_fiyat=k['birim_fiyat'], aciklama=aciklama,
+             kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=db_fatura.id,
+             onceki_stok=k['stok_miktari'] - yon * k['miktar'], sonraki_stok=k['stok_miktari'],
+             kullanici_id=kullanici_id)
+        for k in kalemler
+    ])
+    _fatura_gunluk_ozete_isle(db, db_fatura)
+
 @router.post("/bulk_upsert", response_model=modeller.TopluIslemSonucResponse)
 def bulk_stok_upsert_endpoint(
     stok_listesi: List[modeller.StokCreate],
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(get_current_user) # KRİTİK DÜZELTME: Tipi modeller.KullaniciRead olarak düzeltildi.
 ):
+    """
+    Stokları koda göre toplu ekler/günceller (Excel'den toplu içe aktarma).
+    Kullanıcının mevcut kodları tek sorguda okunur, satırlar INSERT ... ON CONFLICT (kod) DO UPDATE ... RETURNING
+    ile yazılır (STOK_COPY_ESIGI üzerinde COPY ile). Yeni ürünlerin açılış miktarları için toplu alış / alış iade
+    faturası, kalemleri ve stok hareketleri toplu INSERT'lerle oluşturulur.
+    """
+    kullanici_id = current_user.id
+    Stok = modeller.Stok
     # Atomik işlem için nested transaksiyon başlatıldı.
     db.begin_nested()
     try:
-        yeni_eklenen = 0
-        guncellenen = 0
-        hata_veren = 0
         hatalar = []
 
+        # Aynı kod listede birden çok kez geçiyorsa sıralı işlemeyle aynı sonuç için sonuncusu geçerlidir.
+        satirlar_koda_gore = {}
+        for stok_data in stok_listesi:
+            satirlar_koda_gore[stok_data.kod] = stok_data
+        tekrar_eden = len(stok_listesi) - len(satirlar_koda_gore)
+
+        mevcut_idler = dict(db.execute(select(Stok.kod, Stok.id).where(Stok.kullanici_id == kullanici_id)).all())
+        belge_sayaclarini_esitle(db, kullanici_id, ("STK",), satirlar_koda_gore)
+
+        # Yalnızca gönderilen alanlar güncellenir; alan kümesi aynı olan satırlar tek ifadede yazılır.
+        # Mevcut satırlar id sırasıyla kilitlensin diye önce onlar (id sırasıyla), ardından yeniler yazılır.
+        gruplar = defaultdict(list)
+        for stok_data in sorted(satirlar_koda_gore.values(), key=lambda s: (s.kod not in mevcut_idler, mevcut_idler.get(s.kod, 0))):
+            guncellenecek = tuple(sorted(stok_data.model_fields_set & set(STOK_AKTARIM_KOLONLARI)))
+            gruplar[guncellenecek].append(stok_data.model_dump(include=set(STOK_AKTARIM_KOLONLARI)))
+
+        yazilanlar = []
+        for guncellenecek_kolonlar, satirlar in gruplar.items():
+            yazilanlar.extend(_stoklari_yaz(db, kullanici_id, satirlar, guncellenecek_kolonlar))
+
+        yazilan_kodlar = {satir.kod for satir in yazilanlar}
+        for kod in satirlar_koda_gore:
+            if kod not in yazilan_kodlar:
+                hatalar.append(f"Stok kodu '{kod}' işlenirken hata: kod başka bir kullanıcıya ait.")
+
+        yeni_eklenen = sum(1 for satir in yazilanlar if satir.kod not in mevcut_idler)
+        guncellenen = len(yazilanlar) - yeni_eklenen + tekrar_eden
+        hata_veren = len(hatalar)
+
+        # Yeni ürünlerin açılış miktarları: pozitifler toplu alış, negatifler toplu alış iade faturasına yazılır.
         pozitif_kalemler = []
         negatif_kalemler = []
-        
-        for stok_data in stok_listesi:
-            try:
-                db_stok = db.query(modeller.Stok).filter(
-                    modeller.Stok.kod == stok_data.kod,
-                    modeller.Stok.kullanici_id == current_user.id
-                ).first()
-                
-                if db_stok:
-                    # Güvenlik kontrolü zaten filtrede yapılıyor, ek kontrol kaldırıldı.
-                    for key, value in stok_data.model_dump(exclude_unset=True).items():
-                        setattr(db_stok, key, value)
-                    db.add(db_stok)
-                    guncellenen += 1
-                else:
-                    # KRİTİK DÜZELTME: Yeni stok oluşturmada modeller.Stok kullanıldı.
-                    yeni_stok = modeller.Stok(**stok_data.model_dump(), kullanici_id=current_user.id)
-                    db.add(yeni_stok)
-                    db.flush() # ID'yi almak için
-                    yeni_eklenen += 1
-                    
-                    if yeni_stok.miktar != 0:
-                        alis_fiyati_kdv_haric = yeni_stok.alis_fiyati
-
-                        kalem_bilgisi = {
-                            "urun_id": yeni_stok.id,
-                            "miktar": yeni_stok.miktar,
-                            "birim_fiyat": alis_fiyati_kdv_haric,
-                            "kdv_orani": yeni_stok.kdv_orani,
-                            "alis_fiyati_fatura_aninda": alis_fiyati_kdv_haric
-                        }
-                        
-                        if kalem_bilgisi["miktar"] > 0:
-                            pozitif_kalemler.append(kalem_bilgisi)
-                        else:
-                            negatif_kalemler.append(kalem_bilgisi)
-
-            except Exception as e:
-                hata_veren += 1
-                hatalar.append(f"Stok kodu '{stok_data.kod}' işlenirken hata: {e}")
-
-        # POZİTİF MİKTARLAR İÇİN TOPLU ALIŞ FATURASI VE HAREKETLERİ OLUŞTURMA
+        for satir in yazilanlar:
+            stok_data = satirlar_koda_gore[satir.kod]
+            if satir.kod in mevcut_idler or not stok_data.miktar:
+                continue
+            kalem_bilgisi = {
+                "urun_id": satir.id,
+                "miktar": abs(stok_data.miktar),
+                "birim_fiyat": stok_data.alis_fiyati,
+                "kdv_orani": stok_data.kdv_orani,
+                "stok_miktari": satir.miktar
+            }
+            (pozitif_kalemler if stok_data.miktar > 0 else negatif_kalemler).append(kalem_bilgisi)
+
+        zaman = datetime.now().strftime('%Y%m%d%H%M%S')
         if pozitif_kalemler:
-            fatura_no=f"TOPLU-ALIS-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            tarih=datetime.now().date() # datetime.date objesi kullanıldı.
-            
-            toplam_kdv_haric = sum(k['birim_fiyat'] * k['miktar'] for k in pozitif_kalemler)
-            toplam_kdv_dahil = sum(k['birim_fiyat'] * (1 + k['kdv_orani'] / 100) * k['miktar'] for k in pozitif_kalemler)
-            
-            # KRİTİK DÜZELTME: Fatura oluşturmada modeller.Fatura kullanıldı.
-            db_fatura = modeller.Fatura(
-                fatura_no=fatura_no,
-                fatura_turu=semalar.FaturaTuruEnum.ALIS,
-                tarih=tarih,
-                cari_id=1, # Varsayılan Cari ID
-                cari_tip=semalar.CariTipiEnum.TEDARIKCI.value, # Cari Tipi eklendi
-                odeme_turu=semalar.OdemeTuruEnum.ETKISIZ_FATURA,
-                fatura_notlari="Toplu stok ekleme işlemiyle otomatik oluşturulan alış faturası.",
-                toplam_kdv_haric=toplam_kdv_haric,
-                toplam_kdv_dahil=toplam_kdv_dahil,
-                genel_toplam=toplam_kdv_dahil,
-                kullanici_id=current_user.id
+            _toplu_stok_faturasi_olustur(
+                db, kullanici_id, semalar.FaturaTuruEnum.ALIS, f"TOPLU-ALIS-{zaman}",
+                "Toplu stok ekleme işlemiyle otomatik oluşturulan alış faturası.", pozitif_kalemler
             )
-            db.add(db_fatura)
-            db.flush()
-
-            for kalem_bilgisi in pozitif_kalemler:
-                # KRİTİK DÜZELTME: Fatura kalemi oluşturmada modeller.FaturaKalemi kullanıldı.
-                db_kalem = modeller.FaturaKalemi(
-                    fatura_id=db_fatura.id,
-                    urun_id=kalem_bilgisi['urun_id'],
-                    miktar=kalem_bilgisi['miktar'],
-                    birim_fiyat=kalem_bilgisi['birim_fiyat'],
-                    kdv_orani=kalem_bilgisi['kdv_orani'],
-                    alis_fiyati_fatura_aninda=kalem_bilgisi['alis_fiyati_fatura_aninda']
-                )
-                db.add(db_kalem)
-                
-                # Stok Hareketi oluşturma
-                db_stok = db.query(modeller.Stok).filter(modeller.Stok.id == kalem_bilgisi['urun_id']).first()
-                if db_stok:
-                    # KRİTİK DÜZELTME: Stok hareketi oluşturmada modeller.StokHareket kullanıldı.
-                    db_stok_hareket = modeller.StokHareket(
-                        urun_id=kalem_bilgisi['urun_id'],
-                        tarih=db_fatura.tarih,
-                        islem_tipi=semalar.StokIslemTipiEnum.ALIŞ,
-                        miktar=kalem_bilgisi['miktar'],
-                        birim_fiyat=kalem_bilgisi['birim_fiyat'],
-                        aciklama=f"{db_fatura.fatura_no} nolu fatura ({db_fatura.fatura_turu.value})",
-                        kaynak=semalar.KaynakTipEnum.FATURA,
-                        kaynak_id=db_fatura.id,
-                        onceki_stok=db_stok.miktar - kalem_bilgisi['miktar'], # Stok güncellendiği için doğru önceki miktar.
-                        sonraki_stok=db_stok.miktar,
-                        kullanici_id=current_user.id
-                    )
-                    db.add(db_stok_hareket)
-
-        # NEGATİF MİKTARLAR İÇİN TOPLU ALIŞ İADE FATURASI VE HAREKETLERİ OLUŞTURMA
         if negatif_kalemler:
-            fatura_no=f"TOPLU-ALIS-IADE-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            tarih=datetime.now().date()
-            
-            toplam_kdv_haric_iade = sum(k['birim_fiyat'] * abs(k['miktar']) for k in negatif_kalemler)
-            toplam_kdv_dahil_iade = sum(k['birim_fiyat'] * (1 + k['kdv_orani'] / 100) * abs(k['miktar']) for k in negatif_kalemler)
-            
-            # KRİTİK DÜZELTME: Fatura oluşturmada modeller.Fatura kullanıldı.
-            db_fatura_iade = modeller.Fatura(
-                fatura_no=fatura_no,
-                fatura_turu=semalar.FaturaTuruEnum.ALIS_IADE,
-                tarih=tarih,
-                cari_id=1,
-                cari_tip=semalar.CariTipiEnum.TEDARIKCI.value, # Cari Tipi eklendi
-                odeme_turu=semalar.OdemeTuruEnum.ETKISIZ_FATURA,
-                fatura_notlari="Toplu stok ekleme işlemiyle otomatik oluşturulan alış iade faturası.",
-                toplam_kdv_haric=toplam_kdv_haric_iade,
-                toplam_kdv_dahil=toplam_kdv_dahil_iade,
-                genel_toplam=toplam_kdv_dahil_iade,
-                kullanici_id=current_user.id
+            _toplu_stok_faturasi_olustur(
+                db, kullanici_id, semalar.FaturaTuruEnum.ALIS_IADE, f"TOPLU-ALIS-IADE-{zaman}",
+                "Toplu stok ekleme işlemiyle otomatik oluşturulan alış iade faturası.", negatif_kalemler
             )
-            db.add(db_fatura_iade)
-            db.flush()
-
-            for kalem_bilgisi in negatif_kalemler:
-                # KRİTİK DÜZELTME: Fatura kalemi oluşturmada modeller.FaturaKalemi kullanıldı.
-                db_kalem = modeller.FaturaKalemi(
-                    fatura_id=db_fatura_iade.id,
-                    urun_id=kalem_bilgisi['urun_id'],
-                    miktar=abs(kalem_bilgisi['miktar']),
-                    birim_fiyat=kalem_bilgisi['birim_fiyat'],
-                    kdv_orani=kalem_bilgisi['kdv_orani'],
-                    alis_fiyati_fatura_aninda=kalem_bilgisi['alis_fiyati_fatura_aninda']
-                )
-                db.add(db_kalem)
-                
-                # Stok Hareketi oluşturma
-                db_stok = db.query(modeller.Stok).filter(modeller.Stok.id == kalem_bilgisi['urun_id']).first()
-                if db_stok:
-                    # KRİTİK DÜZELTME: Stok hareketi oluşturmada modeller.StokHareket kullanıldı.
-                    db_stok_hareket = modeller.StokHareket(
-                        urun_id=kalem_bilgisi['urun_id'],
-                        tarih=db_fatura_iade.tarih,
-                        islem_tipi=semalar.StokIslemTipiEnum.ALIŞ_İADE,
-                        miktar=abs(kalem_bilgisi['miktar']),
-                        birim_fiyat=kalem_bilgisi['birim_fiyat'],
-                        aciklama=f"{db_fatura_iade.fatura_no} nolu fatura ({db_fatura_iade.fatura_turu.value})",
-                        kaynak=semalar.KaynakTipEnum.FATURA,
-                        kaynak_id=db_fatura_iade.id,
-                        onceki_stok=db_stok.miktar + abs(kalem_bilgisi['miktar']),
-                        sonraki_stok=db_stok.miktar,
-                        kullanici_id=current_user.id
-                    )
-                    db.add(db_stok_hareket)
 
         db.commit()
+        pano_onbellegini_temizle(current_user.id)
         
         toplam_islenen = yeni_eklenen + guncellenen + hata_veren
         
@@ -554,6 +585,9 @@ def list_stok_hareketleri_endpoint(
     bitis_tarihi: Optional[date] = Query(None),
     skip: int = 0,
     limit: int = 1000,
+    after: Optional[str] = Query(None, description="İmleç modunda önceki sayfanın next_cursor değeri"),
+    cursor: bool = Query(False, description="Ofset yerine imleç (keyset) sayfalaması kullan"),
+    include_total: bool = Query(False, description="İmleç modunda toplam kayıt sayısını da hesapla"),
     db: Session = Depends(get_db),
     current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
 ):
@@ -569,10 +603,12 @@ def list_stok_hareketleri_endpoint(
     if bitis_tarihi:
         query = query.filter(modeller.StokHareket.tarih <= bitis_tarihi)
 
-    total = query.count()
-    hareketler = query.order_by(modeller.StokHareket.tarih.desc()).offset(skip).limit(limit).all()
+    hareketler, total, next_cursor = sayfala(
+        query, (modeller.StokHareket.tarih, modeller.StokHareket.id), limit,
+        skip=skip, after=after, imlec_modu=cursor, toplam_iste=include_total
+    )
 
     return {"items": [
         modeller.StokHareketRead.model_validate(hareket, from_attributes=True)
         for hareket in hareketler
-    ], "total": total}
\ No newline at end of file
+    ], "total": total, "next_cursor": next_cursor}
\ No newline at end of file
@@ -7,6 +7,7 @@ from typing import List, Optional
 from .. import modeller, semalar
 from ..veritabani import get_db
 from ..api_servisler import CariHesaplamaService
+from .api_yardimcilar import bulanik_arama, belge_sayaclarini_esitle
 from .. import guvenlik  # güvenlik modülünü ekledik
 
 router = APIRouter(prefix="/tedarikciler", tags=["Tedarikçiler"])
@@ -18,6 +19,8 @@ def create_tedarikci(
     current_user: modeller.Kullanici = Depends(guvenlik.get_current_user)
 ):
     db_tedarikci = semalar.Tedarikci(**tedarikci.model_dump(), kullanici_id=current_user.id)
+    # Kod elle girildiyse veya önizlemeden alındıysa sayaç en az bu koda çekilir.
+    belge_sayaclarini_esitle(db, current_user.id, ("T",), [db_tedarikci.kod])
     db.add(db_tedarikci)
     db.commit()
     db.refresh(db_tedarikci)
@@ -30,32 +33,34 @@ def read_tedarikciler(
     skip: int = 0,
     limit: int = 25,
     arama: Optional[str] = None,
-    aktif_durum: Optional[bool] = None
+    aktif_durum: Optional[bool] = None,
+    sirali: bool = Query(False, description="Arama sonuçlarını benzerliğe göre sırala (yazım hatalarına toleranslı)")
 ):
     query = db.query(semalar.Tedarikci).filter(semalar.Tedarikci.kullanici_id == current_user.id)
 
+    skor = None
     if arama:
-        search_term = f"%{arama}%"
-        query = query.filter(
-            or_(
-                semalar.Tedarikci.ad.ilike(search_term),
-                semalar.Tedarikci.telefon.ilike(search_term),
-                semalar.Tedarikci.vergi_no.ilike(search_term)
-            )
+        arama_kosulu, skor = bulanik_arama(
+            (semalar.Tedarikci.ad, semalar.Tedarikci.telefon, semalar.Tedarikci.vergi_no),
+            arama, sirali=sirali
         )
+        query = query.filter(arama_kosulu)
     
     if aktif_durum is not None:
         query = query.filter(semalar.Tedarikci.aktif == aktif_durum)
 
     total_count = query.count()
+    if skor is not None:
+        query = query.order_by(skor.desc(), semalar.Tedarikci.id)
     tedarikciler = query.offset(skip).limit(limit).all()
 
+    # Sayfadaki tüm carilerin bakiyeleri tek bir gruplanmış sorguda hesaplanır.
     cari_hizmeti = CariHesaplamaService(db)
+    bakiyeler = cari_hizmeti.calculate_cari_net_bakiyeler([tedarikci.id for tedarikci in tedarikciler], "TEDARIKCI", kullanici_id=current_user.id)
     tedarikciler_with_balance = []
     for tedarikci in tedarikciler:
-        net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci.id, "TEDARIKCI")
         tedarikci_dict = modeller.TedarikciRead.model_validate(tedarikci).model_dump()
-        tedarikci_dict["net_bakiye"] = net_bakiye
+        tedarikci_dict["net_bakiye"] = bakiyeler.get(tedarikci.id, 0.0)
         tedarikciler_with_balance.append(tedarikci_dict)
 
     return {"items": tedarikciler_with_balance, "total": total_count}
@@ -75,7 +80,7 @@ def read_tedarikci(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tedarikçi bulunamadı")
 
     cari_hizmeti = CariHesaplamaService(db)
-    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci_id, "TEDARIKCI")
+    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci_id, "TEDARIKCI", kullanici_id=current_user.id)
     
     # ORM objesini Pydantic Read modeline dönüştürürken bakiye bilgisini ekliyoruz.
     tedarikci_read = modeller.TedarikciRead.model_validate(tedarikci, from_attributes=True)
@@ -96,8 +101,11 @@ def update_tedarikci(
     ).first()
     if not db_tedarikci:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tedarikçi bulunamadı")
-    for key, value in tedarikci.model_dump(exclude_unset=True).items():
+    update_data = tedarikci.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(db_tedarikci, key, value)
+    if "kod" in update_data:
+        belge_sayaclarini_esitle(db, current_user.id, ("T",), [update_data["kod"]])
     db.commit()
     db.refresh(db_tedarikci)
     return db_tedarikci
@@ -132,5 +140,5 @@ def get_net_bakiye_endpoint(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tedarikçi bulunamadı")
 
     cari_hizmeti = CariHesaplamaService(db)
-    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci_id, "TEDARIKCI")
+    net_bakiye = cari_hizmeti.calculate_cari_net_bakiye(tedarikci_id, "TEDARIKCI", kullanici_id=current_user.id)
     return {"net_bakiye": net_bakiye}
\ No newline at end of file
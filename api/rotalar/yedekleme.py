@@ -8,6 +8,7 @@ import subprocess
 from sqlalchemy import text 
 from typing import Optional
 from .. import guvenlik, modeller # KRİTİK DÜZELTME: Güvenlik ve modeller eklendi
+from .api_yardimcilar import pano_onbellegini_temizle
 
 router = APIRouter(prefix="/yedekleme", tags=["Veritabanı Yedekleme"])
 
@@ -100,6 +101,7 @@ def restore_db_backup(
              raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Geri yükleme sırasında hata oluştu: {result.stderr}")
         
         reset_db_connection()
+        pano_onbellegini_temizle() # Geri yüklenen veriyle eski pano özetleri geçersiz; tüm kullanıcılar için temizlenir.
 
         # Veritabanı bağlantısını test etme (tekrar kurmayı dener)
         try:
@@ -10,6 +10,7 @@ from typing import Optional, List
 from datetime import datetime
 from sqlalchemy import text
 from ..api_servisler import create_initial_data
+from .api_yardimcilar import cari_bakiyelerini_yeniden_olustur, gunluk_ozeti_yeniden_olustur, pano_onbellegini_temizle
 # KRİTİK DÜZELTME: Gerekli modeller ve semalar import edildi.
 from .. import modeller, semalar, guvenlik
 from ..veritabani import get_db, reset_db_connection
@@ -192,6 +193,7 @@ def geri_yukle(
     
     try:
         message = run_restore_command(request.file_path)
+        pano_onbellegini_temizle()
         return {"message": message}
     except HTTPException as e:
         raise e
@@ -211,6 +213,10 @@ def clear_all_data(
             modeller.SiparisKalemi,
             modeller.StokHareket,
             modeller.CariHareket,
+            modeller.CariHesap,
+            modeller.GunlukOzet,
+            modeller.RaporIsi,
+            modeller.BelgeSayaci,
             modeller.KasaBankaHareket,
             modeller.GelirGider, 
             modeller.Fatura,
@@ -233,6 +239,7 @@ def clear_all_data(
             db.query(table).filter(table.kullanici_id == kullanici_id).delete(synchronize_session=False)
 
         db.commit()
+        pano_onbellegini_temizle(kullanici_id)
 
         return {"message": "Kullanıcıya ait tüm veriler başarıyla temizlendi."}
     except Exception as e:
@@ -263,4 +270,41 @@ def initial_data_setup_endpoint(
         if "already exists" in str(e):
             return {"message": f"Varsayılan veriler zaten mevcut."}
 
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Varsayılan veri oluşturma hatası: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Varsayılan veri oluşturma hatası: {e}")
+
+@router.post("/cari_bakiyeleri_yeniden_olustur", status_code=status.HTTP_200_OK, summary="Cari bakiye tablosunu hareketlerden yeniden kur")
+def cari_bakiyeleri_yeniden_olustur_endpoint(
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    cari_hesaplar tablosunu, kullanıcının tüm cari hareketlerinden tek bir gruplanmış sorguyla yeniden hesaplar.
+    Artımlı bakiyelerde bir tutarsızlık şüphesi olduğunda mutabakat için kullanılır.
+    """
+    _check_admin(current_user) # YETKİ KONTROLÜ
+    try:
+        satir_sayisi = cari_bakiyelerini_yeniden_olustur(db, kullanici_id=current_user.id)
+        db.commit()
+        return {"message": f"{satir_sayisi} cari bakiyesi yeniden hesaplandı."}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Cari bakiyeleri yeniden oluşturulurken hata: {e}")
+
+@router.post("/gunluk_ozet_yeniden_olustur", status_code=status.HTTP_200_OK, summary="Günlük özet tablosunu kaynak tablolardan yeniden kur")
+def gunluk_ozet_yeniden_olustur_endpoint(
+    db: Session = Depends(get_db),
+    current_user: modeller.KullaniciRead = Depends(guvenlik.get_current_user)
+):
+    """
+    gunluk_ozet tablosunu kullanıcının faturaları, gelir/giderleri ve kasa/banka hareketlerinden yeniden hesaplar.
+    İlk doldurma (backfill) ve artımlı toplamlarda tutarsızlık şüphesi olduğunda mutabakat için kullanılır.
+    """
+    _check_admin(current_user) # YETKİ KONTROLÜ
+    try:
+        satir_sayisi = gunluk_ozeti_yeniden_olustur(db, kullanici_id=current_user.id)
+        db.commit()
+        pano_onbellegini_temizle(current_user.id)
+        return {"message": f"{satir_sayisi} günlük özet satırı yeniden hesaplandı."}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Günlük özet yeniden oluşturulurken hata: {e}")
@@ -1,7 +1,7 @@
 # api/veritabani.py Dosyasının GÜNCELLENMİŞ TAM İÇERİĞİ
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, event, DDL
 from sqlalchemy.orm import sessionmaker, declarative_base
 import logging
 
@@ -52,6 +52,68 @@ def reset_db_connection():
 # Deklaratif taban sınıfı
 Base = declarative_base()
 
+# Liste aramalarının kullandığı pg_trgm eklentisi ve tr_normallestir() fonksiyonu. Alembic ile kurulan
+# veritabanlarında a4c7e2f9b316 göçü oluşturur. Eşleme api_yardimcilar.normalize_turkish_chars ile aynıdır.
+TR_NORMALLESTIR_DDL = """
+CREATE OR REPLACE FUNCTION tr_normallestir(metin text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT lower(translate(metin, 'ıİşŞğĞçÇöÖüÜ', 'iIsSgGcCoOuU')) $$
+"""
+
+# /sync/changes değişiklik takibinin tetikleyici fonksiyonları (Alembic'te 7c4e1a9b2d30 göçü).
+# row_version, satırı yazan işlemin kimliğidir (xid8); sürüm ekseni commit sırasına değil işlem kimliğine
+# dayandığından istemciler yalnızca tamamlanmış işlemlerin sürümlerini alır (bkz. rotalar/senkronizasyon.py).
+SENKRON_SURUM_ATA_DDL = """
+CREATE OR REPLACE FUNCTION senkron_surum_ata() RETURNS trigger AS $$
+BEGIN
+    NEW.row_version := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Silinen kaydın izini (tombstone) bırakır. TG_ARGV verilirse kullanici_id, üst belge tablosundan
+# (TG_ARGV[0]) yabancı anahtar (TG_ARGV[1]) ile bulunur.
+SENKRON_SILINENI_KAYDET_DDL = """
+CREATE OR REPLACE FUNCTION senkron_silineni_kaydet() RETURNS trigger AS $$
+DECLARE
+    sahip_id INTEGER;
+BEGIN
+    IF TG_NARGS = 2 THEN
+        EXECUTE 'SELECT kullanici_id FROM ' || quote_ident(TG_ARGV[0]) || ' WHERE id = $1'
+            INTO sahip_id
+            USING (to_jsonb(OLD) ->> TG_ARGV[1])::INTEGER;
+    ELSE
+        sahip_id := (to_jsonb(OLD) ->> 'kullanici_id')::INTEGER;
+    END IF;
+    INSERT INTO silinen_kayitlar (tablo, kayit_id, kullanici_id, row_version)
+    VALUES (TG_TABLE_NAME, OLD.id, sahip_id, pg_current_xact_id()::text::bigint);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def veritabani_nesnelerini_bagla(metadata):
+    """
+    metadata.create_all ile kurulan PostgreSQL veritabanlarında (create_pg_tables.py, create_or_update_pg_tables.py,
+    testler) eklenti ve fonksiyonların tablolardan önce oluşturulmasını sağlar. Diğer veritabanlarında çalışmaz.
+    """
+    for ddl in ("CREATE EXTENSION IF NOT EXISTS pg_trgm", TR_NORMALLESTIR_DDL, SENKRON_SURUM_ATA_DDL, SENKRON_SILINENI_KAYDET_DDL):
+        event.listen(metadata, "before_create", DDL(ddl).execute_if(dialect="postgresql"))
+
+veritabani_nesnelerini_bagla(Base.metadata)
+
+def oturum_ac():
+    """
+    Bağımlılık enjeksiyonu dışında (arka plan işleri, paralel rapor sorguları) kullanılmak üzere yeni bir oturum döndürür.
+    Oturumu kapatmak çağıran tarafın sorumluluğundadır.
+    """
+    global SessionLocal
+    if SessionLocal is None:
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+        logger.info("Yeni bir veritabanı oturumu sınıfı (SessionLocal) oluşturuldu.")
+    return SessionLocal()
+
 # Veritabanı oturumu almak için bağımlılık fonksiyonu
 def get_db():
     """
@@ -0,0 +1,76 @@
+# tests/conftest.py
+# Ortak test fikstürleri. Veritabanı gerektiren testler TEST_DATABASE_URL tanımlı değilse atlanır.
+# DİKKAT: TEST_DATABASE_URL yalnızca testlere ayrılmış bir veritabanını göstermelidir; şema her oturumda sıfırlanır.
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# api.veritabani içe aktarılırken bağlantı bilgisi zorunludur; motor ilk sorguda bağlandığından sahte değerler yeterlidir.
+# Testler uygulamanın kendi veritabanına asla bağlanmaz, oturumlar TEST_DATABASE_URL üzerinden açılır.
+for _anahtar, _deger in {"DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "test"}.items():
+    os.environ.setdefault(_anahtar, _deger)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session")
+def pg_motoru():
+    """Boş şemaya kurulmuş test veritabanı motoru (oturum boyunca tek)."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL tanımlı değil; Postgres testleri atlandı.")
+    pytest.importorskip("psycopg2")
+    from sqlalchemy import create_engine
+    from api.modeller import Base  # Rotaların kullandığı şema (create_or_update_pg_tables.py ile aynı)
+
+    motor = create_engine(TEST_DATABASE_URL, pool_size=20, max_overflow=10)
+    Base.metadata.drop_all(motor)
+    Base.metadata.create_all(motor)
+    yield motor
+    Base.metadata.drop_all(motor)
+    motor.dispose()
+
+
+@pytest.fixture(scope="session")
+def oturum_sinifi(pg_motoru):
+    from sqlalchemy.orm import sessionmaker
+    return sessionmaker(autocommit=False, autoflush=False, bind=pg_motoru)
+
+
+@pytest.fixture
+def kiraci(oturum_sinifi, request):
+    """
+    Test başına ayrı bir kullanıcı (kiracı), bir müşteri ve açılış stoklu beş ürün oluşturur.
+    Dönen sözlük: kullanici (KullaniciRead), musteri_id, stok_idler, acilis_stogu.
+    """
+    from api import modeller
+
+    ek = f"{request.node.name[:30]}_{id(request)}"
+    acilis_stogu = 1000.0
+    db = oturum_sinifi()
+    try:
+        kullanici = modeller.Kullanici(kullanici_adi=f"k_{ek}"[:50], rol="admin", aktif=True)
+        db.add(kullanici)
+        db.flush()
+        musteri = modeller.Musteri(ad="Test Müşteri", kod=f"M_{ek}"[:50], kullanici_id=kullanici.id)
+        db.add(musteri)
+        stoklar = [
+            modeller.Stok(kod=f"S{sira}_{ek}"[:50], ad=f"Ürün {sira}", miktar=acilis_stogu, alis_fiyati=10.0,
+                          satis_fiyati=15.0, kdv_orani=20.0, kullanici_id=kullanici.id)
+            for sira in range(5)
+        ]
+        db.add_all(stoklar)
+        db.commit()
+        db.refresh(kullanici)
+        yield {
+            "kullanici": modeller.KullaniciRead.model_validate(kullanici, from_attributes=True),
+            "musteri_id": musteri.id,
+            "stok_idler": [stok.id for stok in stoklar],
+            "acilis_stogu": acilis_stogu,
+            "tarih": date.today(),
+        }
+    finally:
+        db.close()
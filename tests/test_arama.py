@@ -0,0 +1,51 @@
+# tests/test_arama.py
+# Liste aramalarının (tr_normallestir + pg_trgm) create_all ile kurulan şemada da çalıştığını doğrular.
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def istemci(oturum_sinifi, kiraci):
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik, modeller
+    from api.veritabani import get_db
+
+    db = oturum_sinifi()
+    try:
+        db.add_all([
+            modeller.Musteri(ad="Şükrü Çağlar", kod=f"ARA1_{kiraci['musteri_id']}", kullanici_id=kiraci["kullanici"].id),
+            modeller.Musteri(ad="Ayşe Yılmaz", kod=f"ARA2_{kiraci['musteri_id']}", kullanici_id=kiraci["kullanici"].id),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _adlar(yanit):
+    assert yanit.status_code == 200, yanit.text
+    return [musteri["ad"] for musteri in yanit.json()["items"]]
+
+
+def test_arama_turkce_karakter_ve_harf_duyarsiz(istemci):
+    assert _adlar(istemci.get("/musteriler/", params={"arama": "SUKRU cag"})) == ["Şükrü Çağlar"]
+    assert _adlar(istemci.get("/musteriler/", params={"arama": "yılmaz"})) == ["Ayşe Yılmaz"]
+
+
+def test_sirali_arama_yazim_hatasini_tolere_eder(istemci):
+    adlar = _adlar(istemci.get("/musteriler/", params={"arama": "sukru caglr", "sirali": True}))
+    assert adlar and adlar[0] == "Şükrü Çağlar"
@@ -0,0 +1,64 @@
+# tests/test_belge_numaralari.py
+# Sıradaki numara uç noktalarının sayacı ilerletmediğini, elle girilen kodların ise sayacı ileri çektiğini doğrular.
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def istemci(oturum_sinifi, kiraci):
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik
+    from api.veritabani import get_db
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _siradaki(istemci, yol):
+    yanit = istemci.get(yol)
+    assert yanit.status_code == 200, yanit.text
+    return yanit.json()["next_code"]
+
+
+def test_onizleme_numara_tuketmez(istemci):
+    ilk = _siradaki(istemci, "/sistem/next_siparis_kodu")
+    assert _siradaki(istemci, "/sistem/next_siparis_kodu") == ilk
+
+    yanit = istemci.post("/sistem/belge_numarasi_rezerve", params={"onek": "S-", "adet": 2})
+    assert yanit.status_code == 200, yanit.text
+    assert yanit.json()["numaralar"][0] == ilk
+    assert _siradaki(istemci, "/sistem/next_siparis_kodu") != ilk
+
+
+def test_elle_girilen_kod_sayaci_ileri_ceker(istemci, kiraci):
+    # Sayacın üretebileceği biçimdeki elle girilmiş stok kodu, sayacı o numaranın ötesine taşır.
+    kod = f"STK{900000000 + kiraci['kullanici'].id:09d}"
+    yanit = istemci.post("/stoklar/", json={"kod": kod, "ad": "Elle kodlu ürün"})
+    assert yanit.status_code == 200, yanit.text
+    assert _siradaki(istemci, "/sistem/next_stok_code") == f"STK{int(kod[3:]) + 1:09d}"
+
+    # Sayacın hiçbir zaman üretmeyeceği kodlar (fazladan baştaki sıfır, serbest metin) sayacı etkilemez.
+    for serbest_kod in (f"STK0{int(kod[3:]) + 50}", f"URUN-{kiraci['kullanici'].id}"):
+        yanit = istemci.post("/stoklar/", json={"kod": serbest_kod, "ad": "Serbest kodlu ürün"})
+        assert yanit.status_code == 200, yanit.text
+    assert _siradaki(istemci, "/sistem/next_stok_code") == f"STK{int(kod[3:]) + 1:09d}"
+
+
+def test_toplu_aktarim_sayaci_ileri_ceker(istemci, kiraci):
+    taban = 800000000 + kiraci["kullanici"].id * 10
+    kodlar = [f"STK{taban + sira:09d}" for sira in (3, 7, 5)]
+    yanit = istemci.post("/stoklar/bulk_upsert", json=[{"kod": kod, "ad": f"Ürün {kod}"} for kod in kodlar])
+    assert yanit.status_code == 200, yanit.text
+    assert _siradaki(istemci, "/sistem/next_stok_code") == f"STK{taban + 8:09d}"
@@ -0,0 +1,80 @@
+# tests/test_cari_ekstre.py
+# Sayfalı cari hesap ekstresinin, imleçle taşınan yürüyen bakiyeyle tek sayfalık ekstreyle aynı sonucu verdiğini doğrular.
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+def test_sayfali_ekstre_tek_sayfayla_ayni(oturum_sinifi, kiraci):
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik, modeller, semalar
+    from api.veritabani import get_db
+
+    bugun = kiraci["tarih"]
+    hareketler = [
+        (bugun - timedelta(days=10), semalar.IslemYoneEnum.ALACAK, 500.0),  # dönem öncesi: devreden
+        (bugun - timedelta(days=9), semalar.IslemYoneEnum.BORC, 120.0),     # dönem öncesi: devreden
+        (bugun - timedelta(days=3), semalar.IslemYoneEnum.ALACAK, 40.0),
+        (bugun - timedelta(days=3), semalar.IslemYoneEnum.BORC, 15.0),
+        (bugun - timedelta(days=2), semalar.IslemYoneEnum.ALACAK, 70.0),
+        (bugun - timedelta(days=1), semalar.IslemYoneEnum.BORC, 25.0),
+        (bugun, semalar.IslemYoneEnum.ALACAK, 10.0),
+    ]
+    db = oturum_sinifi()
+    try:
+        db.add_all([
+            modeller.CariHareket(
+                tarih=tarih, islem_turu="MANUEL", islem_yone=yon, cari_id=kiraci["musteri_id"],
+                cari_tip=semalar.CariTipiEnum.MUSTERI.value, tutar=tutar, kaynak=semalar.KaynakTipEnum.MANUEL.value,
+                kullanici_id=kiraci["kullanici"].id
+            )
+            for tarih, yon, tutar in hareketler
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    parametreler = {
+        "cari_id": kiraci["musteri_id"], "cari_turu": "MUSTERI",
+        "baslangic_tarihi": (bugun - timedelta(days=5)).isoformat(), "bitis_tarihi": bugun.isoformat()
+    }
+    try:
+        client = TestClient(app)
+        yanit = client.get("/raporlar/cari_hesap_ekstresi", params=parametreler)
+        assert yanit.status_code == 200, yanit.text
+        tek_sayfa = yanit.json()
+
+        sayfalar, imlec = [], None
+        while True:
+            yanit = client.get("/raporlar/cari_hesap_ekstresi", params={**parametreler, "limit": 2, **({"after": imlec} if imlec else {})})
+            assert yanit.status_code == 200, yanit.text
+            sayfalar.append(yanit.json())
+            imlec = sayfalar[-1]["next_cursor"]
+            if not imlec:
+                break
+    finally:
+        app.dependency_overrides.clear()
+
+    assert tek_sayfa["devreden_bakiye"] == pytest.approx(380.0)
+    assert tek_sayfa["total"] == 5
+    assert [satir["bakiye"] for satir in tek_sayfa["items"]] == pytest.approx([420.0, 405.0, 475.0, 450.0, 460.0])
+
+    assert len(sayfalar) == 3
+    assert [satir["id"] for sayfa in sayfalar for satir in sayfa["items"]] == [satir["id"] for satir in tek_sayfa["items"]]
+    assert [satir["bakiye"] for sayfa in sayfalar for satir in sayfa["items"]] == pytest.approx([satir["bakiye"] for satir in tek_sayfa["items"]])
+    for sayfa in sayfalar:
+        assert sayfa["devreden_bakiye"] == pytest.approx(tek_sayfa["devreden_bakiye"])
+        assert sayfa["total"] == tek_sayfa["total"]
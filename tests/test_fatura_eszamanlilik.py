@@ -0,0 +1,107 @@
+# tests/test_fatura_eszamanlilik.py
+# Aynı ürünlere eşzamanlı fatura yazan iş parçacıklarının kilitlenmeye (deadlock) yol açmadığını
+# ve stok miktarının korunduğunu (açılış stoğu + hareketler toplamı) doğrular.
+import random
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+IS_PARCACIGI_SAYISI = 8
+PARCACIK_BASINA_FATURA = 5
+
+
+def _fatura_istegi(kiraci, fatura_no, fatura_turu, urun_idler, rastgele):
+    from api import modeller, semalar
+
+    kalemler = [
+        modeller.FaturaKalemiCreate(urun_id=urun_id, miktar=float(rastgele.randint(1, 5)), birim_fiyat=10.0, kdv_orani=20.0,
+                                    alis_fiyati_fatura_aninda=10.0)
+        for urun_id in urun_idler
+    ]
+    return modeller.FaturaCreate(
+        fatura_no=fatura_no,
+        fatura_turu=fatura_turu,
+        tarih=kiraci["tarih"],
+        cari_id=kiraci["musteri_id"],
+        cari_tip=semalar.CariTipiEnum.MUSTERI,
+        odeme_turu=semalar.OdemeTuruEnum.ACIK_HESAP,
+        kalemler=kalemler,
+    )
+
+
+def test_eszamanli_faturalar_stogu_korur(oturum_sinifi, kiraci):
+    from sqlalchemy import func, select
+    from api import modeller, semalar
+    from api.rotalar.api_yardimcilar import FATURA_STOK_YONLERI, FATURA_STOK_ISLEM_TIPLERI
+    from api.rotalar.siparis_faturalar import create_fatura
+
+    baslangic = threading.Barrier(IS_PARCACIGI_SAYISI)
+    hatalar = []
+    olusturulan = []
+    kilit = threading.Lock()
+
+    def calistir(sira):
+        rastgele = random.Random(sira)
+        baslangic.wait()
+        for no in range(PARCACIK_BASINA_FATURA):
+            # Kalemler her faturada farklı sırada ve kısmen örtüşen ürünlerle gelir; kilit sırası yine id'ye göre olmalı.
+            urun_idler = rastgele.sample(kiraci["stok_idler"], k=rastgele.randint(2, len(kiraci["stok_idler"])))
+            urun_idler += rastgele.sample(urun_idler, k=1)  # Aynı ürün bir faturada iki kalem olabilir
+            rastgele.shuffle(urun_idler)
+            fatura_turu = rastgele.choice([semalar.FaturaTuruEnum.SATIS, semalar.FaturaTuruEnum.ALIS])
+            istek = _fatura_istegi(kiraci, f"ES-{kiraci['kullanici'].id}-{sira}-{no}", fatura_turu, urun_idler, rastgele)
+            db = oturum_sinifi()
+            try:
+                fatura = create_fatura(istek, current_user=kiraci["kullanici"], db=db)
+                with kilit:
+                    olusturulan.append((fatura.id, len(istek.kalemler)))
+            except Exception as e:  # HTTPException(500) içinde "deadlock detected" da buraya düşer
+                with kilit:
+                    hatalar.append(f"{istek.fatura_no}: {getattr(e, 'detail', e)}")
+            finally:
+                db.close()
+
+    parcaciklar = [threading.Thread(target=calistir, args=(sira,)) for sira in range(IS_PARCACIGI_SAYISI)]
+    for parcacik in parcaciklar:
+        parcacik.start()
+    for parcacik in parcaciklar:
+        parcacik.join(timeout=120)
+
+    assert not any(parcacik.is_alive() for parcacik in parcaciklar), "İş parçacıkları zamanında bitmedi (olası kilitlenme)"
+    assert not hatalar, "Eşzamanlı fatura oluşturma hataları:\n" + "\n".join(hatalar)
+    assert len(olusturulan) == IS_PARCACIGI_SAYISI * PARCACIK_BASINA_FATURA
+
+    StokHareket = modeller.StokHareket
+    yonler = {FATURA_STOK_ISLEM_TIPLERI[tur]: yon for tur, yon in FATURA_STOK_YONLERI.items()}
+    db = oturum_sinifi()
+    try:
+        kullanici_id = kiraci["kullanici"].id
+        hareketler = db.execute(
+            select(StokHareket.urun_id, StokHareket.islem_tipi, StokHareket.miktar)
+            .where(StokHareket.kullanici_id == kullanici_id)
+        ).all()
+        assert len(hareketler) == sum(kalem_sayisi for _, kalem_sayisi in olusturulan)
+
+        beklenen = {urun_id: kiraci["acilis_stogu"] for urun_id in kiraci["stok_idler"]}
+        for urun_id, islem_tipi, miktar in hareketler:
+            beklenen[urun_id] += yonler[islem_tipi] * miktar
+
+        gercek = dict(db.execute(
+            select(modeller.Stok.id, modeller.Stok.miktar).where(modeller.Stok.kullanici_id == kullanici_id)
+        ).all())
+        for urun_id, miktar in beklenen.items():
+            assert gercek[urun_id] == pytest.approx(miktar), f"Ürün {urun_id} stoğu korunmadı"
+
+        # Her hareketin sonraki_stok değeri, aynı ürünün kilit altındaki sırasını yansıtmalı: en büyük id son stoğa eşittir.
+        son_hareketler = db.execute(
+            select(StokHareket.urun_id, StokHareket.sonraki_stok)
+            .where(StokHareket.kullanici_id == kullanici_id,
+                   StokHareket.id.in_(select(func.max(StokHareket.id)).where(StokHareket.kullanici_id == kullanici_id)
+                                      .group_by(StokHareket.urun_id)))
+        ).all()
+        for urun_id, sonraki_stok in son_hareketler:
+            assert sonraki_stok == pytest.approx(gercek[urun_id])
+    finally:
+        db.close()
@@ -0,0 +1,140 @@
+# tests/test_indeksler.py
+# Router'ların ana sorgularının kiracı (kullanici_id) önekli kompozit indeksleri kullandığını EXPLAIN ile doğrular.
+# Küçük test tablolarında planlayıcı sıralı taramayı seçebileceğinden enable_seqscan kapatılır; yine de
+# Seq Scan görülüyorsa ya da beklenen indeks kullanılmıyorsa sorguya uygun indeks yok demektir.
+import enum
+import json
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+SATIR_SAYISI = 400
+INDEKS_TARAMALARI = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+@pytest.fixture
+def dolu_kiraci(oturum_sinifi, kiraci):
+    """kiraci fikstürünü fatura, kalem, cari/stok hareketi ve gelir/gider satırlarıyla doldurur ve ANALYZE eder."""
+    from sqlalchemy import insert, text
+    from api import modeller, semalar
+
+    kullanici_id = kiraci["kullanici"].id
+    stok_idler = kiraci["stok_idler"]
+    turler = list(semalar.FaturaTuruEnum)
+    db = oturum_sinifi()
+    try:
+        fatura_idler = db.scalars(insert(modeller.Fatura).returning(modeller.Fatura.id), [
+            dict(fatura_no=f"IX-{kullanici_id}-{sira}", tarih=kiraci["tarih"] - timedelta(days=sira % 365),
+                 fatura_turu=turler[sira % len(turler)], cari_id=kiraci["musteri_id"],
+                 cari_tip=semalar.CariTipiEnum.MUSTERI.value, odeme_turu=semalar.OdemeTuruEnum.ACIK_HESAP,
+                 genel_toplam=100.0, kullanici_id=kullanici_id)
+            for sira in range(SATIR_SAYISI)
+        ]).all()
+        db.execute(insert(modeller.FaturaKalemi), [
+            dict(fatura_id=fatura_id, urun_id=stok_idler[(sira + ek) % len(stok_idler)], miktar=1.0, birim_fiyat=10.0, kdv_orani=20.0)
+            for sira, fatura_id in enumerate(fatura_idler) for ek in range(2)
+        ])
+        db.execute(insert(modeller.CariHareket), [
+            dict(cari_id=kiraci["musteri_id"], cari_tip=semalar.CariTipiEnum.MUSTERI.value, tarih=kiraci["tarih"] - timedelta(days=sira % 365),
+                 islem_turu="FATURA", islem_yone=semalar.IslemYoneEnum.ALACAK, tutar=100.0,
+                 kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=fatura_id, kullanici_id=kullanici_id)
+            for sira, fatura_id in enumerate(fatura_idler)
+        ])
+        db.execute(insert(modeller.StokHareket), [
+            dict(urun_id=stok_idler[sira % len(stok_idler)], tarih=kiraci["tarih"] - timedelta(days=sira % 365),
+                 islem_tipi=semalar.StokIslemTipiEnum.SATIŞ, miktar=1.0, birim_fiyat=10.0, onceki_stok=0.0, sonraki_stok=0.0,
+                 kaynak=semalar.KaynakTipEnum.FATURA.value, kaynak_id=fatura_id, kullanici_id=kullanici_id)
+            for sira, fatura_id in enumerate(fatura_idler)
+        ])
+        db.execute(insert(modeller.GelirGider), [
+            dict(tarih=kiraci["tarih"] - timedelta(days=sira % 365), tip=list(semalar.GelirGiderTipEnum)[sira % 2],
+                 tutar=50.0, aciklama="Test", kaynak="MANUEL", kullanici_id=kullanici_id)
+            for sira in range(SATIR_SAYISI)
+        ])
+        db.commit()
+        for tablo in ("faturalar", "fatura_kalemleri", "cari_hareketler", "stok_hareketleri", "gelir_giderler"):
+            db.execute(text(f"ANALYZE {tablo}"))
+        db.commit()
+        yield dict(kiraci, fatura_id=fatura_idler[0])
+    finally:
+        db.close()
+
+
+def _denetim_sorgulari(veri):
+    """Router'ların ana sorgularının temsilcileri: ad -> (tablo, beklenen indeks, sorgu)."""
+    from sqlalchemy import select
+    from api import modeller, semalar
+
+    kullanici_id = veri["kullanici"].id
+    yil_once = veri["tarih"] - timedelta(days=365)
+    Fatura, FaturaKalemi = modeller.Fatura, modeller.FaturaKalemi
+    CariHareket, StokHareket, GelirGider = modeller.CariHareket, modeller.StokHareket, modeller.GelirGider
+    return {
+        "fatura_listesi": ("faturalar", "ix_faturalar_kullanici_tarih_id",
+                           select(Fatura.id).where(Fatura.kullanici_id == kullanici_id)
+                           .order_by(Fatura.tarih.desc(), Fatura.id.desc()).limit(25)),
+        "fatura_turu_tarih": ("faturalar", "ix_faturalar_kullanici_tur_tarih",
+                              select(Fatura.id).where(Fatura.kullanici_id == kullanici_id,
+                                                      Fatura.fatura_turu == semalar.FaturaTuruEnum.SATIS,
+                                                      Fatura.tarih >= yil_once, Fatura.tarih <= veri["tarih"])),
+        "fatura_kalemleri": ("fatura_kalemleri", "ix_fatura_kalemleri_fatura_id",
+                             select(FaturaKalemi.id).where(FaturaKalemi.fatura_id == veri["fatura_id"])),
+        "urun_fatura_kalemleri": ("fatura_kalemleri", "ix_fatura_kalemleri_urun_id",
+                                  select(FaturaKalemi.id).where(FaturaKalemi.urun_id == veri["stok_idler"][0])),
+        "cari_ekstre": ("cari_hareketler", "ix_cari_hareketler_kullanici_cari_tarih",
+                        select(CariHareket.id).where(CariHareket.kullanici_id == kullanici_id,
+                                                     CariHareket.cari_id == veri["musteri_id"],
+                                                     CariHareket.cari_tip == semalar.CariTipiEnum.MUSTERI.value,
+                                                     CariHareket.tarih >= yil_once)),
+        "stok_hareketleri": ("stok_hareketleri", "ix_stok_hareketleri_kullanici_urun_tarih",
+                             select(StokHareket.id).where(StokHareket.kullanici_id == kullanici_id,
+                                                          StokHareket.urun_id == veri["stok_idler"][0],
+                                                          StokHareket.tarih >= yil_once)),
+        "gelir_gider": ("gelir_giderler", "ix_gelir_giderler_kullanici_tip_tarih",
+                        select(GelirGider.id).where(GelirGider.kullanici_id == kullanici_id,
+                                                    GelirGider.tip == semalar.GelirGiderTipEnum.GELİR,
+                                                    GelirGider.tarih >= yil_once)),
+    }
+
+
+def _plan_taramalari(plan: dict) -> list:
+    """EXPLAIN (FORMAT JSON) planındaki tüm tarama düğümlerini (düğüm tipi, tablo, indeks) olarak döndürür."""
+    taramalar = []
+    if "Relation Name" in plan or "Index Name" in plan:
+        taramalar.append((plan.get("Node Type"), plan.get("Relation Name"), plan.get("Index Name")))
+    for alt_plan in plan.get("Plans", []):
+        taramalar.extend(_plan_taramalari(alt_plan))
+    return taramalar
+
+
+def _plan(db, sorgu) -> dict:
+    from sqlalchemy import text
+    from sqlalchemy.dialects import postgresql
+
+    derlenmis = sorgu.compile(dialect=postgresql.dialect(paramstyle="named"))
+    # Enum kolonları veritabanında üye adıyla saklanır.
+    parametreler = {ad: deger.name if isinstance(deger, enum.Enum) else deger for ad, deger in derlenmis.params.items()}
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {derlenmis}"), parametreler).scalar()
+    return (plan if isinstance(plan, list) else json.loads(plan))[0]["Plan"]
+
+
+def test_ana_sorgular_kompozit_indeks_kullanir(oturum_sinifi, dolu_kiraci):
+    from sqlalchemy import text
+
+    db = oturum_sinifi()
+    try:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        eksikler = []
+        for ad, (tablo, beklenen_indeks, sorgu) in _denetim_sorgulari(dolu_kiraci).items():
+            taramalar = _plan_taramalari(_plan(db, sorgu))
+            tablo_taramalari = [t for t in taramalar if t[1] == tablo or t[2] == beklenen_indeks]
+            if any(dugum == "Seq Scan" for dugum, _, _ in tablo_taramalari):
+                eksikler.append(f"{ad}: {tablo} üzerinde Seq Scan")
+            elif not any(dugum in INDEKS_TARAMALARI and indeks == beklenen_indeks for dugum, _, indeks in tablo_taramalari):
+                eksikler.append(f"{ad}: {beklenen_indeks} kullanılmadı (plan: {tablo_taramalari})")
+        assert not eksikler, "İndeks kullanmayan sorgular:\n" + "\n".join(eksikler)
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,87 @@
+# tests/test_nakit_akisi.py
+# gunluk_ozet'ten okunan nakit akışı raporunun, hareket tablolarından doğrudan hesaplanan sonuçla aynı olduğunu doğrular.
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+def _hareket_tablolarindan_nakit_akisi(db, kullanici_id, baslangic, bitis):
+    """gunluk_ozet öncesi hesap: kasa/bankaya bağlı NAKIT/KART/EFT cari hareketleri ile kasa/bankaya bağlı gelir/giderler."""
+    from sqlalchemy import String
+    from api import modeller, semalar
+
+    CariHareket, GelirGider, KasaBankaHesap = modeller.CariHareket, modeller.GelirGider, modeller.KasaBankaHesap
+    cari = db.query(CariHareket.islem_turu.label("tip"), CariHareket.tutar).join(
+        KasaBankaHesap, KasaBankaHesap.id == CariHareket.kasa_banka_id
+    ).filter(
+        CariHareket.kullanici_id == kullanici_id,
+        CariHareket.tarih >= baslangic,
+        CariHareket.tarih <= bitis,
+        CariHareket.odeme_turu.in_([semalar.OdemeTuruEnum.NAKIT, semalar.OdemeTuruEnum.KART, semalar.OdemeTuruEnum.EFT_HAVALE])
+    )
+    gelir_gider = db.query(GelirGider.tip.cast(String).label("tip"), GelirGider.tutar).join(
+        KasaBankaHesap, KasaBankaHesap.id == GelirGider.kasa_banka_id
+    ).filter(
+        GelirGider.kullanici_id == kullanici_id,
+        GelirGider.tarih >= baslangic,
+        GelirGider.tarih <= bitis
+    )
+
+    giris = cikis = 0.0
+    for satir in cari.union_all(gelir_gider).all():
+        tip = str(satir.tip).upper()
+        if tip in ("GELİR", "TAHSILAT", "FATURA_SATIS_PESIN"):
+            giris += float(satir.tutar)
+        elif tip in ("GİDER", "ODEME", "FATURA_ALIS_PESIN"):
+            cikis += float(satir.tutar)
+    return giris, cikis
+
+
+def test_nakit_akisi_acilis_bakiyesini_saymaz(oturum_sinifi, kiraci):
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik
+    from api.veritabani import get_db
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    tarih = kiraci["tarih"].isoformat()
+    try:
+        client = TestClient(app)
+        yanit = client.post("/kasalar_bankalar/", json={"hesap_adi": "Merkez Kasa", "tip": "KASA", "bakiye": 1000.0})
+        assert yanit.status_code == 201, yanit.text
+        kasa_id = yanit.json()["id"]
+
+        for islem_turu, islem_yone, tutar in (("TAHSILAT", "ALACAK", 250.0), ("ODEME", "BORC", 80.0)):
+            yanit = client.post("/cari_hareketler/manuel", json={
+                "cari_id": kiraci["musteri_id"], "cari_tip": "MUSTERI", "tarih": tarih,
+                "islem_turu": islem_turu, "islem_yone": islem_yone, "tutar": tutar,
+                "kaynak": "MANUEL", "odeme_turu": "NAKIT", "kasa_banka_id": kasa_id
+            })
+            assert yanit.status_code == 200, yanit.text
+
+        yanit = client.get("/raporlar/nakit_akisi_raporu", params={"baslangic_tarihi": tarih, "bitis_tarihi": tarih})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert yanit.status_code == 200, yanit.text
+    rapor = yanit.json()
+
+    db = oturum_sinifi()
+    try:
+        beklenen_giris, beklenen_cikis = _hareket_tablolarindan_nakit_akisi(db, kiraci["kullanici"].id, kiraci["tarih"], kiraci["tarih"])
+    finally:
+        db.close()
+
+    assert (beklenen_giris, beklenen_cikis) == (250.0, 80.0)
+    assert rapor["nakit_girisleri"] == pytest.approx(beklenen_giris)
+    assert rapor["nakit_cikislar"] == pytest.approx(beklenen_cikis)
+    assert rapor["net_nakit_akisi"] == pytest.approx(beklenen_giris - beklenen_cikis)
@@ -0,0 +1,84 @@
+# tests/test_raporlar.py
+# Rapor dosyası indirme ve Excel üretim uç noktalarının erişim ve yanıt davranışını doğrular.
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def istemci():
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+
+    yield app, TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def rapor_dosyasi():
+    from api.rapor_isleri import REPORTS_DIR
+
+    dosya_adi = "satis_raporu_7_20260101000000.xlsx"
+    dosya_yolu = os.path.join(REPORTS_DIR, dosya_adi)
+    with open(dosya_yolu, "wb") as dosya:
+        dosya.write(b"test")
+    yield dosya_adi
+    if os.path.exists(dosya_yolu):
+        os.remove(dosya_yolu)
+
+
+def test_rapor_indirme_kimlik_dogrulamasi_ister(istemci, rapor_dosyasi):
+    _, client = istemci
+    yanit = client.get(f"/raporlar/download_report/{rapor_dosyasi}")
+    assert yanit.status_code == 401, yanit.text
+
+
+def test_rapor_indirme_baska_kullanicinin_dosyasini_vermez(istemci, rapor_dosyasi):
+    from api import guvenlik
+
+    app, client = istemci
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: SimpleNamespace(id=8)
+    yanit = client.get(f"/raporlar/download_report/{rapor_dosyasi}")
+    assert yanit.status_code == 404, yanit.text
+
+
+def test_rapor_indirme_kendi_dosyasini_verir(istemci, rapor_dosyasi):
+    from api import guvenlik
+
+    app, client = istemci
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: SimpleNamespace(id=7)
+    yanit = client.get(f"/raporlar/download_report/{rapor_dosyasi}")
+    assert yanit.status_code == 200, yanit.text
+    assert yanit.content == b"test"
+
+
+def test_satis_raporu_excel_dosyayi_dondurur_ve_siler(istemci, oturum_sinifi, kiraci):
+    from api import guvenlik
+    from api.rapor_isleri import REPORTS_DIR
+    from api.veritabani import get_db
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app, client = istemci
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    onek = f"satis_raporu_{kiraci['kullanici'].id}_"
+    oncesi = {ad for ad in os.listdir(REPORTS_DIR) if ad.startswith(onek)}
+
+    tarih = kiraci["tarih"].isoformat()
+    yanit = client.post("/raporlar/generate_satis_raporu_excel", params={"baslangic_tarihi": tarih, "bitis_tarihi": tarih})
+
+    assert yanit.status_code == 200, yanit.text
+    assert yanit.headers["content-type"].startswith("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    assert onek in yanit.headers["content-disposition"]
+    assert yanit.content[:2] == b"PK"  # xlsx bir zip arşividir
+    assert {ad for ad in os.listdir(REPORTS_DIR) if ad.startswith(onek)} == oncesi
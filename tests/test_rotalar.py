@@ -0,0 +1,49 @@
+# tests/test_rotalar.py
+# Uygulamanın içe aktarılabildiğini ve ana liste rotalarının doğru işleyicilere bağlandığını doğrular.
+import pytest
+
+pytest.importorskip("fastapi")
+
+
+def _get_isleyicileri(app, yol):
+    return [
+        rota.endpoint for rota in app.routes
+        if getattr(rota, "path", None) == yol and "GET" in getattr(rota, "methods", set())
+    ]
+
+
+def test_uygulama_ice_aktarilir_ve_fatura_listesi_rotasi_dogru():
+    from api.api_ana import app
+    from api.rotalar.siparis_faturalar import read_faturalar
+
+    for yol in ("/faturalar/", "/faturalar"):
+        isleyiciler = _get_isleyicileri(app, yol)
+        assert isleyiciler, f"GET {yol} rotası kayıtlı değil"
+        assert all(isleyici is read_faturalar for isleyici in isleyiciler), f"GET {yol} read_faturalar'a bağlı değil"
+
+
+def test_fatura_listesi_get(oturum_sinifi, kiraci):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik
+    from api.veritabani import get_db
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    try:
+        yanit = TestClient(app).get("/faturalar/")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert yanit.status_code == 200, yanit.text
+    govde = yanit.json()
+    assert govde["items"] == []
+    assert govde.get("total") in (0, None)
@@ -0,0 +1,109 @@
+# tests/test_senkronizasyon.py
+# /sync/surum ve /sync/changes uç noktalarının create_all ile kurulan şemada çalıştığını ve
+# geç commit edilen işlemlerin değişikliklerinin istemci işaretinin gerisinde kalmadığını doğrular.
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def istemci(oturum_sinifi, kiraci):
+    from fastapi.testclient import TestClient
+    from api.api_ana import app
+    from api import guvenlik
+    from api.veritabani import get_db
+
+    def test_db():
+        db = oturum_sinifi()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[guvenlik.get_current_user] = lambda: kiraci["kullanici"]
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _surum(istemci):
+    yanit = istemci.get("/sync/surum")
+    assert yanit.status_code == 200, yanit.text
+    return yanit.json()["surum"]
+
+
+def _degisiklikler(istemci, since, limit=5000):
+    yanit = istemci.get("/sync/changes", params={"tablo": "stoklar", "since": since, "limit": limit})
+    assert yanit.status_code == 200, yanit.text
+    return yanit.json()
+
+
+def _tumunu_cek(istemci, since, limit=5000):
+    items, silinenler, sayfalar = [], [], []
+    devami_var = True
+    while devami_var:
+        sayfa = _degisiklikler(istemci, since, limit)
+        sayfalar.append(sayfa)
+        items += sayfa["items"]
+        silinenler += sayfa["silinenler"]
+        since, devami_var = sayfa["sonraki_since"], sayfa["devami_var"]
+    return items, silinenler, since, sayfalar
+
+
+def test_degisiklikler_eklenen_ve_silinen_kayitlari_dondurur(istemci, kiraci):
+    since = _surum(istemci)
+    ek = kiraci["musteri_id"]
+
+    yanit = istemci.post("/stoklar/", json={"kod": f"SENK_{ek}", "ad": "Senkron ürünü"})
+    assert yanit.status_code == 200, yanit.text
+    stok_id = yanit.json()["id"]
+
+    items, silinenler, since, _ = _tumunu_cek(istemci, since)
+    assert [item["id"] for item in items] == [stok_id]
+    assert items[0]["row_version"] is not None
+    assert silinenler == []
+
+    yanit = istemci.delete(f"/stoklar/{stok_id}")
+    assert yanit.status_code == 204, yanit.text
+
+    items, silinenler, _, _ = _tumunu_cek(istemci, since)
+    assert items == []
+    assert silinenler == [stok_id]
+
+
+def test_sayfalar_islemi_bolmez(istemci, kiraci):
+    # kiraci fikstürü beş ürünü tek işlemde ekler; sayfa boyutu daha küçük olsa da işlem tek sayfada gelir.
+    items, _, _, sayfalar = _tumunu_cek(istemci, 0, limit=2)
+    assert sorted(item["id"] for item in items) == sorted(kiraci["stok_idler"])
+    assert len(sayfalar[0]["items"]) == len(kiraci["stok_idler"])
+
+
+def test_gec_commit_edilen_islem_atlanmaz(istemci, oturum_sinifi, kiraci):
+    from sqlalchemy import text
+    from api import modeller
+
+    since = _surum(istemci)
+    ek = kiraci["musteri_id"]
+    acik_islem = oturum_sinifi()
+    try:
+        # Önce başlayıp sonra commit edilen işlem: sürümü, arada commit edilen işleminkinden küçüktür.
+        acik_islem.add(modeller.Stok(kod=f"GEC_{ek}", ad="Geç commit", kullanici_id=kiraci["kullanici"].id))
+        acik_islem.flush()
+
+        yanit = istemci.post("/stoklar/", json={"kod": f"ERKEN_{ek}", "ad": "Erken commit"})
+        assert yanit.status_code == 200, yanit.text
+
+        # Açık işlem sürdükçe sunucu işareti onun sürümünün ötesine taşımaz; erken commit edilen satır da bekletilir.
+        acik_surum = acik_islem.execute(text("SELECT pg_current_xact_id()::text::bigint")).scalar()
+        assert _surum(istemci) <= acik_surum
+        items, _, since, _ = _tumunu_cek(istemci, since)
+        assert items == []
+        assert since <= acik_surum
+
+        acik_islem.commit()
+    finally:
+        acik_islem.close()
+
+    items, _, _, _ = _tumunu_cek(istemci, since)
+    assert sorted(item["kod"] for item in items) == sorted([f"ERKEN_{ek}", f"GEC_{ek}"])